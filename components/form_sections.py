@@ -1,4 +1,8 @@
+import json
+import datetime as dt
+
 import streamlit as st
+from utils import rules
 from utils.validators import is_valid_abn
 
 # ---------- constants ----------
@@ -33,6 +37,18 @@ PURPOSES = [
     "Incident Affecting Licensees",
 ]
 
+def _parse(value, parse):
+    try:
+        return parse(value) if value else None
+    except ValueError:
+        return None
+
+def _date(value):
+    return _parse(value, dt.date.fromisoformat)
+
+def _time(value):
+    return _parse(value, dt.time.fromisoformat)
+
 # ---------- sections ----------
 def reporter_section(prefill: dict | None = None):
     pre = prefill or {}
@@ -73,7 +89,7 @@ def organisation_section(prefill: dict | None = None):
         abn = st.text_input("ABN *", value=abn, placeholder="11 222 333 444",
                             help="If unsure, check abr.business.gov.au")
         if abn and not is_valid_abn(abn):
-            st.warning("ABN format looks unusual. Continue if correct.")
+            st.warning("That ABN doesn't pass the ABN checksum. Continue if correct.")
     else:
         abn_reason = st.text_input("Why is an ABN not applicable? *", value=abn_reason)
 
@@ -154,13 +170,13 @@ def incident_section(purpose_dict: dict, prefill: dict | None = None):
 
     c1, c2 = st.columns(2)
     with c1:
-        occ_date = st.date_input("Occurrence date *", value=st.session_state.get("occ_date") or None)
-        occ_time = st.time_input("Occurrence time *", value=None)
+        occ_date = st.date_input("Occurrence date *", value=_date(pre.get("occurrence_date")))
+        occ_time = st.time_input("Occurrence time *", value=_time(pre.get("occurrence_time")))
         ongoing = st.selectbox("Is the incident ongoing? *", ["Yes","No","Unknown"],
                                index={"Yes":0,"No":1,"Unknown":2}.get(pre.get("ongoing","Unknown"),2))
     with c2:
-        id_date = st.date_input("Identification date *", value=None)
-        id_time = st.time_input("Identification time *", value=None)
+        id_date = st.date_input("Identification date *", value=_date(pre.get("identified_date")))
+        id_time = st.time_input("Identification time *", value=_time(pre.get("identified_time")))
         identified_by = st.selectbox("How was it identified? *", ["Organisation","Third party"],
                                      index=0 if (pre.get("identified_by","Organisation")=="Organisation") else 1)
 
@@ -175,10 +191,10 @@ def incident_section(purpose_dict: dict, prefill: dict | None = None):
         "infra_impacted": infra_impacted,
         "infra_impact_details": infra_details,
         "customers_impacted": cust_impacted,
-        "occurrence_date": str(occ_date),
-        "occurrence_time": occ_time.strftime("%H:%M:%S"),
-        "identified_date": str(id_date),
-        "identified_time": id_time.strftime("%H:%M:%S"),
+        "occurrence_date": occ_date.isoformat() if occ_date else "",
+        "occurrence_time": occ_time.strftime("%H:%M:%S") if occ_time else "",
+        "identified_date": id_date.isoformat() if id_date else "",
+        "identified_time": id_time.strftime("%H:%M:%S") if id_time else "",
         "ongoing": ongoing,
         "identified_by": identified_by,
         "narrative": narrative,
@@ -207,58 +223,25 @@ def attachments_section():
                              accept_multiple_files=True)
     return files or []
 
-def review_section(reporter, organisation, purpose, incident, ransomware):
+def review_section() -> bool:
+    """Whether the JSON preview is switched on (see review_json)."""
     st.caption("Review your responses before submitting.")
-    with st.expander("Preview JSON", expanded=False):
-        import json
-        payload = {
-            "reporter": reporter,
-            "organisation": organisation,
-            "purpose": purpose,
-            "incident": incident,
-            "ransomware": ransomware,
-        }
-        st.code(json.dumps(payload, indent=2), language="json")
+    return st.toggle("Preview JSON", value=False)
+
+def review_json(reporter, organisation, purpose, incident, ransomware) -> str:
+    payload = {
+        "reporter": reporter,
+        "organisation": organisation,
+        "purpose": purpose,
+        "incident": incident,
+        "ransomware": ransomware,
+    }
+    return json.dumps(payload, indent=2)
 
 # ---------- progress helper ----------
 def completion_percent(reporter, organisation, purpose, incident, ransomware):
-    required = 0
-    filled = 0
-
-    for k in ["first_name","surname","email","phone"]:
-        required += 1; filled += 1 if reporter.get(k) else 0
-
-    required += 3
-    filled += sum(bool(organisation.get(k)) for k in ["name","jurisdiction","address"])
-    if organisation.get("abn_status") == "has_abn":
-        required += 1; filled += 1 if organisation.get("abn") else 0
-    else:
-        required += 1; filled += 1 if organisation.get("abn_reason") else 0
-    if organisation.get("jurisdiction") == "ACT":
-        required += 1; filled += 1 if organisation.get("postcode") else 0
-    if organisation.get("jurisdiction") == "Overseas":
-        required += 1; filled += 1 if organisation.get("country") else 0
-
-    required += 1; filled += 1 if purpose.get("purposes") else 0
-    if "Cybersecurity Incident" in (purpose.get("purposes") or []):
-        required += 2
-        filled += bool(purpose.get("ci_member")) + bool(purpose.get("consent_home_affairs"))
-        if purpose.get("ci_member") == "Yes":
-            required += 1; filled += 1 if purpose.get("ci_sectors") else 0
-
-    required += 10
-    filled += sum(bool(incident.get(k)) for k in [
-        "type","infra_impacted","customers_impacted","occurrence_date","occurrence_time",
-        "identified_date","identified_time","ongoing","identified_by","narrative"
-    ])
-    if incident.get("type") == "Other":
-        required += 1; filled += 1 if incident.get("other_type_text") else 0
-    if incident.get("infra_impacted") == "Yes":
-        required += 1; filled += 1 if incident.get("infra_impact_details") else 0
-
-    if "Ransomware/Cyber Extortion Payment" in (purpose.get("purposes") or []):
-        required += 2
-        filled += bool((ransomware or {}).get("payment_demanded"))
-        filled += bool((ransomware or {}).get("communicated_with_extorter"))
-
-    return int(100 * filled / max(required, 1))
+    """Share of the required answers (utils.rules.RULES) filled in so far."""
+    return rules.completion_percent({
+        "reporter": reporter, "organisation": organisation, "purpose": purpose,
+        "incident": incident, "ransomware": ransomware,
+    })
@@ -0,0 +1,199 @@
+"""Command-line maintenance tasks for the Single Reporting Tool.
+
+    python manage.py export --out exports/ --dest ACSC --dest OAIC
+    python manage.py snapshot [--rebuild]
+    python manage.py rebuild-rollups
+    python manage.py dispatch [--once]
+    python manage.py stub-receiver [--port 8765] [--fail-rate 0.2]
+    python manage.py import reports.ndjson [--results results.ndjson]
+    python manage.py serve-ingest [--port 8770]
+    python manage.py audit [--status submitted] [--out audit.csv]
+    python manage.py retention [--archive-after 365] [--draft-expiry 90]
+    python manage.py pack-payloads [--retrain] [--unpack]
+"""
+import sys
+import argparse
+
+from utils.config import (
+    DISPATCH_BASE_URL, INGEST_CHUNK, INGEST_HOST, INGEST_PORT, SNAPSHOT_DIR, ARCHIVE_AFTER_DAYS, DRAFT_EXPIRY_DAYS,
+    METRICS_ENABLED,
+)
+from utils.metrics import write_prometheus
+from utils.routing import DESTINATIONS
+from utils.ingest import FORMATS
+
+def _progress(done: int, total: int):
+    print(f"\r{done}/{total} reports", end="", file=sys.stderr, flush=True)
+
+def cmd_export(args):
+    from utils.export import export_ndjson, export_reports_zip
+    from utils.models import ReportFilter
+    dests = args.dest or DESTINATIONS
+    filters = ReportFilter(status=args.status) if args.status else None
+    if args.zip:
+        with open(args.zip, "wb") as fh:
+            export_reports_zip(fh, dests, filters, args.workers, _progress, args.routed)
+        print(f"\nwrote {args.zip}")
+    else:
+        paths = export_ndjson(args.out, dests, filters, args.workers, _progress, args.routed)
+        print("\n" + "\n".join(f"wrote {p}" for p in paths.values()))
+
+def cmd_snapshot(args):
+    from utils.snapshot import export_snapshot
+    print(f"exported {export_snapshot(args.root, args.rebuild)} reports to {args.root}")
+
+def cmd_rebuild_rollups(args):
+    from utils.storage import rebuild_rollups
+    rebuild_rollups()
+    print("rollups rebuilt")
+
+def cmd_dispatch(args):
+    from utils.dispatch import dispatch
+    made = dispatch(args.dest, args.once, args.url)
+    print(f"{made} delivery attempts")
+
+def cmd_stub_receiver(args):
+    from utils.stub_receiver import StubReceiver
+    server = StubReceiver((args.host, args.port), args.fail_rate, verbose=True)
+    print(f"stub receiver on http://{args.host}:{args.port}/<destination>", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{len(server.received)} payloads from {server.requests} requests", file=sys.stderr)
+
+def cmd_import(args):
+    import csv
+    import json
+    from utils.ingest import import_file
+    out = open(args.results, "w", encoding="utf-8") if args.results else None
+    accepted = rejected = 0
+    try:
+        for r in import_file(args.path, args.format, args.chunk):
+            if "ref" in r:
+                accepted += 1
+            else:
+                rejected += 1
+                if not out:
+                    print(f"record {r['index']}: " + "; ".join(r["errors"]), file=sys.stderr)
+            if out:
+                out.write(json.dumps(r) + "\n")
+    except (ValueError, csv.Error) as e:
+        sys.exit(f"stopped at record {accepted + rejected} ({e}); "
+                 f"imported {accepted} reports before it, rejected {rejected}")
+    finally:
+        if out:
+            out.close()
+    print(f"imported {accepted} reports, rejected {rejected}")
+
+def cmd_serve_ingest(args):
+    from utils.ingest import IngestServer
+    server = IngestServer((args.host, args.port))
+    print(f"ingesting at http://{args.host}:{args.port}/reports", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+def cmd_audit(args):
+    import time
+    from utils.models import ReportFilter
+    from utils.rules import audit_reports
+    started = time.perf_counter()
+    df = audit_reports(ReportFilter(status=args.status) if args.status else None)
+    took = time.perf_counter() - started
+    if args.out:
+        df.to_csv(args.out, index=False)
+    else:
+        print(df.to_string(index=False))
+    print(f"{len(df)} reports with missing or invalid answers ({took:.2f}s)", file=sys.stderr)
+
+def cmd_retention(args):
+    from utils.storage import run_retention
+    result = run_retention(args.archive_after, args.draft_expiry, not args.no_vacuum)
+    for month, n in result["archived"].items():
+        print(f"archived {n} reports from {month}")
+    print(f"expired {result['expired_drafts']} drafts, released {result['released_pages']} free pages")
+
+def cmd_pack_payloads(args):
+    from utils.payload import CODEC
+    from utils.storage import incremental_vacuum, pack_reports
+    done = pack_reports(not args.unpack, args.retrain, args.chunk)
+    for where, n in done.items():
+        print(f"{'unpacked' if args.unpack else 'packed'} {n} reports in {where}")
+    if not args.unpack:
+        print(f"codec: {CODEC}")
+    print(f"released {incremental_vacuum()} free pages")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="manage.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="bulk-export destination payloads")
+    p.add_argument("--dest", action="append", choices=DESTINATIONS, help="repeatable; default all")
+    p.add_argument("--out", default="exports", help="directory for per-destination NDJSON")
+    p.add_argument("--zip", help="write a ZIP of per-report JSON files instead")
+    p.add_argument("--status", choices=["submitted", "draft"], default="submitted")
+    p.add_argument("--workers", type=int, help="shaping processes; default CPU count")
+    p.add_argument("--routed", action="store_true", help="only export each report to the destinations it is due to")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("snapshot", help="append new submitted reports to the Parquet analytics snapshot")
+    p.add_argument("--root", default=SNAPSHOT_DIR)
+    p.add_argument("--rebuild", action="store_true", help="discard the snapshot and export everything")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser("rebuild-rollups", help="recompute the dashboard metric rollups from reports")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("dispatch", help="deliver queued outbox rows to their destinations")
+    p.add_argument("--dest", action="append", choices=DESTINATIONS, help="repeatable; default all")
+    p.add_argument("--once", action="store_true", help="stop when nothing is due instead of polling")
+    p.add_argument("--url", default=DISPATCH_BASE_URL, help="base URL; each destination is POSTed to <url>/<dest>")
+    p.set_defaults(func=cmd_dispatch)
+
+    p = sub.add_parser("stub-receiver", help="run a local HTTP receiver standing in for the regulators")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 503")
+    p.set_defaults(func=cmd_stub_receiver)
+
+    p = sub.add_parser("import", help="bulk-import reports from JSON, NDJSON or CSV")
+    p.add_argument("path")
+    p.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    p.add_argument("--chunk", type=int, default=INGEST_CHUNK, help="records per transaction")
+    p.add_argument("--results", help="write one NDJSON result (id/ref or errors) per record here")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("serve-ingest", help="run the HTTP ingestion endpoint (POST /reports)")
+    p.add_argument("--host", default=INGEST_HOST)
+    p.add_argument("--port", type=int, default=INGEST_PORT)
+    p.set_defaults(func=cmd_serve_ingest)
+
+    p = sub.add_parser("audit", help="check stored reports against the completeness and format rules")
+    p.add_argument("--status", choices=["submitted", "draft"])
+    p.add_argument("--out", help="write the problem reports as CSV instead of printing them")
+    p.set_defaults(func=cmd_audit)
+
+    p = sub.add_parser("retention", help="archive old reports by month, expire abandoned drafts, vacuum")
+    p.add_argument("--archive-after", type=int, default=ARCHIVE_AFTER_DAYS, metavar="DAYS",
+                   help="archive submitted, delivered reports older than this")
+    p.add_argument("--draft-expiry", type=int, default=DRAFT_EXPIRY_DAYS, metavar="DAYS",
+                   help="delete drafts not saved for this long")
+    p.add_argument("--no-vacuum", action="store_true", help="skip the incremental VACUUM")
+    p.set_defaults(func=cmd_retention)
+
+    p = sub.add_parser("pack-payloads", help="convert stored reports to the compact compressed encoding")
+    p.add_argument("--retrain", action="store_true", help="train a new compression dictionary first")
+    p.add_argument("--unpack", action="store_true", help="convert back to plain JSON sections")
+    p.add_argument("--chunk", type=int, default=500, help="reports per transaction")
+    p.set_defaults(func=cmd_pack_payloads)
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        if METRICS_ENABLED:
+            write_prometheus(f"manage-{args.command}")
+
+if __name__ == "__main__":
+    main()
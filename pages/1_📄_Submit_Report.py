@@ -2,12 +2,15 @@ import streamlit as st
 from components.form_sections import (
     reporter_section, organisation_section, purpose_section,
     incident_section, ransomware_section, review_section,
-    attachments_section, completion_percent,
+    review_json, attachments_section, completion_percent,
 )
-from utils.models import Report
-from utils.storage import save_report, save_draft, load_draft, submit_from_ref
+from pydantic import ValidationError
+from utils.metrics import span, start, timed
+from utils.storage import save_report, save_draft, load_draft, draft_history, similar_reports, is_draft
+from utils.submission import error_messages, prepare_report
 
 st.title("📄 Submit Report")
+page_run = start("page.submit")
 
 # --- tiny helpers for query params (back/forward compatible) ---
 def get_qp():
@@ -22,14 +25,28 @@ def set_qp(**kwargs):
     except Exception:
         st.experimental_set_query_params(**kwargs)
 
+def clear_qp(key):
+    try:
+        st.query_params.pop(key, None)
+    except Exception:
+        qp = get_qp()
+        qp.pop(key, None)
+        st.experimental_set_query_params(**qp)
+
 # --- Resume draft ---
 qp = get_qp()
 ref_in_url = (qp.get("ref") if isinstance(qp.get("ref"), str) else (qp.get("ref",[None])[0] if qp.get("ref") else None))
 
 with st.expander("Resume a saved draft", expanded=bool(ref_in_url)):
     ref_input = st.text_input("Enter your reference code", value=ref_in_url or "")
+    history = draft_history(ref_input.strip()) if (ref_input or "").strip() else []
+    version = None
+    if len(history) > 1:
+        versions = {f"Version {v} · saved {at} · changed {', '.join(secs)}": v for v, at, secs in history}
+        picked = versions[st.selectbox("Version", list(versions), help="The latest save is first.")]
+        version = None if picked == history[0][0] else picked
     if st.button("Load draft"):
-        data = load_draft((ref_input or "").strip().upper())
+        data = load_draft((ref_input or "").strip().upper(), version)
         if data:
             st.session_state["form_state"] = data
             st.success("Draft loaded. Scroll down to continue.")
@@ -38,66 +55,133 @@ with st.expander("Resume a saved draft", expanded=bool(ref_in_url)):
 
 prefill = st.session_state.get("form_state") or {}
 
-with st.form("report_form", clear_on_submit=False):
+# Each section is a fragment: a widget change reruns only that section, then
+# refreshes the progress bar and JSON preview, which sit outside the fragments.
+# The latest answers live in st.session_state["sections"].
+sections = st.session_state.setdefault("sections", {})
+SECTION_KEYS = ("reporter", "organisation", "purpose", "incident", "ransomware")
+RANSOMWARE = "Ransomware/Cyber Extortion Payment"
+
+progress = st.empty()
+preview = None  # placeholder set up with the review section, while the preview is on
+
+def show_progress():
+    pct = completion_percent(*(sections.get(k) or {} for k in SECTION_KEYS))
+    progress.progress(pct, text=f"{pct}% complete")
+    if preview is not None:
+        preview.code(review_json(*(sections.get(k) for k in SECTION_KEYS)), language="json")
+
+@st.fragment
+@timed("page.submit.reporter")
+def reporter_fragment():
     st.subheader("1) Contact Officer Details")
-    reporter = reporter_section(prefill.get("reporter"))
+    sections["reporter"] = reporter_section(prefill.get("reporter"))
+    show_progress()
 
+@st.fragment
+@timed("page.submit.organisation")
+def organisation_fragment():
     st.subheader("2) Organisation Details")
-    organisation = organisation_section(prefill.get("organisation"))
+    sections["organisation"] = organisation_section(prefill.get("organisation"))
+    show_progress()
 
+@st.fragment
+@timed("page.submit.purpose")
+def purpose_fragment():
     st.subheader("3) Purpose for Reporting")
-    purpose = purpose_section(prefill.get("purpose"))
-
+    sections["purpose"] = purpose_section(prefill.get("purpose"))
+    show_progress()
+    # the ransomware section sits outside this fragment, so showing or hiding it needs a full rerun
+    wanted = RANSOMWARE in sections["purpose"]["purposes"]
+    if st.session_state.setdefault("ransomware_shown", wanted) != wanted:
+        st.session_state["ransomware_shown"] = wanted
+        st.rerun()
+
+@st.fragment
+@timed("page.submit.incident")
+def incident_fragment():
     st.subheader("4) Incident Discovery & Details")
-    incident = incident_section(purpose, prefill.get("incident"))
-
-    ransomware = None
-    if "Ransomware/Cyber Extortion Payment" in purpose.get("purposes", []):
-        st.subheader("4a) Ransomware / Extortion Details")
-        ransomware = ransomware_section((prefill or {}).get("ransomware"))
-
+    sections["incident"] = incident_section(sections.get("purpose") or {}, prefill.get("incident"))
+    show_progress()
+
+@st.fragment
+@timed("page.submit.ransomware")
+def ransomware_fragment():
+    st.subheader("4a) Ransomware / Extortion Details")
+    sections["ransomware"] = ransomware_section(prefill.get("ransomware"))
+    show_progress()
+
+@st.fragment
+@timed("page.submit.attachments")
+def attachments_fragment():
     st.subheader("Attachments (optional)")
-    attachments = attachments_section()
-
-    st.subheader("5) Review & Submit")
-    review_section(reporter, organisation, purpose, incident, ransomware)
-
-    pct = completion_percent(reporter, organisation, purpose, incident, ransomware)
-    st.progress(pct, text=f"{pct}% complete")
-
-    colA, colB = st.columns(2)
-    with colA:
-        submitted = st.form_submit_button("Submit report", use_container_width=True)
-    with colB:
-        savedraft = st.form_submit_button("💾 Save for later", use_container_width=True)
+    sections["attachments"] = attachments_section()
+
+reporter_fragment()
+organisation_fragment()
+purpose_fragment()
+incident_fragment()
+if st.session_state["ransomware_shown"]:
+    ransomware_fragment()
+else:
+    sections["ransomware"] = None
+attachments_fragment()
+st.subheader("5) Review & Submit")
+preview = st.empty() if review_section() else None
+show_progress()
+
+reporter, organisation, purpose, incident, ransomware = (sections[k] for k in SECTION_KEYS)
+attachments = sections.get("attachments") or []
+
+colA, colB = st.columns(2)
+with colA:
+    submitted = st.button("Submit report", use_container_width=True)
+with colB:
+    savedraft = st.button("💾 Save for later", use_container_width=True)
 
 if savedraft:
     payload = {
         "reporter": reporter, "organisation": organisation,
         "purpose": purpose, "incident": incident, "ransomware": ransomware,
     }
-    ref = save_draft(payload, ref_in_url)
-    set_qp(ref=ref)
-    st.success(f"Draft saved. Reference: {ref}")
-    st.link_button("Open draft link", url=f"?ref={ref}", use_container_width=True)
+    try:
+        with span("page.submit.save_draft"):
+            ref = save_draft(payload, ref_in_url)
+        set_qp(ref=ref)
+        st.success(f"Draft saved. Reference: {ref}")
+        st.link_button("Open draft link", url=f"?ref={ref}", use_container_width=True)
+    except ValueError as e:
+        st.error(str(e))
 
 if submitted:
     try:
-        if ref_in_url:
-            row_id = submit_from_ref(ref_in_url)
-        else:
-            report = Report(reporter=reporter, organisation=organisation,
-                            purpose=purpose, incident=incident, ransomware=ransomware)
-            row_id = save_report(report, attachments)
+        # validated and serialised once; the same JSON is stored and offered for download
+        with span("page.submit.submit") as sp:
+            prepared = prepare_report({
+                "reporter": reporter, "organisation": organisation,
+                "purpose": purpose, "incident": incident, "ransomware": ransomware,
+            })
+            sp.bytes = len(prepared.document)
+            # promote the draft in the URL; a mistyped or already submitted ref makes a new report
+            ref = ref_in_url if ref_in_url and is_draft(ref_in_url) else None
+            row_id = save_report(prepared, attachments, ref=ref)
+        # the draft is gone now: later submits in this session are new reports
+        clear_qp("ref")
+        st.session_state.pop("form_state", None)
         st.success(f"Report submitted with ID {row_id}.")
+        if similar := similar_reports(row_id):
+            st.info(f"This looks similar to {len(similar)} report(s) already received. "
+                    "If it describes the same incident there is no need to submit it again.")
         st.download_button(
             "Download JSON copy",
-            data=Report(reporter=reporter, organisation=organisation,
-                       purpose=purpose, incident=incident, ransomware=ransomware
-                       ).model_dump_json(indent=2),
+            data=prepared.document,
             file_name=f"report_{row_id}.json",
             mime="application/json",
             use_container_width=True,
         )
+    except ValidationError as e:
+        st.error("Please fix the following before submitting:\n\n" + "\n".join(f"- {m}" for m in error_messages(e)))
     except Exception as e:
         st.error(f"Could not save: {e}")
+
+page_run.stop()
@@ -1,37 +1,224 @@
+import os
+import tempfile
 import streamlit as st
-from utils.storage import fetch_reports_df, purge_all, get_destination_json
+from components.form_sections import STATES, INCIDENT_TYPES, CI_SECTORS
+from utils.models import ReportFilter
+from utils.routing import DESTINATIONS
+from utils.rules import audit_reports
+from utils.snapshot import export_snapshot, read_snapshot, snapshot_state
+from utils.export import export_csv, export_xlsx, export_ndjson_zip, export_reports_zip, deferred
+import pandas as pd
+from utils.cache import reports_page, count_reports, list_attachments, rollups
+from utils.metrics import span, start
+from utils.storage import (
+    purge_all, get_destination_json, iter_attachment, write_attachments_zip,
+    outbox_summary, list_outbox, retry_failed, report_destinations, fetch_duplicates_df,
+)
 
 st.title("📊 Admin Dashboard")
+page_run = start("page.dashboard")
 
 with st.expander("Filters", expanded=True):
     q = st.text_input("Free text search (ref, reporter, org, summary)…")
+    f1, f2, f3 = st.columns(3)
+    with f1:
+        status = st.selectbox("Status", ["All", "submitted", "draft"])
+        jurisdictions = st.multiselect("Jurisdiction", STATES)
+        destinations = st.multiselect("Due to", DESTINATIONS, help="Regulators the report's purposes route to.")
+    with f2:
+        incident_types = st.multiselect("Incident type", INCIDENT_TYPES)
+        ci_sectors = st.multiselect("CI sector", CI_SECTORS)
+    with f3:
+        occurred = st.date_input("Occurrence date range", value=(), help="Leave empty for all dates.")
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+        archived = st.checkbox("Include archived reports", help="Also search the monthly archives (slower).")
+
+filters = ReportFilter(
+    query=q or None,
+    status=None if status == "All" else status,
+    jurisdictions=jurisdictions,
+    incident_types=incident_types,
+    ci_sectors=ci_sectors,
+    destinations=destinations,
+    occurred_from=str(occurred[0]) if len(occurred) > 0 else None,
+    occurred_to=str(occurred[1]) if len(occurred) > 1 else None,
+    archived=archived,
+)
+
+# keyset cursors for the pages visited so far; reset whenever the view changes
+view_key = (filters.model_dump_json(), page_size)
+if st.session_state.get("page_view") != view_key:
+    st.session_state["page_view"] = view_key
+    st.session_state["page_cursors"] = [None]
+cursors = st.session_state["page_cursors"]
 
 col1, col2, col3 = st.columns([3,1,1])
 with col1:
-    df = fetch_reports_df(q)
-    st.caption(f"{len(df)} records")
+    with span("page.dashboard.listing") as sp:
+        df, next_cursor = reports_page(page_size, cursors[-1], filters)
+        total = count_reports(filters)
+        sp.rows = len(df)
+    st.caption(f"Page {len(cursors)} · {total} records")
     st.dataframe(df, use_container_width=True, hide_index=True)
+    p1, p2, _ = st.columns([1,1,4])
+    with p1:
+        if st.button("◀ Prev", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with p2:
+        if st.button("Next ▶", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
 with col2:
+    # full report fields for every filtered record, generated only when clicked
     st.download_button(
         "Download CSV",
-        data=df.to_csv(index=False),
+        data=deferred(lambda fh: export_csv(fh, filters)),
         file_name="reports.csv",
         mime="text/csv",
         use_container_width=True,
     )
+    st.download_button(
+        "Download Excel",
+        data=deferred(lambda fh: export_xlsx(fh, filters)),
+        file_name="reports.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        use_container_width=True,
+    )
 with col3:
     if st.button("🗑️ Purge (dev only)", help="Deletes all records and files"):
         purge_all()
         st.warning("All data removed (dev only). Reload page.")
 
+def _copy_attachment(attachment_id):
+    def write(fh):
+        for chunk in iter_attachment(attachment_id):
+            fh.write(chunk)
+    return write
+
+def _read_file(path):
+    def read():
+        with open(path, "rb") as fh:
+            return fh.read()
+    return read
+
+st.markdown("---")
+st.subheader("Metrics")
+
+with span("page.dashboard.metrics"):
+    metrics = rollups()
+status_counts = dict(metrics.get("status", []))
+m1, m2, m3 = st.columns(3)
+m1.metric("Submitted reports", f"{status_counts.get('submitted', 0):,}")
+m2.metric("Open drafts", f"{status_counts.get('draft', 0):,}")
+avg_tti = metrics.get("avg_minutes_to_identify")
+m3.metric("Avg time to identify", f"{avg_tti / 60:,.1f} h" if avg_tti is not None else "—",
+          help="Identification minus occurrence date/time, across submitted reports")
+
+def _rollup_series(dim):
+    return pd.DataFrame(metrics.get(dim, []), columns=[dim, "reports"]).set_index(dim)
+
+c1, c2, c3 = st.columns(3)
+for col, dim, label in ((c1, "incident_type", "By incident type"),
+                        (c2, "jurisdiction", "By jurisdiction"),
+                        (c3, "purpose", "By purpose")):
+    with col:
+        st.caption(label)
+        st.bar_chart(_rollup_series(dim), horizontal=True)
+st.caption("Submitted per day")
+st.line_chart(_rollup_series("day").sort_index())
+
+st.markdown("---")
+st.subheader("Data Quality Audit")
+st.caption("Checks the reports matching the filters above against the required-field and format rules.")
+if st.button("Run audit", use_container_width=True):
+    with span("page.dashboard.audit") as sp:
+        st.session_state["audit"] = audit_reports(filters)
+        sp.rows = len(st.session_state["audit"])
+if st.session_state.get("audit") is not None:
+    audit = st.session_state["audit"]
+    a1, a2 = st.columns(2)
+    a1.metric("Incomplete", int((audit["Missing"] != "").sum()))
+    a2.metric("Invalid answers", int((audit["Invalid"] != "").sum()))
+    st.dataframe(audit, use_container_width=True, hide_index=True)
+
+st.markdown("---")
+st.subheader("Possible Duplicates")
+st.caption("Submitted reports whose narrative, organisation and dates closely match an earlier report.")
+with span("page.dashboard.duplicates"):
+    dupes = fetch_duplicates_df()
+if dupes.empty:
+    st.info("No likely duplicates found.")
+else:
+    st.dataframe(dupes, use_container_width=True, hide_index=True)
+
+st.markdown("---")
+st.subheader("Analytics Snapshot")
+
+@st.cache_data(show_spinner=False)
+def _snapshot_by_type(last_seq):
+    df = read_snapshot(["month", "incident_type"])
+    return df.groupby(["month", "incident_type"], observed=True).size().unstack(fill_value=0)
+
+s1, s2 = st.columns([3,1])
+with s2:
+    if st.button("Refresh snapshot", use_container_width=True,
+                 help="Appends submitted reports added since the last snapshot"):
+        try:
+            st.success(f"Added {export_snapshot()} reports to the snapshot.")
+        except RuntimeError as e:
+            st.error(str(e))
+    st.caption(f"Snapshot covers submissions up to #{snapshot_state()['last_seq']}.")
+with s1:
+    try:
+        by_type = _snapshot_by_type(snapshot_state()["last_seq"])
+        if by_type.empty:
+            st.caption("No snapshot yet.")
+        else:
+            st.bar_chart(by_type)
+    except RuntimeError as e:
+        st.caption(str(e))
+
+st.markdown("---")
+st.subheader("Attachments")
+
+att_report = st.number_input("Report ID", min_value=1, step=1, key="att_report")
+files = list_attachments(int(att_report))
+if not files:
+    st.caption("No attachments for this report.")
+else:
+    for a in files:
+        c1, c2 = st.columns([4,1])
+        with c1:
+            st.write(f"**{a['filename']}** · {a['size']:,} bytes · {a['mime_type'] or 'unknown type'}")
+        with c2:
+            st.download_button(
+                "Download",
+                data=deferred(_copy_attachment(a["id"])),
+                file_name=a["filename"],
+                mime=a["mime_type"] or "application/octet-stream",
+                key=f"att_{a['id']}",
+                use_container_width=True,
+            )
+    st.download_button(
+        f"Download all ({len(files)}) as ZIP",
+        data=deferred(lambda fh: write_attachments_zip(int(att_report), fh)),
+        file_name=f"report_{int(att_report)}_attachments.zip",
+        mime="application/zip",
+        use_container_width=True,
+    )
+
 st.markdown("---")
 st.subheader("Destination Exports")
 
+idx = st.number_input("Report ID", min_value=1, step=1)
+due = report_destinations(int(idx))
+st.caption("Due to: " + (", ".join(due) if due else "no regulator (by its purposes)"))
 dest = st.selectbox(
     "Choose a destination schema to preview",
-    ["ACSC", "HomeAffairs", "OAIC", "APRA", "ASIC", "RBA", "ACCC/CDR", "TGA"],
+    DESTINATIONS,
+    index=DESTINATIONS.index(due[0]) if due else 0,
 )
-idx = st.number_input("Report ID", min_value=1, step=1)
 if st.button("Generate JSON", use_container_width=True):
     try:
         js = get_destination_json(int(idx), dest)
@@ -45,3 +232,61 @@ if st.button("Generate JSON", use_container_width=True):
         )
     except Exception as e:
         st.error(str(e))
+
+st.markdown("---")
+st.subheader("Delivery Status")
+st.caption("Outbox rows queued at submit time; `python manage.py dispatch` delivers them.")
+
+with span("page.dashboard.delivery"):
+    summary = outbox_summary()
+if summary.empty:
+    st.caption("Nothing queued for delivery yet.")
+else:
+    st.dataframe(summary, use_container_width=True)
+    d1, d2 = st.columns([3,1])
+    with d1:
+        show = st.radio("Show", ["failed", "pending", "delivered"], horizontal=True, key="outbox_status")
+    with d2:
+        if st.button("Retry failed", use_container_width=True, disabled="failed" not in summary.columns):
+            st.success(f"Re-queued {retry_failed()} deliveries.")
+    st.dataframe(list_outbox(show), use_container_width=True, hide_index=True)
+
+st.markdown("---")
+st.subheader("Bulk Export")
+st.caption("Shapes every report matching the filters above for each selected destination.")
+
+bulk_dests = st.multiselect("Destinations", DESTINATIONS, default=DESTINATIONS)
+bulk_format = st.radio("Format", ["NDJSON per destination", "ZIP of per-report files"], horizontal=True)
+bulk_routed = st.checkbox("Only reports due to each destination", value=True)
+if st.button("Build bulk export", disabled=not bulk_dests, use_container_width=True):
+    # one export file per session: replace the previous one
+    old = st.session_state.pop("bulk_export", None)
+    if old and os.path.exists(old):
+        os.remove(old)
+    bar = st.progress(0, text="Shaping reports…")
+    def progress(done, total):
+        bar.progress(done / max(total, 1), text=f"{done}/{total} reports")
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    try:
+        with span("page.dashboard.bulk_export") as sp, os.fdopen(fd, "wb") as fh:
+            if bulk_format.startswith("NDJSON"):
+                export_ndjson_zip(fh, bulk_dests, filters, progress=progress, routed=bulk_routed)
+            else:
+                export_reports_zip(fh, bulk_dests, filters, progress=progress, routed=bulk_routed)
+            sp.bytes = fh.tell()
+    except BaseException:
+        os.remove(path)
+        raise
+    bar.progress(1.0, text="Export ready")
+    st.session_state["bulk_export"] = path
+if os.path.exists(st.session_state.get("bulk_export") or ""):
+    # read only when clicked, not on every rerun
+    st.download_button(
+        "Download bulk export",
+        data=_read_file(st.session_state["bulk_export"]),
+        file_name="destination_exports.zip",
+        mime="application/zip",
+        use_container_width=True,
+    )
+
+page_run.stop()
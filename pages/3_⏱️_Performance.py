@@ -0,0 +1,43 @@
+import streamlit as st
+from utils.config import METRICS_ENABLED, METRICS_DIR
+from utils.metrics import summary_df, prometheus_text, write_prometheus, reset
+
+st.title("⏱️ Performance")
+
+if not METRICS_ENABLED:
+    st.info("Instrumentation is off. Start the app with `SRT_METRICS=1` to time storage, routing, "
+            "exports and page reruns.")
+    st.stop()
+
+st.caption("Timings since this server process started (or since the last reset). "
+           "Percentiles are estimated from histogram buckets.")
+
+df = summary_df()
+prefix = st.selectbox("Area", ["All", "page", "storage", "routing", "export", "rules", "submission", "ingest"])
+if prefix != "All":
+    df = df[df["Operation"].str.startswith(prefix + ".")]
+
+if df.empty:
+    st.write("Nothing recorded yet — use the other pages, then come back.")
+else:
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    st.subheader("p95 latency (ms)")
+    st.bar_chart(df.set_index("Operation")["p95 ms"], horizontal=True)
+
+c1, c2, c3 = st.columns(3)
+with c1:
+    if st.button("Reset", use_container_width=True):
+        reset()
+        st.rerun()
+with c2:
+    if st.button("Write Prometheus file", use_container_width=True,
+                 help=f"For a node_exporter textfile collector pointed at {METRICS_DIR}."):
+        st.success(f"Wrote {write_prometheus()}")
+with c3:
+    st.download_button(
+        "Download metrics",
+        data=prometheus_text(),
+        file_name="srt.prom",
+        mime="text/plain",
+        use_container_width=True,
+    )
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from utils import storage
+
+PAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+def page(prefix: str) -> str:
+    """Path of the Streamlit page whose file name starts with `prefix`, e.g. "1_"."""
+    return os.path.join(PAGES, next(p for p in sorted(os.listdir(PAGES)) if p.startswith(prefix)))
+
+def make_report(i: int = 0, narrative: str = None) -> dict:
+    return {
+        "reporter": {"first_name": f"Ann{i}", "surname": "Lee", "email": f"a{i}@example.com", "phone": "0400 000 000"},
+        "organisation": {"name": f"Org {i}", "abn_status": "has_abn", "abn": "51 824 753 556",
+                         "jurisdiction": "NSW", "address": "1 Example St"},
+        "purpose": {"purposes": ["Data Breach Incident"]},
+        "incident": {"type": "Malware", "infra_impacted": "No", "customers_impacted": "Unknown",
+                     "occurrence_date": "2026-01-10", "occurrence_time": "10:00:00",
+                     "identified_date": "2026-01-11", "identified_time": "11:30:00",
+                     "ongoing": "No", "identified_by": "Organisation",
+                     "narrative": narrative or f"phishing email led to credential theft at site {i} of the network"},
+    }
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh database: every data path in utils.config is relative to the working directory."""
+    monkeypatch.chdir(tmp_path)
+    while not storage._idle.empty():
+        storage._idle.get_nowait().close()
+    storage._dict_cache.clear()
+    storage._cold.cache_clear()
+    monkeypatch.setattr(storage, "_schema_ready", False)
+    yield storage
+    while not storage._idle.empty():
+        storage._idle.get_nowait().close()
@@ -0,0 +1,52 @@
+import io
+import os
+
+import pytest
+
+from tests.conftest import make_report
+from utils.attachments import blob_path
+from utils.config import ATTACH_DIR
+
+def _upload(data: bytes, name: str = "log.txt"):
+    f = io.BytesIO(data)
+    f.name = name
+    return f
+
+def _blobs() -> list:
+    return sorted(n for _, _, files in os.walk(ATTACH_DIR) for n in files if not n.startswith("."))
+
+@pytest.fixture(params=[False, True], ids=["inline", "write-behind"])
+def store(db, request, monkeypatch):
+    monkeypatch.setattr(db, "WRITE_BEHIND", request.param)
+    monkeypatch.setattr(db, "_writer", None)
+    yield db
+    if db._writer:
+        db._writer.close()
+
+def test_failed_save_removes_its_blobs(store):
+    with pytest.raises(ValueError, match="Draft not found"):
+        store.save_report(make_report(1), [_upload(b"a" * 5000), _upload(b"b" * 10)], ref="NOSUCHREF")
+    assert _blobs() == []
+
+def test_failed_save_keeps_blobs_other_reports_use(store):
+    rid = store.save_report(make_report(1), [_upload(b"shared")])
+    (kept,) = store.list_attachments(rid)
+    with pytest.raises(ValueError):
+        store.save_report(make_report(2), [_upload(b"shared"), _upload(b"only mine")], ref="NOSUCHREF")
+    assert _blobs() == [kept["sha256"]]
+    assert b"".join(store.iter_attachment(kept["id"])) == b"shared"
+
+def test_unreadable_upload_removes_the_ones_before_it(db):
+    class Broken(io.BytesIO):
+        name = "broken.bin"
+        def read(self, *args):
+            raise OSError("connection reset")
+    with pytest.raises(OSError):
+        db.save_report(make_report(1), [_upload(b"first"), Broken()])
+    assert _blobs() == [] and db.count_reports() == 0
+
+def test_saved_report_links_its_blobs(db):
+    rid = db.save_report(make_report(1), [_upload(b"x" * 100), _upload(b"x" * 100, "copy.txt")])
+    a, b = db.list_attachments(rid)
+    assert a["sha256"] == b["sha256"] and os.path.exists(blob_path(a["sha256"]))
+    assert _blobs() == [a["sha256"]]
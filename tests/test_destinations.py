@@ -0,0 +1,52 @@
+from tests.conftest import make_report
+from utils.models import ReportFilter
+
+def _restart(db, monkeypatch, version: str, routes: dict):
+    """Start-up under different routing: destinations_for maps each first purpose to `routes`."""
+    monkeypatch.setattr(db, "ROUTING_VERSION", version)
+    monkeypatch.setattr(db, "destinations_for", lambda purpose: routes[purpose["purposes"][0]])
+    monkeypatch.setattr(db, "_schema_ready", False)
+    db.init_db()
+
+def _meta_version(db) -> str:
+    with db.connection() as c:
+        return c.execute("SELECT value FROM meta WHERE key = 'routing_version'").fetchone()[0]
+
+def test_written_with_each_report_and_draft(db):
+    rid = db.save_report(make_report(1))
+    ref = db.save_draft(make_report(2))
+    did = db.submit_from_ref(ref)
+    assert db.report_destinations(rid) == db.report_destinations(did) == ["OAIC"]
+    assert db.count_reports(filters=ReportFilter(destinations=["OAIC"])) == 2
+
+def test_rebuilt_when_routing_version_changes(db, monkeypatch):
+    rid = db.save_report(make_report(1))
+    db.save_draft(make_report(2))
+    _restart(db, monkeypatch, db.ROUTING_VERSION, {"Data Breach Incident": ["TGA"]})
+    assert db.report_destinations(rid) == ["OAIC"]  # same version: left alone
+
+    _restart(db, monkeypatch, "next", {"Data Breach Incident": ["TGA", "ACSC"]})
+    assert db.report_destinations(rid) == ["ACSC", "TGA"]
+    assert db.count_reports(filters=ReportFilter(destinations=["TGA"])) == 2
+    assert db.count_reports(filters=ReportFilter(destinations=["OAIC"])) == 0
+    assert _meta_version(db) == "next"
+
+def test_archives_are_rerouted_too(db, monkeypatch):
+    from tests.test_retention import _age
+    old = db.save_report(make_report(1))
+    _age(db, 400)
+    (month,) = db.archive_reports()
+    with db.connection() as c:
+        c.execute("ATTACH DATABASE ? AS a", (db.archive_path(month),))
+        assert c.execute("SELECT value FROM a.meta WHERE key='routing_version'").fetchone()[0] == db.ROUTING_VERSION
+        c.execute("DROP TABLE a.meta")  # as written before archives kept a routing version
+        c.execute("DETACH DATABASE a")
+
+    _restart(db, monkeypatch, "next", {"Data Breach Incident": ["TGA"]})
+    assert db.report_destinations(old) == ["TGA"]
+    assert db.count_reports(filters=ReportFilter(destinations=["TGA"], archived=True)) == 1
+
+    rebuilt = []
+    monkeypatch.setattr(db, "_rebuild_destinations", lambda c, schema="main": rebuilt.append(schema))
+    _restart(db, monkeypatch, "next", {"Data Breach Incident": ["TGA"]})
+    assert rebuilt == []
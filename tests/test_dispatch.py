@@ -0,0 +1,49 @@
+import asyncio
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from utils import dispatch
+
+class _Garbled(BaseHTTPRequestHandler):
+    """Reads the request, then answers with something that is not HTTP."""
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.wfile.write(b"NOT-HTTP\r\n\r\n")
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def flaky_url():
+    server = HTTPServer(("127.0.0.1", 0), _Garbled)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/x"
+    server.shutdown()
+
+def test_garbled_response_is_retried(flaky_url):
+    with pytest.raises(http.client.BadStatusLine) as e:
+        dispatch._post(flaky_url, "{}", "k")
+    assert not isinstance(e.value, OSError)
+
+    async def deliver():
+        bucket = dispatch.TokenBucket(100, 10)
+        return await dispatch._deliver(flaky_url, (1, "k", 0, "{}"), bucket, asyncio.Semaphore(1))
+    oid, status, next_at, error = asyncio.run(deliver())
+    assert (oid, status) == (1, "pending")
+    assert error.startswith("BadStatusLine")
+
+def test_lease_covers_pacing_plus_timeouts(monkeypatch):
+    leases = []
+    def claim(dest, limit, lease_s):
+        leases.append(lease_s)
+        return []
+    monkeypatch.setattr(dispatch, "claim_outbox", claim)
+    monkeypatch.setattr(dispatch, "DISPATCH_BATCH", 100)
+    monkeypatch.setattr(dispatch, "DISPATCH_RATE_PER_S", 20)
+    monkeypatch.setattr(dispatch, "DISPATCH_TIMEOUT_S", 15)
+    asyncio.run(dispatch.drain_destination("ACSC", dispatch.TokenBucket(20, 5), asyncio.Semaphore(1)))
+    assert leases == [100 / 20 + 2 * 15]
@@ -0,0 +1,82 @@
+import pytest
+from pydantic import ValidationError
+
+from tests.conftest import make_report
+
+def test_submit_from_ref_indexes_and_checks_duplicates(db):
+    (earlier, _), = db.save_reports([make_report(1)])
+    ref = db.save_draft(make_report(1))
+    rid = db.submit_from_ref(ref)
+    with db.connection() as c:
+        assert c.execute("SELECT count(*) FROM report_minhash WHERE report_id=?", (rid,)).fetchone()[0] == 1
+        assert c.execute("SELECT count(*) FROM lsh_buckets WHERE report_id=?", (rid,)).fetchone()[0] > 0
+        assert c.execute("SELECT status FROM reports WHERE id=?", (rid,)).fetchone()[0] == "submitted"
+    assert [r for r, _ in db.similar_reports(rid)] == [earlier]
+
+def test_submit_from_ref_only_submits_drafts(db):
+    ref = db.save_draft(make_report(2))
+    db.submit_from_ref(ref)
+    with db.connection() as c:
+        queued = c.execute("SELECT count(*) FROM outbox").fetchone()[0]
+    with pytest.raises(ValueError):
+        db.submit_from_ref(ref)
+    with pytest.raises(ValueError):
+        db.submit_from_ref("NOSUCHREF")
+    with db.connection() as c:
+        assert c.execute("SELECT count(*) FROM outbox").fetchone()[0] == queued
+
+def test_submit_from_ref_validates(db):
+    ref = db.save_draft({"reporter": {"first_name": "A"}, "organisation": {}, "purpose": {"purposes": []}, "incident": {}})
+    with pytest.raises(ValidationError):
+        db.submit_from_ref(ref)
+
+def test_draft_submitted_after_its_duplicate(db):
+    ref = db.save_draft(make_report(3))
+    (direct, _), = db.save_reports([make_report(3)])
+    rid = db.submit_from_ref(ref)
+    assert rid < direct
+    assert [r for r, _ in db.similar_reports(rid)] == [direct]
+    assert [r for r, _ in db.similar_reports(direct)] == [rid]
+    with db.connection() as c:
+        assert c.execute("SELECT report_id, duplicate_of FROM report_duplicates").fetchall() == [(direct, rid)]
+
+def test_versions_record_only_changed_sections(db):
+    first = make_report(4)
+    every = ["reporter", "organisation", "purpose", "incident", "ransomware"]
+    ref = db.save_draft(first)
+    db.save_draft(first, ref)  # unchanged: no new version
+    assert [(v, secs) for v, _, secs in db.draft_history(ref)] == [(1, every)]
+    second = make_report(4, narrative="the phishing email also reached the finance team")
+    db.save_draft(second, ref)
+    third = dict(second, organisation=dict(second["organisation"], jurisdiction="VIC"))
+    db.save_draft(third, ref)
+    assert [(v, secs) for v, _, secs in db.draft_history(ref)] == [(3, ["organisation"]), (2, ["incident"]), (1, every)]
+    assert db.load_draft(ref, 1) == dict(first, ransomware=None)
+    assert db.load_draft(ref, 2) == dict(second, ransomware=None)
+    assert db.load_draft(ref) == db.load_draft(ref, 3) == dict(third, ransomware=None)
+    assert db.load_draft("NOSUCHREF", 1) is None
+
+def test_saving_over_a_submitted_draft_fails(db):
+    ref = db.save_draft(make_report(5))
+    db.submit_from_ref(ref)
+    with pytest.raises(ValueError, match="already been submitted"):
+        db.save_draft(make_report(6), ref)
+    with db.connection() as c:
+        assert c.execute("SELECT status FROM reports WHERE ref=?", (ref,)).fetchone()[0] == "submitted"
+
+def test_page_loads_an_earlier_version(db):
+    from streamlit.testing.v1 import AppTest
+    from tests.conftest import page
+    ref = db.save_draft(make_report(7))
+    db.save_draft(make_report(7, narrative="a later and longer account of the incident"), ref)
+    at = AppTest.from_file(page("1_"), default_timeout=60)
+    at.query_params["ref"] = ref
+    at.run()
+    picker = next(s for s in at.selectbox if s.label == "Version")
+    assert [o.split(" · ")[0] for o in picker.options] == ["Version 2", "Version 1"]
+    picker.set_value(picker.options[1]).run()
+    next(b for b in at.button if b.label == "Load draft").click().run()
+    assert not at.exception
+    assert at.session_state["form_state"] == dict(make_report(7), ransomware=None)
+    narrative = next(t for t in at.text_area if t.label.startswith("Describe"))
+    assert narrative.value == make_report(7)["incident"]["narrative"]
@@ -0,0 +1,59 @@
+import io
+import csv
+import zipfile
+
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from tests.conftest import make_report
+from utils.export import FLAT_COLUMNS, deferred, export_csv, export_xlsx
+
+def _served(build) -> bytes:
+    """What download_button does with a deferred callable's result on click."""
+    data, _ = convert_data_to_bytes_and_infer_mime(build(), unsupported_error=TypeError("unsupported"))
+    return data
+
+def test_csv_download(db):
+    db.save_reports([make_report(i) for i in range(3)])
+    rows = list(csv.reader(io.StringIO(_served(deferred(lambda fh: export_csv(fh))).decode())))
+    assert rows[0] == FLAT_COLUMNS
+    assert len(rows) == 4
+
+def test_xlsx_download(db):
+    from openpyxl import load_workbook
+    db.save_reports([make_report(i) for i in range(3)])
+    ws = load_workbook(io.BytesIO(_served(deferred(lambda fh: export_xlsx(fh)))))["reports"]
+    assert ws.max_row == 4
+
+def test_attachment_downloads(db):
+    upload = io.BytesIO(b"evidence" * 1000)
+    upload.name = "log.txt"
+    rid = db.save_report(make_report(), [upload])
+    (a,) = db.list_attachments(rid)
+
+    def copy(fh):
+        for chunk in db.iter_attachment(a["id"]):
+            fh.write(chunk)
+    assert _served(deferred(copy)) == b"evidence" * 1000
+    with zipfile.ZipFile(io.BytesIO(_served(deferred(lambda fh: db.write_attachments_zip(rid, fh))))) as z:
+        assert z.read(z.namelist()[0]) == b"evidence" * 1000
+
+def test_shaping_workers_are_spawned(db, monkeypatch, tmp_path):
+    import sys
+    import types
+    import utils.export as export
+    # under Streamlit __main__ is the page script, which must not run again in the workers
+    script = tmp_path / "page.py"
+    script.write_text("raise RuntimeError('page script ran in a worker')\n")
+    page = types.ModuleType("__main__")
+    page.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", page)
+    contexts = []
+    class Pool(export.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            contexts.append(kwargs["mp_context"].get_start_method())
+            super().__init__(*args, **kwargs)
+    monkeypatch.setattr(export, "ProcessPoolExecutor", Pool)
+    db.save_reports([make_report(i) for i in range(3)])
+    chunks = list(export.iter_shaped(["OAIC"], workers=2, chunk_size=2))
+    assert contexts == ["spawn"]
+    assert [rid for chunk in chunks for rid, _ in chunk] == [1, 2, 3]
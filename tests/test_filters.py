@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import pytest
+
+from tests.conftest import make_report
+from utils.export import export_csv, export_ndjson
+from utils.models import ReportFilter
+
+def _report(i, jurisdiction, kind, occurred, purpose):
+    r = make_report(i)
+    r["organisation"]["jurisdiction"] = jurisdiction
+    r["incident"].update(type=kind, occurrence_date=occurred)
+    r["purpose"] = purpose
+    return r
+
+@pytest.fixture
+def reports(db):
+    cyber = {"purposes": ["Cybersecurity Incident"], "ci_member": "Yes",
+             "ci_sectors": ["Financial Services"], "consent_home_affairs": "Yes"}
+    ids = [
+        db.save_report(_report(0, "NSW", "Malware", "2026-01-10", {"purposes": ["Data Breach Incident"]})),
+        db.save_report(_report(1, "VIC", "Phishing", "2026-02-10", cyber)),
+        db.save_report(_report(2, "NSW", "Phishing", "2026-03-01",
+                               {"purposes": ["Data Breach Incident", "Cybersecurity Incident"]})),
+    ]
+    db.save_draft(_report(3, "NSW", "Malware", "2026-01-20", {"purposes": ["Data Breach Incident"]}))
+    return ids
+
+CASES = [
+    (ReportFilter(status="submitted"), [0, 1, 2]),
+    (ReportFilter(status="submitted", jurisdictions=["NSW"]), [0, 2]),
+    (ReportFilter(status="submitted", incident_types=["Phishing"]), [1, 2]),
+    (ReportFilter(ci_sectors=["Financial Services"]), [1]),
+    (ReportFilter(destinations=["OAIC"], status="submitted"), [0, 2]),
+    (ReportFilter(destinations=["APRA", "HomeAffairs"]), [1]),
+    (ReportFilter(occurred_from="2026-02-01", occurred_to="2026-02-28"), [1]),
+    (ReportFilter(jurisdictions=["VIC"], query="credential"), [1]),
+]
+
+@pytest.mark.parametrize("filters, expected", CASES)
+def test_listing_and_exports_apply_the_same_filters(db, reports, filters, expected):
+    want = [reports[i] for i in expected]
+    assert db.count_reports(filters=filters) == len(want)
+    assert sorted(db.fetch_reports_df(filters=filters)["ID"]) == want
+    assert [r[0] for rows in db.iter_report_rows(filters, chunk_size=1) for r in rows] == want
+    buf = io.BytesIO()
+    export_csv(buf, filters)
+    assert [int(r["id"]) for r in csv.DictReader(io.StringIO(buf.getvalue().decode()))] == want
+
+def test_pages_through_filtered_rows(db, reports):
+    filters = ReportFilter(jurisdictions=["NSW"])
+    seen, cursor = [], None
+    while True:
+        df, cursor = db.fetch_reports_page(page_size=1, cursor=cursor, filters=filters)
+        seen += df["Status"].tolist()
+        if cursor is None:
+            break
+    assert seen == ["draft", "submitted", "submitted"]
+    df, _ = db.fetch_reports_page(page_size=5, filters=filters.model_copy(update={"status": "submitted"}))
+    assert df["ID"].tolist() == [reports[2], reports[0]]
+
+def test_routed_export_only_holds_reports_due(db, reports, tmp_path):
+    paths = export_ndjson(str(tmp_path / "out"), ["OAIC", "APRA"], ReportFilter(status="submitted"),
+                          workers=1, routed=True)
+    with open(paths["OAIC"]) as f:
+        assert [json.loads(line)["organisation_name"] for line in f] == ["Org 0", "Org 2"]
+    with open(paths["APRA"]) as f:
+        assert [json.loads(line)["payload"]["organisation"]["name"] for line in f] == ["Org 1"]
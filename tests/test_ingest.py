@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tests.conftest import make_report
+from utils import ingest
+from utils.export import export_csv
+
+def _bad(i: int) -> dict:
+    r = make_report(i)
+    del r["reporter"]["email"]
+    return r
+
+def test_json_reader_accepts_object_list_and_wrapper():
+    r = make_report()
+    for body in (r, [r, r], {"reports": [r]}):
+        assert all(rec == r for rec in ingest.iter_json(io.StringIO(json.dumps(body))))
+    assert len(list(ingest.iter_json(io.StringIO(json.dumps([r, r]))))) == 2
+
+def test_ndjson_reader_rejects_a_bad_line_on_its_own():
+    text = json.dumps(make_report(0)) + "\n\n{not json\n" + json.dumps(make_report(1)) + "\n"
+    recs = list(ingest.iter_ndjson(io.StringIO(text)))
+    assert len(recs) == 3 and recs[0]["reporter"]["first_name"] == "Ann0"
+    assert isinstance(recs[1], ingest._Invalid) and recs[1].error.startswith("line 3:")
+    assert ingest.validate_record(recs[1]) == (None, [recs[1].error])
+
+def test_csv_round_trips_an_export(db):
+    ids = [db.save_report(make_report(i)) for i in range(3)]
+    buf = io.BytesIO()
+    export_csv(buf)
+    recs = list(ingest.iter_csv(io.StringIO(buf.getvalue().decode(), newline="")))
+    assert [r["reporter"]["first_name"] for r in recs] == ["Ann0", "Ann1", "Ann2"]
+    assert recs[0]["purpose"]["purposes"] == ["Data Breach Incident"]
+    assert [ingest.validate_record(r)[1] for r in recs] == [None] * 3
+    assert len(ids) == 3
+
+def test_results_per_chunk_in_order(db):
+    records = [make_report(0), _bad(1), make_report(2), "nope", make_report(4)]
+    results = list(ingest.ingest_records(records, chunk_size=2))
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert ["ref" in r for r in results] == [True, False, True, False, True]
+    assert results[3]["errors"] == ["record must be a JSON object"]
+    assert results[1]["errors"]
+    assert db.count_reports() == 3
+    assert len({r["id"] for r in results if "id" in r}) == 3
+
+def test_reader_failure_keeps_the_rows_before_it(db):
+    def records():
+        yield make_report(0)
+        yield make_report(1)
+        yield make_report(2)
+        raise csv.Error("boom")
+    got = []
+    with pytest.raises(csv.Error):
+        for r in ingest.ingest_records(records(), chunk_size=2):
+            got.append(r)
+    assert [r["index"] for r in got] == [0, 1, 2]
+    assert db.count_reports() == 3
+
+@pytest.fixture
+def server(db):
+    srv = ingest.IngestServer(("127.0.0.1", 0), token="s3cret")
+    srv.RequestHandlerClass.log_message = lambda *a: None
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def _post(srv, body: str, ctype: str, token: str = "s3cret"):
+    req = urllib.request.Request(f"http://127.0.0.1:{srv.server_port}/reports", data=body.encode(),
+                                 headers={"Content-Type": ctype, "Authorization": f"Bearer {token}"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+def test_http_clean_ndjson(server, db):
+    body = "".join(json.dumps(make_report(i)) + "\n" for i in range(3))
+    code, out = _post(server, body, "application/x-ndjson")
+    assert code == 200 and (out["accepted"], out["rejected"]) == (3, 0)
+    assert all(r["ref"] for r in out["results"])
+    assert db.count_reports() == 3
+
+def test_http_json_with_rejects(server, db):
+    code, out = _post(server, json.dumps({"reports": [make_report(0), _bad(1)]}), "application/json")
+    assert code == 200 and (out["accepted"], out["rejected"]) == (1, 1)
+    assert out["results"][1]["index"] == 1 and out["results"][1]["errors"]
+
+def test_http_csv_failing_mid_stream(server, db):
+    buf = io.BytesIO()
+    for i in range(2):
+        db.save_report(make_report(i))
+    export_csv(buf)
+    text = buf.getvalue().decode()
+    # a field over the csv module's size limit makes the reader raise on the third row
+    bad = text.splitlines()[1].replace("Ann0", '"' + "x" * (csv.field_size_limit() + 1) + '"', 1)
+    code, out = _post(server, text + bad + "\r\n", "text/csv")
+    assert code == 400
+    assert out["failed_index"] == 2 and (out["accepted"], out["rejected"]) == (2, 0)
+    assert "could not parse record 2: line 4:" in out["error"]
+    assert [r["index"] for r in out["results"]] == [0, 1]
+    assert db.count_reports() == 4
+
+def test_http_rejects_bad_token_and_type(server):
+    assert _post(server, "{}", "application/json", token="wrong")[0] == 401
+    assert _post(server, "{}", "text/plain")[0] == 415
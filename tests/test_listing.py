@@ -0,0 +1,40 @@
+from tests.conftest import make_report
+
+def test_pages_follow_the_cursor_newest_first(db):
+    ids = [db.save_report(make_report(i)) for i in range(7)]
+    seen, cursor, pages = [], None, 0
+    while True:
+        df, cursor = db.fetch_reports_page(page_size=3, cursor=cursor)
+        seen += df["ID"].tolist()
+        pages += 1
+        if cursor is None:
+            break
+        assert cursor == df["ID"].iloc[-1]
+    assert pages == 3 and seen == ids[::-1]
+    assert db.count_reports() == 7
+
+def test_exact_multiple_has_no_empty_last_page(db):
+    for i in range(4):
+        db.save_report(make_report(i))
+    df, cursor = db.fetch_reports_page(page_size=2)
+    df, cursor = db.fetch_reports_page(page_size=2, cursor=cursor)
+    assert len(df) == 2 and cursor is None
+
+def test_summary_columns(db):
+    rid = db.save_report(make_report(1, narrative="n" * 200))
+    partial = make_report(2)
+    partial["reporter"] = {"first_name": "Dee"}
+    partial["incident"] = {}
+    ref = db.save_draft(partial)
+    df, _ = db.fetch_reports_page()
+    assert list(df.columns) == db.SUMMARY_COLUMNS
+    draft, report = df.to_dict("records")
+    assert report == {
+        "ID": rid, "Ref": report["Ref"], "Status": "submitted", "Created": report["Created"],
+        "Reporter": "Ann1 Lee", "Email": "a1@example.com", "Organisation": "Org 1",
+        "Jurisdiction": "NSW", "Incident Type": "Malware", "Summary": "Malware — " + "n" * 80,
+    }
+    assert (draft["Ref"], draft["Status"], draft["Reporter"], draft["Email"], draft["Summary"]) == \
+        (ref, "draft", "Dee ", "", " — ")
+    assert draft["Organisation"] == "Org 2"
+    assert db.fetch_reports_df().equals(df)
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from tests.conftest import page
+from utils import config, metrics
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+def _row(op: str) -> dict:
+    df = metrics.summary_df()
+    return df[df["Operation"] == op].iloc[0].to_dict()
+
+def test_off_means_untouched(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    def fn():
+        return 1
+    assert metrics.timed("x")(fn) is fn
+    with metrics.span("x") as s:
+        s.rows = 3
+    assert metrics.start("x") is s and "x" not in set(metrics.summary_df()["Operation"])
+
+def test_timed_records_calls_rows_bytes_and_errors(enabled):
+    @metrics.timed("t.fn", rows=len, size=lambda r: 10 * len(r))
+    def fn(n):
+        if n < 0:
+            raise ValueError(n)
+        return [0] * n
+
+    fn(3), fn(5)
+    with pytest.raises(ValueError):
+        fn(-1)
+    row = _row("t.fn")
+    assert (row["Calls"], row["Errors"], row["Mean rows"], row["Mean bytes"]) == (3, 1, 4.0, 40)
+
+def test_timed_generator_sums_items_and_closes(enabled):
+    @metrics.timed("t.gen", rows=len)
+    def gen():
+        for i in range(4):
+            yield [i] * 2
+
+    assert len(list(gen())) == 4
+    g = gen()
+    next(g)
+    g.close()  # abandoned early: recorded, not as an error
+    df = metrics.summary_df().set_index("Operation")
+    assert df.loc["t.gen", "Calls"] == 2 and df.loc["t.gen", "Errors"] == 0
+    assert df.loc["t.gen", "Mean rows"] == 5.0  # (8 + 2) / 2
+
+def test_quantiles_stay_inside_their_bucket():
+    h = metrics.Histogram((1, 2, 4))
+    for v in (0.5, 1.5, 1.5, 3.0, 10.0):
+        h.observe(v)
+    assert h.counts == [1, 2, 1, 1]
+    assert 1 <= h.quantile(0.5) <= 2
+    assert 4 <= h.quantile(0.99) <= 10.0
+    assert metrics.Histogram((1,)).quantile(0.5) is None
+
+def test_prometheus_text_is_cumulative(enabled, tmp_path):
+    for v in (0.0001, 0.003, 0.2, 30.0):
+        metrics.record("t.op", v, rows=7)
+    metrics.record("t.op", 0.001, error=True)
+    lines = metrics.prometheus_text().splitlines()
+    buckets = [int(l.rsplit(" ", 1)[1]) for l in lines if l.startswith('srt_op_seconds_bucket{op="t.op"')]
+    assert buckets == sorted(buckets) and buckets[-1] == 5
+    assert 'srt_op_seconds_count{op="t.op"} 5' in lines
+    assert 'srt_op_rows_count{op="t.op"} 4' in lines
+    assert 'srt_op_errors_total{op="t.op"} 1' in lines
+    assert not any(l.startswith("srt_op_bytes_") for l in lines)
+    path = metrics.write_prometheus("t", str(tmp_path))
+    assert os.listdir(tmp_path) == ["t.prom"]
+    with open(path) as f:
+        assert f.read() == metrics.prometheus_text()
+
+def test_performance_page(enabled, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", False)
+    at = AppTest.from_file(page("3_"), default_timeout=30).run()
+    assert "SRT_METRICS=1" in at.info[0].value and not at.dataframe
+
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    at = AppTest.from_file(page("3_"), default_timeout=30).run()
+    assert "Nothing recorded yet" in at.markdown[-1].value
+    metrics.record("storage.count_reports", 0.002)
+    metrics.record("export.csv", 0.5, rows=100)
+    at.run()
+    assert set(at.dataframe[0].value["Operation"]) == {"storage.count_reports", "export.csv"}
+    at.selectbox[0].set_value("export").run()
+    assert at.dataframe[0].value["Operation"].tolist() == ["export.csv"]
+    next(b for b in at.button if b.label == "Reset").click().run()
+    assert not at.dataframe and metrics.summary_df().empty
@@ -0,0 +1,25 @@
+import struct
+
+from tests.conftest import make_report
+from utils.payload import CODEC
+from utils.submission import prepare_report
+
+def test_new_dictionary_is_used_without_restart(db):
+    db.save_reports([make_report(i) for i in range(120)])
+    first = db.train_payload_dict()
+    sections = prepare_report(make_report(500)).sections
+    with db.connection() as c:
+        _, payload = db._stored_sections(c, sections, packed=True)
+        assert struct.unpack_from(">cI", payload)[1] == first
+        # as `manage.py pack-payloads --retrain` would, from another process
+        with db.sqlite3.connect(db.DB_PATH) as other:
+            newer = other.execute("INSERT INTO payload_dicts(codec, dict, samples) VALUES (?,?,?)",
+                                  (CODEC, b"", 0)).lastrowid
+        _, payload = db._stored_sections(c, sections, packed=True)
+        assert struct.unpack_from(">cI", payload)[1] == newer
+
+def test_packed_rows_read_back(db):
+    db.save_reports([make_report(i) for i in range(120)])
+    before = list(db.iter_report_rows())
+    db.pack_reports()
+    assert list(db.iter_report_rows()) == before
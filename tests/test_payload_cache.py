@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from tests.conftest import make_report
+from tests.test_retention import _age
+from utils.routing import shape_for_destination
+
+def _no_shaping(*args):
+    raise AssertionError("shaped again")
+
+def _cached(db) -> int:
+    with db.connection() as c:
+        return c.execute("SELECT count(*) FROM destination_payloads").fetchone()[0]
+
+def test_served_from_cache_until_the_report_changes(db, monkeypatch):
+    ref = db.save_draft(make_report(1))
+    rid = int(db.fetch_reports_df()["ID"].iloc[0])
+    first = db.get_destination_json(rid, "OAIC")
+    assert json.loads(first) == shape_for_destination("oaic", db.load_draft(ref))
+    with monkeypatch.context() as m:
+        m.setattr(db, "shape_for_destination", _no_shaping)
+        assert db.get_destination_json(rid, " oaic ") == first
+    db.save_draft(make_report(1, narrative="rewritten narrative for the breach"), ref)
+    assert _cached(db) == 0
+    assert json.loads(db.get_destination_json(rid, "OAIC"))["narrative"] == "rewritten narrative for the breach"
+
+def test_schema_change_misses(db, monkeypatch):
+    rid = db.save_report(make_report(1))
+    db.get_destination_json(rid, "ACSC")
+    monkeypatch.setattr(db, "SCHEMA_VERSION", "next")
+    monkeypatch.setattr(db, "shape_for_destination", _no_shaping)
+    with pytest.raises(AssertionError, match="shaped again"):
+        db.get_destination_json(rid, "ACSC")
+
+def test_archived_reports_are_shaped_without_caching(db):
+    rid = db.save_report(make_report(1))
+    _age(db, 400)
+    db.archive_reports()
+    assert json.loads(db.get_destination_json(rid, "OAIC"))["organisation_name"] == "Org 1"
+    assert _cached(db) == 0
+    with pytest.raises(ValueError):
+        db.get_destination_json(rid + 1, "OAIC")
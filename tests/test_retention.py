@@ -0,0 +1,49 @@
+import os
+
+from tests.conftest import make_report
+from utils.models import ReportFilter
+
+def _age(storage, days: int):
+    """Backdate every report and mark its deliveries done, so all of them are archivable."""
+    with storage.transaction() as c:
+        c.execute("UPDATE reports SET created_at = datetime('now', ?)", (f"-{days} days",))
+        c.execute("UPDATE outbox SET status = 'delivered'")
+
+def test_first_archive_of_a_month(db):
+    db.save_reports([make_report(i) for i in range(3)])
+    _age(db, 400)
+    assert not os.path.exists(db.ARCHIVE_DIR)
+    out = db.run_retention()
+    assert sum(out["archived"].values()) == 3
+    assert db.count_reports() == 0
+    assert db.count_reports(filters=ReportFilter(archived=True)) == 3
+    assert dict(db.fetch_rollups()["status"])["submitted"] == 3
+
+def test_archive_written_before_payload_column(db):
+    db.save_reports([make_report(1)])
+    _age(db, 400)
+    (month,) = db.archive_reports()
+    with db.connection() as c:
+        c.execute("ATTACH DATABASE ? AS old", (db.archive_path(month),))
+        c.execute("ALTER TABLE old.reports DROP COLUMN payload")
+        c.execute("DETACH DATABASE old")
+    assert db.count_reports(filters=ReportFilter(archived=True)) == 1
+
+def test_purge_clears_archived_rollups(db):
+    db.save_reports([make_report(i) for i in range(2)])
+    _age(db, 400)
+    db.archive_reports()
+    before = db.data_version()
+    db.purge_all()
+    assert db.fetch_rollups() == {}
+    assert db.data_version() > before
+    assert db.count_reports(filters=ReportFilter(archived=True)) == 0
+
+def test_rebuild_rollups_invalidates_caches(db):
+    db.save_reports([make_report(1)])
+    with db.transaction() as c:
+        c.execute("UPDATE report_rollups SET n = 99 WHERE dimension = 'status'")
+    before = db.data_version()
+    db.rebuild_rollups()
+    assert db.data_version() > before
+    assert dict(db.fetch_rollups()["status"])["submitted"] == 1
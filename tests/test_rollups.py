@@ -0,0 +1,68 @@
+import pytest
+
+from tests.conftest import make_report
+from tests.test_retention import _age
+
+def _rollups(db) -> dict:
+    out = db.fetch_rollups()
+    avg = out.pop("avg_minutes_to_identify", None)
+    return {"avg": pytest.approx(avg) if avg is not None else None,
+            **{dim: sorted(values) for dim, values in out.items()}}
+
+def test_incremental_rollups_equal_a_full_rebuild(db):
+    db.save_reports([make_report(i) for i in range(5)])
+    _age(db, 400)
+    db.archive_reports()
+    kept = db.save_report(make_report(5))
+    ref = db.save_draft(make_report(6))
+    changed = make_report(6)
+    changed["organisation"]["jurisdiction"] = "VIC"
+    changed["incident"].update(type="Phishing", identified_date="2026-01-12")
+    changed["purpose"]["purposes"] = ["Data Breach Incident", "Medical Device Incident"]
+    db.save_draft(changed, ref)
+    db.submit_from_ref(ref)
+    db.save_draft(make_report(7))
+    with db.transaction() as c:
+        c.execute("UPDATE reports SET created_at = datetime('now', '-90 days') WHERE status = 'draft'")
+        c.execute("UPDATE draft_versions SET created_at = datetime('now', '-90 days')")
+    assert db.expire_drafts(30) == 1
+    db.pack_reports()
+    with db.transaction() as c:
+        c.execute("DELETE FROM reports WHERE id = ?", (kept,))
+
+    live = _rollups(db)
+    db.rebuild_rollups()
+    assert _rollups(db) == live
+    assert dict(live["status"]) == {"submitted": 6}
+    assert dict(live["jurisdiction"]) == {"NSW": 5, "VIC": 1}
+    assert dict(live["purpose"]) == {"Data Breach Incident": 6, "Medical Device Incident": 1}
+
+def _days(db) -> dict:
+    return dict(db.fetch_rollups().get("day", []))
+
+def test_promoted_draft_counts_on_its_submission_day(db, monkeypatch):
+    ref = db.save_draft(make_report(1))
+    with db.transaction() as c:
+        c.execute("UPDATE reports SET created_at = '2026-01-05 09:00:00'")
+        today = c.execute("SELECT date('now')").fetchone()[0]
+    assert _days(db) == {}
+    db.submit_from_ref(ref)
+    assert _days(db) == {today: 1}
+    db.rebuild_rollups()
+    assert _days(db) == {today: 1}
+
+def test_old_triggers_are_replaced(db, monkeypatch):
+    db.save_report(make_report(1))
+    with db.connection() as c:
+        for t in ("ai", "au", "ad"):
+            c.execute(f"DROP TRIGGER report_rollups_{t}")
+        c.execute("ALTER TABLE reports DROP COLUMN submitted_at")
+        # stands in for a trigger from before the column existed
+        c.execute("CREATE TRIGGER report_rollups_au AFTER UPDATE OF status ON reports BEGIN SELECT 1; END")
+    monkeypatch.setattr(db, "_schema_ready", False)
+    db.init_db()
+    with db.connection() as c:
+        triggers = dict(c.execute("SELECT name, sql FROM sqlite_master WHERE name LIKE 'report_rollups_%'"))
+    assert sorted(triggers) == ["report_rollups_ad", "report_rollups_ai", "report_rollups_au"]
+    assert "submitted_at" in triggers["report_rollups_au"]
+    assert _days(db) == {db.fetch_reports_df()["Created"].iloc[0][:10]: 1}
@@ -0,0 +1,109 @@
+import pytest
+
+from tests.conftest import make_report
+from utils.routing import REDACTED, SCHEMAS, compile_schema, shape_batch, shape_for_destination
+from utils.submission import prepare_report
+
+# the hand-written shapes the schemas replaced, kept as the reference output
+def _pick(d: dict, keys: list):
+    return {k: d.get(k) for k in keys}
+
+def _acsc(p):
+    return {
+        "destination": "ACSC",
+        "reporter": _pick(p.get("reporter", {}), ["first_name", "surname", "email", "phone"]),
+        "organisation": _pick(p.get("organisation", {}), ["name", "abn", "jurisdiction", "postcode", "country", "address"]),
+        "purpose": p.get("purpose", {}),
+        "incident": p.get("incident", {}),
+        "ransomware": p.get("ransomware"),
+    }
+
+def _home_affairs(p):
+    purpose = p.get("purpose", {})
+    return {
+        "destination": "Home Affairs",
+        "ci_member": purpose.get("ci_member"),
+        "ci_sectors": purpose.get("ci_sectors", []),
+        "consent_home_affairs": purpose.get("consent_home_affairs"),
+        "reporter": p.get("reporter", {}),
+        "organisation": p.get("organisation", {}),
+        "incident": p.get("incident", {}),
+        "ransomware": p.get("ransomware"),
+    }
+
+def _oaic(p):
+    inc, org = p.get("incident", {}), p.get("organisation", {})
+    return {
+        "destination": "OAIC",
+        "organisation_name": org.get("name"),
+        "jurisdiction": org.get("jurisdiction"),
+        "incident_type": inc.get("type"),
+        "occurrence_date": inc.get("occurrence_date"),
+        "identified_date": inc.get("identified_date"),
+        "narrative": inc.get("narrative"),
+        "customers_impacted": inc.get("customers_impacted"),
+    }
+
+REFERENCE = {
+    "acsc": _acsc,
+    "homeaffairs": _home_affairs,
+    "oaic": _oaic,
+    **{d: (lambda label: lambda p: {"destination": label, "payload": p})(d.upper())
+       for d in ("apra", "asic", "rba", "tga", "accc/cdr", "accc", "cdr")},
+}
+
+def _full() -> dict:
+    r = make_report(1)
+    r["purpose"] = {"purposes": ["Cybersecurity Incident"], "ci_member": "Yes", "ci_sectors": ["Energy"],
+                    "consent_home_affairs": "Yes"}
+    r["ransomware"] = {"payment_demanded": "BTC", "communicated_with_extorter": "No"}
+    return prepare_report(r).report.model_dump()
+
+PAYLOADS = [
+    _full(),
+    {"reporter": {"email": "a@example.com"}, "incident": {"type": "Malware"}},  # sparse
+    {},
+]
+
+def test_every_schema_has_a_reference():
+    assert set(SCHEMAS) == set(REFERENCE)
+
+@pytest.mark.parametrize("dest", sorted(REFERENCE))
+def test_projection_matches_reference(dest):
+    expected = [REFERENCE[dest](p) for p in PAYLOADS]
+    assert [shape_for_destination(dest, p) for p in PAYLOADS] == expected
+    assert shape_batch(dest, PAYLOADS) == expected
+    assert shape_batch(dest, []) == []
+
+def test_destination_names_are_normalised_and_unknown_ones_pass_through():
+    p = PAYLOADS[0]
+    assert shape_for_destination(" OAIC ", p) == _oaic(p)
+    assert shape_for_destination("Nowhere", p) == {"destination": "nowhere", "payload": p}
+    assert shape_batch("Nowhere", [p]) == [{"destination": "nowhere", "payload": p}]
+
+def test_defaults_are_fresh_per_report():
+    a, b = shape_batch("homeaffairs", [{}, {}])
+    a["ci_sectors"].append("x")
+    assert b["ci_sectors"] == []
+
+def test_pick_redact_and_when():
+    project, project_batch = compile_schema({
+        "destination": "TEST",
+        "contact": {"path": "reporter", "default": {}, "pick": ["email", "phone"]},
+        "org": {"path": "organisation", "redact": ["abn"]},
+        "abn_reason": {"path": "organisation.abn_reason", "when": ("organisation.abn_status", "no_abn")},
+        "deep": {"path": "incident.details.code", "default": "none"},
+    })
+    with_abn = {"reporter": {"email": "a@example.com", "surname": "Lee"},
+                "organisation": {"name": "Org", "abn": "51 824 753 556", "abn_status": "has_abn"},
+                "incident": {"details": {"code": "X1"}}}
+    no_abn = {"organisation": {"name": "Org", "abn_status": "no_abn", "abn_reason": "sole trader"}}
+    expected = [
+        {"destination": "TEST", "contact": {"email": "a@example.com", "phone": None},
+         "org": {"name": "Org", "abn": REDACTED, "abn_status": "has_abn"}, "deep": "X1"},
+        {"destination": "TEST", "contact": {"email": None, "phone": None},
+         "org": {"name": "Org", "abn_status": "no_abn", "abn_reason": "sole trader"},
+         "abn_reason": "sole trader", "deep": "none"},
+    ]
+    assert [project(with_abn), project(no_abn)] == expected
+    assert project_batch([with_abn, no_abn]) == expected
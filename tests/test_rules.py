@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from tests.conftest import make_report
+from utils.rules import audit_reports, evaluate
+from utils.validators import is_valid_abn, is_valid_email, valid_abn_mask, valid_email_mask
+
+ABNS = {
+    "51 824 753 556": True,
+    "51824753556": True,
+    " 53 004 085 616 ": True,
+    "51 824 753 557": False,   # checksum
+    "61 824 753 556": False,
+    "5182475355": False,       # ten digits
+    "51-824-753-556": False,
+    "": False,
+}
+
+@pytest.mark.parametrize("abn, valid", ABNS.items())
+def test_abn_checksum(abn, valid):
+    assert is_valid_abn(abn) is valid
+
+def test_abn_and_email_masks_match_single_checks():
+    abns = pd.Series(list(ABNS) + [None])
+    assert valid_abn_mask(abns).tolist() == [is_valid_abn(a) for a in ABNS] + [False]
+    emails = ["a@b.co", "a@b", "a b@c.de", "", None]
+    assert valid_email_mask(pd.Series(emails)).tolist() == [is_valid_email(e) for e in emails]
+
+ODD_VALUES = [
+    {"incident": {"occurrence_date": "20260111", "occurrence_time": "10:00"}},
+    {"incident": {"occurrence_date": "2026-02-30", "identified_time": "23:59:60"}},
+    {"incident": {"identified_date": "2026-1-5", "occurrence_time": "10:00:00.5"}},
+    {"organisation": {"abn": "51 824 753 557"}, "reporter": {"email": "not-an-email"}},
+    {"organisation": {"abn_status": "no_abn", "abn": "", "jurisdiction": "ACT"}},
+    {"purpose": {"purposes": ["Cybersecurity Incident", "Ransomware/Cyber Extortion Payment"], "ci_member": "Yes"}},
+    {"reporter": {"first_name": ""}, "incident": {"type": "Other"}},
+    {},
+]
+
+def _merged(i: int, changes: dict) -> dict:
+    report = make_report(i)
+    for section, fields in changes.items():
+        report[section] = {**report[section], **fields}
+    return report
+
+def test_live_and_bulk_checks_agree(db):
+    refs = [db.save_draft(_merged(i, changes)) for i, changes in enumerate(ODD_VALUES)]
+    audit = audit_reports(problems_only=False).set_index("Ref")
+    for ref in refs:
+        required, filled, missing, invalid = evaluate(db.load_draft(ref))
+        row = audit.loc[ref]
+        assert row["Complete %"] == int(100 * filled / max(required, 1)), ref
+        assert row["Missing"] == ",".join(missing), ref
+        assert row["Invalid"] == ",".join(invalid), ref
+    assert audit.loc[refs[0], "Invalid"] == "incident.occurrence_date,incident.occurrence_time"
+    assert audit.loc[refs[-1], "Invalid"] == ""
@@ -0,0 +1,36 @@
+from tests.conftest import make_report
+
+def _ids(db, query):
+    return db.fetch_reports_df(query)["ID"].tolist()
+
+def test_prefix_matching_on_every_word(db):
+    a = db.save_report(make_report(0, narrative="phishing email led to credential theft"))
+    b = db.save_report(make_report(1, narrative="ransomware encrypted the file server"))
+    assert _ids(db, "phish") == [a]
+    assert _ids(db, "cred phi") == [a]
+    assert _ids(db, "ransom phish") == []
+    assert set(_ids(db, "malw")) == {a, b}  # incident type is indexed too
+    assert _ids(db, "org 1") == [b]
+    assert _ids(db, "a1@example") == [b]
+
+def test_best_match_first(db):
+    strong = db.save_report(make_report(0, narrative="ransomware ransomware ransomware"))
+    weak = db.save_report(make_report(1, narrative="a long account of the day in which, among many other "
+                                                  "things that happened across the network, ransomware was seen"))
+    assert _ids(db, "ransomware") == [strong, weak]
+    df, cursor = db.fetch_reports_page(query="ransomware")
+    assert df["ID"].tolist() == [weak, strong] and cursor is None  # the listing stays newest first
+    assert db.count_reports("ransomware") == 2
+
+def test_ref_and_punctuation(db):
+    ref = db.save_draft(make_report(0))
+    rid = db.fetch_reports_df()["ID"].iloc[0]
+    assert _ids(db, ref[:4].lower()) == [rid]
+    assert _ids(db, "o'brien \"*") == []
+    assert len(_ids(db, "  ")) == 1  # no words: no search
+
+def test_index_follows_updates(db):
+    ref = db.save_draft(make_report(0, narrative="old wording about a lost laptop"))
+    db.save_draft(make_report(0, narrative="new wording about a stolen phone"), ref)
+    assert _ids(db, "laptop") == []
+    assert len(_ids(db, "stolen")) == 1
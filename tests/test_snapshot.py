@@ -0,0 +1,42 @@
+import os
+import json
+
+from tests.conftest import make_report
+from tests.test_retention import _age
+from utils.config import SNAPSHOT_DIR
+from utils.snapshot import export_snapshot, read_snapshot
+
+def test_late_submitted_draft_is_exported(db):
+    ref = db.save_draft(make_report(1))
+    db.save_reports([make_report(2)])
+    assert export_snapshot() == 1
+    draft_id = db.submit_from_ref(ref)
+    assert export_snapshot() == 1
+    assert export_snapshot() == 0
+    assert sorted(read_snapshot(["id"])["id"]) == sorted([draft_id, draft_id + 1])
+
+def test_archived_before_snapshot_is_exported(db):
+    db.save_reports([make_report(i) for i in range(3)])
+    _age(db, 400)
+    db.archive_reports()
+    db.save_reports([make_report(9)])
+    assert export_snapshot() == 4
+    assert len(read_snapshot(["id"])) == 4
+
+def test_snapshot_from_before_submission_order(db):
+    db.save_reports([make_report(i) for i in range(2)])
+    export_snapshot()
+    with open(os.path.join(SNAPSHOT_DIR, "_state.json"), "w") as fh:
+        json.dump({"last_id": 2}, fh)
+    db.save_reports([make_report(3)])
+    assert export_snapshot() == 1
+
+def test_purge_drops_the_snapshot(db):
+    db.save_reports([make_report(i) for i in range(3)])
+    assert export_snapshot() == 3
+    db.purge_all()
+    assert not os.path.exists(SNAPSHOT_DIR)
+    assert read_snapshot(["id"]).empty
+    (rid, _), = db.save_reports([make_report(9)])
+    assert export_snapshot() == 1
+    assert read_snapshot(["id"])["id"].tolist() == [rid]
@@ -0,0 +1,52 @@
+import datetime as dt
+
+from streamlit.testing.v1 import AppTest
+
+from tests.conftest import page
+
+TEXT = {
+    "First name *": "Ann", "Surname *": "Lee", "Phone number *": "0400 000 000", "Email address *": "ann@example.com",
+    "Organisation name *": "Example Pty Ltd", "Organisation address *": "1 Example St", "ABN *": "51 824 753 556",
+}
+
+def _filled() -> AppTest:
+    at = AppTest.from_file(page("1_"), default_timeout=60)
+    at.run()
+    next(s for s in at.selectbox if s.label == "State/Territory or Overseas *").set_value("NSW").run()
+    next(m for m in at.multiselect if m.label == "Purpose(s) for reporting *").set_value(["Data Breach Incident"]).run()
+    for t in at.text_input:
+        if t.label in TEXT:
+            t.input(TEXT[t.label])
+    next(t for t in at.text_area if t.label.startswith("Describe")).input("Phishing led to credential theft")
+    at.date_input[0].set_value(dt.date(2026, 1, 1))
+    at.date_input[1].set_value(dt.date(2026, 1, 2))
+    at.time_input[0].set_value(dt.time(10, 0))
+    at.time_input[1].set_value(dt.time(11, 0))
+    at.run()
+    return at
+
+def _click(at: AppTest, label: str):
+    next(b for b in at.button if b.label == label).click().run()
+    assert not at.exception, [e.value for e in at.exception]
+
+def test_submit_after_draft_then_submit_again(db):
+    at = _filled()
+    _click(at, "💾 Save for later")
+    ref = at.query_params["ref"]
+    assert db.is_draft(ref)
+    _click(at, "Submit report")
+    assert "Report submitted" in at.success[0].value
+    assert not db.is_draft(ref)
+    assert "ref" not in at.query_params
+    _click(at, "Submit report")
+    assert not at.error, [e.value for e in at.error]
+    assert "Report submitted" in at.success[0].value
+    assert db.count_reports() == 2
+
+def test_unknown_ref_in_url_still_submits(db):
+    at = _filled()
+    at.query_params["ref"] = "NOSUCHREF"
+    at.run()
+    _click(at, "Submit report")
+    assert not at.error, [e.value for e in at.error]
+    assert db.count_reports() == 1
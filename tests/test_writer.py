@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.conftest import make_report
+from utils.writer import GroupCommitWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def table(tmp_path):
+    path = str(tmp_path / "w.db")
+    with sqlite3.connect(path) as c:
+        c.execute("CREATE TABLE t (v INTEGER UNIQUE)")
+    return path
+
+def _insert(c, v):
+    c.execute("INSERT INTO t VALUES (?)", (v,))
+    return v
+
+def _count(path) -> int:
+    with sqlite3.connect(path) as c:
+        return c.execute("SELECT count(*) FROM t").fetchone()[0]
+
+def test_futures_resolve_only_once_committed(table):
+    w = GroupCommitWriter(lambda: sqlite3.connect(table, isolation_level=None, check_same_thread=False),
+                          max_wait=0.01)
+    seen = []
+    futs = [w.submit(_insert, i) for i in range(50)]
+    for f in futs:
+        # another connection must already see the row when the future completes
+        f.add_done_callback(lambda f: seen.append(sqlite3.connect(table).execute(
+            "SELECT count(*) FROM t WHERE v=?", (f.result(),)).fetchone()[0]))
+    assert [f.result(timeout=5) for f in futs] == list(range(50))
+    w.close()
+    assert seen == [1] * 50
+
+def test_failing_job_only_rolls_back_itself(table):
+    w = GroupCommitWriter(lambda: sqlite3.connect(table, isolation_level=None, check_same_thread=False),
+                          max_wait=0.05)
+    futs = [w.submit(_insert, v) for v in (1, 2, 1, 3)]
+    w.close()
+    assert [f.exception() is None for f in futs] == [True, True, False, True]
+    assert isinstance(futs[2].exception(), sqlite3.IntegrityError)
+    assert _count(table) == 3
+
+def test_close_flushes_queued_jobs(table):
+    gate = threading.Event()
+    w = GroupCommitWriter(lambda: sqlite3.connect(table, isolation_level=None, check_same_thread=False))
+    w.submit(lambda c: gate.wait(5))
+    futs = [w.submit(_insert, i) for i in range(300)]  # more than one batch
+    gate.set()
+    w.close()
+    assert all(f.done() and f.exception() is None for f in futs)
+    assert _count(table) == 300
+
+def test_storage_write_behind_shares_commits(db, monkeypatch):
+    monkeypatch.setattr(db, "WRITE_BEHIND", True)
+    monkeypatch.setattr(db, "_writer", None)
+    with ThreadPoolExecutor(8) as pool:
+        ids = list(pool.map(lambda i: db.save_report(make_report(i)), range(40)))
+    ref = db.save_draft(make_report(99))
+    assert db.submit_from_ref(ref) not in ids
+    db._writer.close()
+    assert len(set(ids)) == 40 and db.count_reports() == 41
+
+_CHILD = """
+import os, signal, sys
+sys.path.insert(0, {root!r})
+from tests.conftest import make_report
+from utils import storage
+futs = [storage.save_report_async(make_report(i)) for i in range(200)]
+ids = [f.result() for f in futs]
+print(len(set(ids)), flush=True)
+os.kill(os.getpid(), signal.SIGKILL)  # no atexit, no writer close, no checkpoint
+"""
+
+def test_acknowledged_writes_survive_a_crash(db, tmp_path):
+    env = dict(os.environ, SRT_WRITE_BEHIND="1")
+    proc = subprocess.run([sys.executable, "-c", _CHILD.format(root=ROOT)], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == -9 and proc.stdout.strip() == "200", proc.stderr
+    assert db.count_reports() == 200
+    with db.connection() as c:
+        assert c.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
@@ -0,0 +1,69 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import mimetypes
+
+from utils.config import ATTACH_DIR
+
+CHUNK_SIZE = 1024 * 1024
+
+def blob_path(sha256: str) -> str:
+    """Where the content with this SHA-256 lives (fanned out by the first byte)."""
+    return os.path.join(ATTACH_DIR, sha256[:2], sha256)
+
+def store_upload(f) -> dict:
+    """Stream an uploaded file into the content-addressed store.
+
+    The file is copied in CHUNK_SIZE pieces while hashing, then moved into
+    place under its SHA-256; identical content is stored only once. Returns
+    the metadata row for the `attachments` table, plus `new`: whether this
+    call added the blob.
+    """
+    name = getattr(f, "name", None) or "file"
+    os.makedirs(ATTACH_DIR, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=ATTACH_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if hasattr(f, "seek"):
+                f.seek(0)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        digest = h.hexdigest()
+        dest = blob_path(digest)
+        new = not os.path.exists(dest)
+        if not new:
+            os.remove(tmp)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return {
+        "filename": name,
+        "sha256": digest,
+        "size": size,
+        "mime_type": getattr(f, "type", None) or mimetypes.guess_type(name)[0],
+        "new": new,
+    }
+
+def discard_blobs(sha256s):
+    """Remove blobs from the store, e.g. uploads whose report was never saved."""
+    for sha in sha256s:
+        try:
+            os.remove(blob_path(sha))
+        except FileNotFoundError:
+            pass
+
+def iter_file(path: str, chunk_size: int = CHUNK_SIZE):
+    with open(path, "rb") as fh:
+        yield from iter(lambda: fh.read(chunk_size), b"")
+
+def purge_store():
+    shutil.rmtree(ATTACH_DIR, ignore_errors=True)
@@ -0,0 +1,54 @@
+"""Shared, version-stamped caches over the storage read functions.
+
+Every cached call is keyed on its arguments plus `storage.data_version()`,
+which the database bumps on each write to reports. Results are shared
+across sessions and stop being served as soon as the data changes.
+"""
+import streamlit as st
+
+from utils import storage
+from utils.models import ReportFilter
+
+_seen_version = None
+
+def _version() -> int:
+    """Current data version; drops every cached entry the first time it moves."""
+    global _seen_version
+    v = storage.data_version()
+    if v != _seen_version:
+        if _seen_version is not None:
+            for fn in (_reports_page, _count_reports, _attachments, _rollups):
+                fn.clear()
+        _seen_version = v
+    return v
+
+def _filters_key(filters) -> str:
+    return (filters or ReportFilter()).model_dump_json()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _reports_page(version, page_size, cursor, filters_json):
+    return storage.fetch_reports_page(page_size, cursor, filters=ReportFilter.model_validate_json(filters_json))
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _count_reports(version, filters_json):
+    return storage.count_reports(filters=ReportFilter.model_validate_json(filters_json))
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _attachments(version, report_id):
+    return storage.list_attachments(report_id)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _rollups(version):
+    return storage.fetch_rollups()
+
+def reports_page(page_size: int, cursor=None, filters: ReportFilter | None = None):
+    return _reports_page(_version(), page_size, cursor, _filters_key(filters))
+
+def count_reports(filters: ReportFilter | None = None) -> int:
+    return _count_reports(_version(), _filters_key(filters))
+
+def list_attachments(report_id: int) -> list:
+    return _attachments(_version(), report_id)
+
+def rollups() -> dict:
+    return _rollups(_version())
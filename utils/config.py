@@ -1,3 +1,63 @@
+import os
+
 APP_NAME = "Single Reporting Tool"
 DB_PATH = "data/reports.db"
 ATTACH_DIR = "data/attachments"
+SNAPSHOT_DIR = "data/snapshot"
+
+# SQLite tuning (see utils.storage.connection)
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT_MS = 5000
+DB_CACHE_SIZE_KIB = 32 * 1024
+DB_MMAP_SIZE = 256 * 1024 * 1024
+
+# write-behind: route report/draft writes through a single group-commit writer thread
+WRITE_BEHIND = os.getenv("SRT_WRITE_BEHIND", "0") == "1"
+WRITE_BATCH_MAX = 256
+WRITE_BATCH_WAIT_MS = 2
+
+# outbox delivery (see utils.dispatch); each destination is POSTed to
+# DISPATCH_BASE_URL/<destination>, e.g. the stub receiver in utils.stub_receiver
+DISPATCH_BASE_URL = os.getenv("SRT_DISPATCH_URL", "http://127.0.0.1:8765")
+DISPATCH_RATE_PER_S = 5.0      # per destination
+DISPATCH_BURST = 10
+DISPATCH_CONCURRENCY = 4       # in-flight requests per destination
+DISPATCH_BATCH = 50            # outbox rows claimed per round
+DISPATCH_TIMEOUT_S = 10.0
+DISPATCH_MAX_ATTEMPTS = 8
+DISPATCH_BACKOFF_S = 2.0       # doubles per attempt, capped at DISPATCH_BACKOFF_MAX_S
+DISPATCH_BACKOFF_MAX_S = 600.0
+DISPATCH_POLL_S = 1.0
+
+# machine-to-machine ingestion (see utils.ingest)
+INGEST_CHUNK = 1000            # records validated and inserted per transaction
+INGEST_HOST = os.getenv("SRT_INGEST_HOST", "127.0.0.1")
+INGEST_PORT = int(os.getenv("SRT_INGEST_PORT", "8770"))
+INGEST_TOKEN = os.getenv("SRT_INGEST_TOKEN")  # bearer token required when set
+INGEST_MAX_BODY = 64 * 1024 * 1024
+
+# near-duplicate detection (see utils.similarity)
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16                 # 4 rows per band: pairs around 0.5 Jaccard start to collide
+DUPLICATE_THRESHOLD = 0.6      # estimated Jaccard similarity flagged as a likely duplicate
+BUCKET_CANDIDATES = 32         # newest reports compared per matching LSH bucket
+MAX_DUPLICATES = 10            # likely duplicates recorded per report
+
+# retention (see utils.storage.run_retention); archives are monthly SQLite
+# files, reports-YYYY-MM.db, ATTACHed when a query asks for archived reports
+ARCHIVE_DIR = "data/archive"
+ARCHIVE_AFTER_DAYS = 365       # submitted, fully delivered reports older than this are archived
+DRAFT_EXPIRY_DAYS = 90         # drafts not saved for this long are deleted
+VACUUM_STEP_PAGES = 1000       # free pages released per incremental VACUUM transaction
+
+# storage encoding for submitted reports (see utils.payload): "json" keeps
+# every section as JSON text, "packed" keeps the hot fields as JSON and
+# compresses the rest; `manage.py pack-payloads` converts existing rows
+PAYLOAD_ENCODING = os.getenv("SRT_PAYLOAD_ENCODING", "json")
+PAYLOAD_LEVEL = 9
+PAYLOAD_DICT_SIZE = 16 * 1024
+PAYLOAD_DICT_SAMPLES = 2000    # most recent reports a dictionary is trained on
+
+# hot-path instrumentation (see utils.metrics); off unless SRT_METRICS=1
+METRICS_ENABLED = os.getenv("SRT_METRICS", "0") == "1"
+METRICS_DIR = "data/metrics"   # Prometheus text files, for a node_exporter textfile collector
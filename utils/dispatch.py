@@ -0,0 +1,120 @@
+"""Asynchronous delivery of the outbox to regulators.
+
+Each destination runs its own loop: claim a batch of due outbox rows, POST
+every shaped payload (with the row's Idempotency-Key, so a retried request is
+recognised by the receiver), and record the whole round in one transaction.
+Per-destination token buckets and semaphores bound the request rate and the
+number of requests in flight; a slow regulator only holds up its own queue.
+
+    python manage.py dispatch [--once]
+"""
+import time
+import random
+import asyncio
+import http.client
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from utils.config import (
+    DISPATCH_BASE_URL, DISPATCH_RATE_PER_S, DISPATCH_BURST, DISPATCH_CONCURRENCY, DISPATCH_BATCH,
+    DISPATCH_TIMEOUT_S, DISPATCH_MAX_ATTEMPTS, DISPATCH_BACKOFF_S, DISPATCH_BACKOFF_MAX_S, DISPATCH_POLL_S,
+)
+from utils.routing import DESTINATIONS
+from utils.storage import claim_outbox, record_deliveries
+
+# worth retrying; any other 4xx means the payload itself was refused
+RETRY_STATUSES = {408, 425, 429}
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def endpoint(dest: str, base_url: str = DISPATCH_BASE_URL) -> str:
+    return f"{base_url.rstrip('/')}/{dest.replace('/', '_')}"
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry number `attempts` (1-based), with full jitter."""
+    return random.uniform(0, min(DISPATCH_BACKOFF_MAX_S, DISPATCH_BACKOFF_S * 2 ** (attempts - 1)))
+
+def _post(url: str, body: str, key: str) -> int:
+    req = urllib.request.Request(url, data=body.encode(), method="POST", headers={
+        "Content-Type": "application/json",
+        "Idempotency-Key": key,
+    })
+    try:
+        with urllib.request.urlopen(req, timeout=DISPATCH_TIMEOUT_S) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+async def _deliver(url: str, item: tuple, bucket: TokenBucket, slots: asyncio.Semaphore) -> tuple:
+    oid, key, attempts, body = item
+    async with slots:
+        await bucket.acquire()
+        try:
+            code = await asyncio.to_thread(_post, url, body, key)
+            error = None if 200 <= code < 300 else f"HTTP {code}"
+        # transport failures (refused, timed out, dropped or garbled responses) are all retried
+        except (OSError, http.client.HTTPException) as e:
+            code, error = None, f"{type(e).__name__}: {e}"
+    if error is None:
+        return oid, "delivered", 0, None
+    attempts += 1
+    permanent = code is not None and 400 <= code < 500 and code not in RETRY_STATUSES
+    if permanent or attempts >= DISPATCH_MAX_ATTEMPTS:
+        return oid, "failed", 0, error
+    return oid, "pending", time.time() + backoff(attempts), error
+
+async def drain_destination(dest: str, bucket: TokenBucket, slots: asyncio.Semaphore,
+                            base_url: str = DISPATCH_BASE_URL) -> int:
+    """Deliver everything currently due for `dest`; returns how many attempts were made."""
+    url = endpoint(dest, base_url)
+    # pacing the batch through the bucket, plus room for the slowest requests to time out
+    lease = DISPATCH_BATCH / DISPATCH_RATE_PER_S + 2 * DISPATCH_TIMEOUT_S
+    made = 0
+    while True:
+        items = await asyncio.to_thread(claim_outbox, dest, DISPATCH_BATCH, lease)
+        if not items:
+            return made
+        results = await asyncio.gather(*(_deliver(url, it, bucket, slots) for it in items))
+        await asyncio.to_thread(record_deliveries, results)
+        made += len(results)
+
+async def run_dispatcher(dests: Optional[list] = None, once: bool = False,
+                         base_url: str = DISPATCH_BASE_URL, poll_s: float = DISPATCH_POLL_S) -> int:
+    """Drain the outbox for every destination concurrently.
+
+    With `once`, stop when nothing is due; otherwise keep polling. Returns
+    the number of delivery attempts made.
+    """
+    async def loop(dest):
+        bucket = TokenBucket(DISPATCH_RATE_PER_S, DISPATCH_BURST)
+        slots = asyncio.Semaphore(DISPATCH_CONCURRENCY)
+        made = 0
+        while True:
+            made += await drain_destination(dest, bucket, slots, base_url)
+            if once:
+                return made
+            await asyncio.sleep(poll_s)
+
+    return sum(await asyncio.gather(*(loop(d) for d in dests or DESTINATIONS)))
+
+def dispatch(dests: Optional[list] = None, once: bool = False, base_url: str = DISPATCH_BASE_URL) -> int:
+    return asyncio.run(run_dispatcher(dests, once, base_url))
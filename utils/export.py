@@ -0,0 +1,198 @@
+import io
+import os
+import csv
+import sys
+import json
+import types
+import shutil
+import zipfile
+import tempfile
+import threading
+import multiprocessing.context
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from utils.metrics import timed
+from utils.models import ReportFilter, SECTION_MODELS
+from utils.routing import DESTINATIONS, shape_batch
+from utils.storage import count_reports, iter_report_rows, payload_from_row
+
+EXPORT_CHUNK = 500
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+def _file_label(dest: str) -> str:
+    return dest.replace("/", "_")
+
+_main_lock = threading.Lock()
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    """A spawned shaping worker that does not re-run the parent's __main__.
+
+    Workers are spawned, not forked: the parent holds pooled SQLite
+    connections and, under Streamlit, many threads, which a forked child
+    cannot use safely. But a spawned child normally re-executes the parent's
+    __main__ first, and under Streamlit that is the page script.
+    """
+    def start(self):
+        with _main_lock:
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = types.ModuleType("__main__")
+            try:
+                super().start()
+            finally:
+                sys.modules["__main__"] = main
+
+class _WorkerContext(multiprocessing.context.SpawnContext):
+    Process = _WorkerProcess
+
+_WORKERS = _WorkerContext()
+
+def shape_rows(dests: list, rows: list) -> list:
+    """Shape a chunk of report rows for every destination (runs in a worker process).
+
+    Returns `[(report_id, {dest: compact_json})]`.
+    """
+    payloads = [payload_from_row(row[4:]) for row in rows]
+    shaped = {d: [_dumps(s) for s in shape_batch(d, payloads)] for d in dests}
+    return [(row[0], {d: shaped[d][i] for d in dests}) for i, row in enumerate(rows)]
+
+def iter_shaped(dests: list, filters: Optional[ReportFilter] = None, workers: Optional[int] = None,
+                chunk_size: int = EXPORT_CHUNK, progress: Optional[Callable[[int, int], None]] = None):
+    """Yield shaped chunks in id order, with at most 2×workers chunks in flight."""
+    total = count_reports(filters=filters)
+    done = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_WORKERS) as pool:
+        pending: deque = deque()
+        for rows in iter_report_rows(filters, chunk_size):
+            pending.append(pool.submit(shape_rows, dests, rows))
+            if len(pending) >= 2 * workers:
+                chunk = pending.popleft().result()
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+                yield chunk
+        while pending:
+            chunk = pending.popleft().result()
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+            yield chunk
+
+def _passes(dests: list, filters: Optional[ReportFilter], routed: bool) -> list:
+    """`[(dests, filters)]` to shape: one pass for every destination, or with
+    `routed` one pass per destination over just the reports due to it."""
+    if not routed:
+        return [(dests, filters)]
+    base = filters or ReportFilter()
+    return [([d], base.model_copy(update={"destinations": [d]})) for d in dests
+            if not base.destinations or d in base.destinations]
+
+def export_ndjson(out_dir: str, dests: list = DESTINATIONS, filters: Optional[ReportFilter] = None,
+                  workers: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None,
+                  routed: bool = False) -> dict:
+    """Write one compact `<dest>.ndjson` per destination into `out_dir`; returns {dest: path}.
+
+    With `routed`, each file only holds the reports due to that destination.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {d: os.path.join(out_dir, f"{_file_label(d)}.ndjson") for d in dests}
+    files = {d: open(p, "w", encoding="utf-8") for d, p in paths.items()}
+    try:
+        for pass_dests, pass_filters in _passes(dests, filters, routed):
+            for chunk in iter_shaped(pass_dests, pass_filters, workers, progress=progress):
+                for _, shaped in chunk:
+                    for d, line in shaped.items():
+                        files[d].write(line + "\n")
+    finally:
+        for fh in files.values():
+            fh.close()
+    return paths
+
+@timed("export.ndjson_zip")
+def export_ndjson_zip(fh, dests: list = DESTINATIONS, filters: Optional[ReportFilter] = None,
+                      workers: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None,
+                      routed: bool = False):
+    """Per-destination NDJSON files, bundled into a ZIP written to `fh`."""
+    tmp = tempfile.mkdtemp(prefix="srt-export-")
+    try:
+        paths = export_ndjson(tmp, dests, filters, workers, progress, routed)
+        with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for path in paths.values():
+                zf.write(path, os.path.basename(path))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+@timed("export.reports_zip")
+def export_reports_zip(fh, dests: list = DESTINATIONS, filters: Optional[ReportFilter] = None,
+                       workers: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None,
+                       routed: bool = False):
+    """ZIP of per-report files, `<dest>/report_<id>.json`, written to `fh`."""
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for pass_dests, pass_filters in _passes(dests, filters, routed):
+            for chunk in iter_shaped(pass_dests, pass_filters, workers, progress=progress):
+                for rid, shaped in chunk:
+                    for d, body in shaped.items():
+                        zf.writestr(f"{_file_label(d)}/report_{rid}.json", body)
+
+# ---------- flat tabular exports ----------
+META_COLUMNS = ["id", "created_at", "ref", "status"]
+FLAT_COLUMNS = META_COLUMNS + [
+    f"{section}.{field}" for section, model in SECTION_MODELS.items() for field in model.model_fields
+]
+
+def _cell(v):
+    if isinstance(v, list):
+        return "; ".join(map(str, v))
+    return v
+
+def flatten_row(row) -> list:
+    """One `iter_report_rows` row as a list of cells in FLAT_COLUMNS order."""
+    out = list(row[:4])
+    for text, (section, model) in zip(row[4:], SECTION_MODELS.items()):
+        data = json.loads(text) if text else {}
+        out.extend(_cell(data.get(f)) for f in model.model_fields)
+    return out
+
+def iter_flat_rows(filters: Optional[ReportFilter] = None, chunk_size: int = EXPORT_CHUNK):
+    for rows in iter_report_rows(filters, chunk_size):
+        yield [flatten_row(r) for r in rows]
+
+@timed("export.csv")
+def export_csv(fh, filters: Optional[ReportFilter] = None):
+    """Write every matching report, all fields, as CSV to binary `fh`, chunk by chunk."""
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+    w = csv.writer(text)
+    w.writerow(FLAT_COLUMNS)
+    for chunk in iter_flat_rows(filters):
+        w.writerows(chunk)
+    text.flush()
+    text.detach()
+
+@timed("export.xlsx")
+def export_xlsx(fh, filters: Optional[ReportFilter] = None):
+    """Write every matching report as an XLSX workbook to binary `fh` (needs openpyxl)."""
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise RuntimeError("XLSX export needs openpyxl (pip install openpyxl)") from e
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("reports")
+    ws.append(FLAT_COLUMNS)
+    for chunk in iter_flat_rows(filters):
+        for r in chunk:
+            ws.append(r)
+    wb.save(fh)
+
+def deferred(write: Callable) -> Callable[[], bytes]:
+    """A `download_button` data callable: `write(fh)` runs only when the
+    button is clicked, spooled through a temp file into the bytes Streamlit serves."""
+    def build() -> bytes:
+        with tempfile.TemporaryFile() as fh:
+            write(fh)
+            fh.seek(0)
+            return fh.read()
+    return build
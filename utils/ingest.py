@@ -0,0 +1,203 @@
+"""Programmatic report submission: bulk import and an HTTP ingestion endpoint.
+
+Records are report-shaped dicts (`{"reporter": {...}, "organisation": {...},
+...}`), read from JSON, NDJSON or the flat CSV layout written by
+utils.export.export_csv. They are validated against the typed models by
+utils.submission.prepare_report and inserted INGEST_CHUNK at a time, one
+transaction per chunk.
+Every record gets a result: `{"index", "id", "ref"}` or `{"index", "errors"}`.
+
+    python manage.py import reports.ndjson
+    python manage.py serve-ingest
+    curl -X POST --data-binary @reports.ndjson -H 'Content-Type: application/x-ndjson' \
+         http://127.0.0.1:8770/reports
+"""
+import io
+import csv
+import json
+import hmac
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional
+
+from pydantic import ValidationError
+
+from utils.config import INGEST_CHUNK, INGEST_HOST, INGEST_PORT, INGEST_TOKEN, INGEST_MAX_BODY
+from utils.metrics import timed
+from utils.models import SECTION_MODELS
+from utils.storage import save_reports
+from utils.submission import error_messages, prepare_report
+
+FORMATS = ["json", "ndjson", "csv"]
+
+class _Invalid:
+    """A record that could not even be parsed; carries its error message."""
+    def __init__(self, error: str):
+        self.error = error
+
+# ---------- validation ----------
+def validate_record(obj) -> tuple:
+    """`(PreparedReport, None)` for a valid record, else `(None, [error, ...])`."""
+    if isinstance(obj, _Invalid):
+        return None, [obj.error]
+    if not isinstance(obj, dict):
+        return None, ["record must be a JSON object"]
+    try:
+        return prepare_report(obj), None
+    except ValidationError as e:
+        return None, error_messages(e)
+
+def ingest_records(records: Iterable, chunk_size: int = INGEST_CHUNK):
+    """Validate and insert records chunk by chunk, yielding one result per record in order.
+
+    If the reader fails part way (a malformed CSV row, say), the records
+    read before it are still inserted and yielded, then the error is raised.
+    """
+    chunk: list = []
+    try:
+        for i, obj in enumerate(records):
+            chunk.append((i, obj))
+            if len(chunk) >= chunk_size:
+                yield from _ingest_chunk(chunk)
+                chunk = []
+    except (ValueError, csv.Error):
+        if chunk:
+            yield from _ingest_chunk(chunk)
+        raise
+    if chunk:
+        yield from _ingest_chunk(chunk)
+
+@timed("ingest.chunk", rows=len)
+def _ingest_chunk(chunk: list) -> list:
+    results, valid = [], []
+    for i, obj in chunk:
+        report, errors = validate_record(obj)
+        if errors:
+            results.append({"index": i, "errors": errors})
+        else:
+            results.append({"index": i})
+            valid.append((len(results) - 1, report))
+    if valid:
+        for (pos, _), (rid, ref) in zip(valid, save_reports([r for _, r in valid])):
+            results[pos].update(id=rid, ref=ref)
+    return results
+
+# ---------- readers ----------
+def iter_json(fh):
+    """A JSON object, a list of them, or `{"reports": [...]}`."""
+    data = json.load(fh)
+    if isinstance(data, dict) and isinstance(data.get("reports"), list):
+        data = data["reports"]
+    yield from data if isinstance(data, list) else [data]
+
+def iter_ndjson(fh):
+    for n, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield _Invalid(f"line {n}: {e}")
+
+def _list_fields() -> set:
+    return {
+        f"{section}.{name}"
+        for section, model in SECTION_MODELS.items()
+        for name, field in model.model_fields.items()
+        if typing.get_origin(field.annotation) is list
+    }
+
+def iter_csv(fh):
+    """Rows with `section.field` headers, as written by utils.export.export_csv.
+
+    List fields are "; "-separated, empty cells are treated as missing, and
+    a section with no filled cells is left out.
+    """
+    lists = _list_fields()
+    reader = csv.DictReader(fh)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            raise csv.Error(f"line {reader.reader.line_num}: {e}") from e
+        record: dict = {}
+        for key, value in row.items():
+            if not key or "." not in key or value in (None, ""):
+                continue
+            section, field = key.split(".", 1)
+            if section not in SECTION_MODELS:
+                continue
+            record.setdefault(section, {})[field] = (
+                [v.strip() for v in value.split(";") if v.strip()] if key in lists else value
+            )
+        yield record
+
+READERS = {"json": iter_json, "ndjson": iter_ndjson, "csv": iter_csv}
+
+def guess_format(name: str) -> Optional[str]:
+    ext = name.rsplit(".", 1)[-1].lower()
+    return {"jsonl": "ndjson"}.get(ext, ext if ext in FORMATS else None)
+
+def import_file(path: str, fmt: Optional[str] = None, chunk_size: int = INGEST_CHUNK):
+    """Import a JSON / NDJSON / CSV file, yielding one result per record."""
+    fmt = fmt or guess_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"Unknown import format for {path}; use one of {', '.join(FORMATS)}")
+    with open(path, encoding="utf-8-sig", newline="" if fmt == "csv" else None) as fh:
+        yield from ingest_records(READERS[fmt](fh), chunk_size)
+
+# ---------- HTTP endpoint ----------
+CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+class IngestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=(INGEST_HOST, INGEST_PORT), token: Optional[str] = INGEST_TOKEN):
+        super().__init__(address, _IngestHandler)
+        self.token = token
+
+class _IngestHandler(BaseHTTPRequestHandler):
+    """`POST /reports` with a JSON, NDJSON or CSV body; replies with per-record results."""
+    server: IngestServer
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/reports":
+            return self._reply(404, {"error": "POST reports to /reports"})
+        if self.server.token and not hmac.compare_digest(
+                self.headers.get("Authorization", ""), f"Bearer {self.server.token}"):
+            return self._reply(401, {"error": "missing or invalid bearer token"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > INGEST_MAX_BODY:
+            return self._reply(413, {"error": f"body larger than {INGEST_MAX_BODY} bytes"})
+        fmt = CONTENT_TYPES.get(self.headers.get("Content-Type", "application/json").split(";")[0].strip())
+        if fmt is None:
+            return self._reply(415, {"error": f"send one of {', '.join(CONTENT_TYPES)}"})
+        text = io.StringIO(self.rfile.read(length).decode("utf-8-sig"), newline="" if fmt == "csv" else None)
+        results: list = []
+        try:
+            results.extend(ingest_records(READERS[fmt](text)))
+        except (ValueError, csv.Error) as e:
+            # earlier records are already committed; say which ones and where parsing stopped
+            return self._reply(400, {"error": f"could not parse record {len(results)}: {e}",
+                                     "failed_index": len(results), **self._summary(results)})
+        self._reply(200, self._summary(results))
+
+    @staticmethod
+    def _summary(results: list) -> dict:
+        accepted = sum("ref" in r for r in results)
+        return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
+
+    def _reply(self, code: int, obj: dict):
+        out = json.dumps(obj, separators=(",", ":")).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
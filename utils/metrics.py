@@ -0,0 +1,253 @@
+"""Lightweight timing and counting for hot paths.
+
+    @timed("storage.count_reports")
+    def count_reports(...): ...
+
+    @timed("storage.fetch_reports_page", rows=lambda r: len(r[0]))
+    def fetch_reports_page(...): ...
+
+    with span("page.dashboard.listing") as s:
+        df, cursor = reports_page(...)
+        s.rows = len(df)
+
+Each operation gets a latency histogram, an error count and, when it knows
+them, histograms of rows returned and bytes produced. Everything lives in
+one process-wide registry, shown on the Performance page and written as
+Prometheus text format by `write_prometheus`.
+
+Instrumentation is on with SRT_METRICS=1. When off, `timed` returns the
+function itself and `span`/`start` return a shared no-op, so the cost is
+nothing for decorated functions and one call for spans.
+"""
+import os
+import time
+import inspect
+import threading
+import functools
+from typing import Callable, Optional
+
+from utils.config import METRICS_ENABLED, METRICS_DIR
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (1, 10, 50, 100, 500, 1_000, 5_000, 10_000, 50_000, 100_000)
+BYTES_BUCKETS = (256, 1024, 4096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes them."""
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, v: float):
+        i = 0
+        while i < len(self.bounds) and v > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += v
+        self.count += 1
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate, interpolating linearly inside the bucket that holds it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = self.bounds[i - 1] if i else 0.0
+                hi = min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.max
+
+class _Op:
+    __slots__ = ("seconds", "rows", "bytes", "errors")
+
+    def __init__(self):
+        self.seconds = Histogram(SECONDS_BUCKETS)
+        self.rows = Histogram(ROWS_BUCKETS)
+        self.bytes = Histogram(BYTES_BUCKETS)
+        self.errors = 0
+
+_ops: dict = {}
+_lock = threading.Lock()
+
+def record(op: str, seconds: float, rows: Optional[int] = None, nbytes: Optional[int] = None, error: bool = False):
+    with _lock:
+        m = _ops.get(op)
+        if m is None:
+            m = _ops[op] = _Op()
+        m.seconds.observe(seconds)
+        if rows is not None:
+            m.rows.observe(rows)
+        if nbytes is not None:
+            m.bytes.observe(nbytes)
+        if error:
+            m.errors += 1
+
+def reset():
+    with _lock:
+        _ops.clear()
+
+# ---------- instrumentation ----------
+class Span:
+    """A running timer; set `rows` / `bytes` before it stops to record them too."""
+    __slots__ = ("op", "rows", "bytes", "_t0")
+
+    def __init__(self, op: str):
+        self.op = op
+        self.rows = None
+        self.bytes = None
+        self._t0 = time.perf_counter()
+
+    def stop(self, error: bool = False):
+        record(self.op, time.perf_counter() - self._t0, self.rows, self.bytes, error)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(error=exc_type is not None)
+
+class _NullSpan:
+    rows = bytes = None
+
+    def stop(self, error: bool = False):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NULL = _NullSpan()
+
+def start(op: str):
+    """A Span for `op`, stopped by the caller (e.g. around a whole page run)."""
+    return Span(op) if METRICS_ENABLED else _NULL
+
+def span(op: str):
+    """Context manager timing the block as `op`."""
+    return Span(op) if METRICS_ENABLED else _NULL
+
+def timed(op: str, rows: Optional[Callable] = None, size: Optional[Callable] = None):
+    """Decorator recording each call's latency, plus `rows(result)` and
+    `size(result)` (bytes) when given.
+
+    For a generator function the time spent producing items is summed over
+    the whole iteration, and `rows` is applied to every item yielded.
+    """
+    def wrap(fn):
+        if not METRICS_ENABLED:
+            return fn
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                busy, n, error = 0.0, 0, False
+                it = fn(*args, **kwargs)
+                try:
+                    while True:
+                        t0 = time.perf_counter()
+                        try:
+                            item = next(it)
+                        except StopIteration:
+                            return
+                        finally:
+                            busy += time.perf_counter() - t0
+                        if rows:
+                            n += rows(item)
+                        yield item
+                except BaseException as e:
+                    error = not isinstance(e, GeneratorExit)
+                    raise
+                finally:
+                    it.close()
+                    record(op, busy, n if rows else None, error=error)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                record(op, time.perf_counter() - t0, error=True)
+                raise
+            elapsed = time.perf_counter() - t0
+            record(op, elapsed, rows(result) if rows else None, size(result) if size else None)
+            return result
+        return wrapper
+    return wrap
+
+# ---------- reporting ----------
+def summary_df():
+    """One row per operation: calls, errors, latency percentiles (ms), rows and bytes."""
+    import pandas as pd
+    def ms(v):
+        return None if v is None else round(v * 1000, 2)
+    with _lock:
+        rows = [{
+            "Operation": op,
+            "Calls": m.seconds.count,
+            "Errors": m.errors,
+            "Mean ms": ms(m.seconds.sum / m.seconds.count) if m.seconds.count else None,
+            "p50 ms": ms(m.seconds.quantile(0.5)),
+            "p95 ms": ms(m.seconds.quantile(0.95)),
+            "p99 ms": ms(m.seconds.quantile(0.99)),
+            "Max ms": ms(m.seconds.max),
+            "Total s": round(m.seconds.sum, 3),
+            "Mean rows": round(m.rows.sum / m.rows.count, 1) if m.rows.count else None,
+            "Mean bytes": round(m.bytes.sum / m.bytes.count) if m.bytes.count else None,
+        } for op, m in sorted(_ops.items())]
+    return pd.DataFrame(rows, columns=["Operation", "Calls", "Errors", "Mean ms", "p50 ms", "p95 ms", "p99 ms",
+                                       "Max ms", "Total s", "Mean rows", "Mean bytes"])
+
+def _histogram_lines(name: str, op: str, h: Histogram) -> list:
+    lines, cumulative = [], 0
+    for bound, n in zip(list(h.bounds) + ["+Inf"], h.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{op="{op}",le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_sum{{op="{op}"}} {h.sum}')
+    lines.append(f'{name}_count{{op="{op}"}} {h.count}')
+    return lines
+
+def prometheus_text() -> str:
+    """The registry in Prometheus text exposition format."""
+    families = (
+        ("srt_op_seconds", "Latency of instrumented operations in seconds.", "seconds"),
+        ("srt_op_rows", "Rows returned by instrumented operations.", "rows"),
+        ("srt_op_bytes", "Bytes produced by instrumented operations.", "bytes"),
+    )
+    out = []
+    with _lock:
+        for name, help_, attr in families:
+            out += [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+            for op, m in sorted(_ops.items()):
+                h = getattr(m, attr)
+                if h.count:
+                    out += _histogram_lines(name, op, h)
+        out += ["# HELP srt_op_errors_total Instrumented operations that raised.",
+                "# TYPE srt_op_errors_total counter"]
+        out += [f'srt_op_errors_total{{op="{op}"}} {m.errors}' for op, m in sorted(_ops.items())]
+    return "\n".join(out) + "\n"
+
+def write_prometheus(name: str = "srt", root: str = METRICS_DIR) -> str:
+    """Write `<root>/<name>.prom` atomically (for a textfile collector); returns the path."""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"{name}.prom")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(prometheus_text())
+    os.replace(tmp, path)
+    return path
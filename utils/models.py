@@ -50,8 +50,29 @@ class Ransomware(BaseModel):
     communicated_with_extorter: Optional[str] = None
 
 class Report(BaseModel):
-    reporter: dict
-    organisation: dict
-    purpose: dict
-    incident: dict
-    ransomware: Optional[dict] = None
+    reporter: Reporter
+    organisation: Organisation
+    purpose: Purpose
+    incident: Incident
+    ransomware: Optional[Ransomware] = None
+
+# report sections in storage column order, with their typed models
+SECTION_MODELS = {
+    "reporter": Reporter,
+    "organisation": Organisation,
+    "purpose": Purpose,
+    "incident": Incident,
+    "ransomware": Ransomware,
+}
+
+class ReportFilter(BaseModel):
+    """Structured report filters shared by the dashboard listing and exports."""
+    query: Optional[str] = None
+    status: Optional[str] = None  # draft | submitted
+    jurisdictions: List[str] = []
+    incident_types: List[str] = []
+    ci_sectors: List[str] = []
+    destinations: List[str] = []  # reports due to any of these regulators
+    occurred_from: Optional[str] = None  # YYYY-MM-DD, inclusive
+    occurred_to: Optional[str] = None
+    archived: bool = False  # also read the monthly archive databases
@@ -0,0 +1,120 @@
+"""Compact storage encoding for submitted report sections.
+
+With PAYLOAD_ENCODING = "packed", each `<section>_json` column keeps only its
+hot fields: the ones SQL reads for generated columns, FTS, triggers, the
+listing and duplicate detection. The remaining fields of every section go
+into one `payload` BLOB, which is compact JSON compressed with a
+dictionary trained on our own reports. Repeated key names and boilerplate
+answers then cost a few bits each.
+
+The codec is zstd when the zstandard package is installed, otherwise zlib
+with a preset dictionary. Each payload starts with a codec tag and the id
+of its dictionary in `payload_dicts` (0 for none). Rows written with an
+older dictionary or the other codec therefore stay readable.
+"""
+import json
+import zlib
+import struct
+import threading
+from typing import Callable, Optional
+
+from utils.config import PAYLOAD_LEVEL, PAYLOAD_DICT_SIZE
+from utils.models import SECTION_MODELS
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib with a preset dictionary is the fallback
+    zstandard = None
+
+CODEC = "zstd" if zstandard else "zlib"
+_TAGS = {"zstd": b"Z", "zlib": b"D"}
+_HEADER = struct.Struct(">cI")  # codec tag, dictionary id
+
+# kept as plain JSON in the section columns; None keeps the whole section
+HOT_FIELDS = {
+    "reporter": ("first_name", "surname", "email"),
+    "organisation": ("name", "jurisdiction", "abn"),
+    "purpose": None,  # routing, CI sector and rollup triggers read all of it
+    "incident": ("type", "occurrence_date", "occurrence_time", "identified_date", "identified_time", "narrative"),
+    "ransomware": (),
+}
+_ORDER = {name: list(model.model_fields) for name, model in SECTION_MODELS.items()}
+_local = threading.local()
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+def is_hot(section: str, key: str) -> bool:
+    fields = HOT_FIELDS[section]
+    return fields is None or key in fields
+
+def split(sections: dict) -> tuple:
+    """`({section: hot JSON or None}, {section: {cold field: value}})` for full section dicts."""
+    hot, cold = {}, {}
+    for name, fields in HOT_FIELDS.items():
+        section = sections.get(name)
+        if section is None or fields is None:
+            hot[name] = None if section is None else _dumps(section)
+            continue
+        hot[name] = _dumps({k: v for k, v in section.items() if k in fields})
+        rest = {k: v for k, v in section.items() if k not in fields}
+        if rest:
+            cold[name] = rest
+    return hot, cold
+
+def merge(hot_json: Optional[str], cold: dict, name: str) -> Optional[str]:
+    """The full JSON of section `name`, in model field order."""
+    extra = cold.get(name)
+    if hot_json is None or not extra:
+        return hot_json
+    section = {**json.loads(hot_json), **extra}
+    ordered = {k: section[k] for k in _ORDER[name] if k in section}
+    ordered.update((k, v) for k, v in section.items() if k not in ordered)
+    return _dumps(ordered)
+
+def sql_value(v):
+    """A decoded field as json_extract would return it."""
+    if isinstance(v, (list, dict)):
+        return _dumps(v)
+    return int(v) if isinstance(v, bool) else v
+
+# ---------- codec ----------
+def _zstd(kind: str, dict_id: int, zdict: bytes):
+    if zstandard is None:
+        raise RuntimeError("This payload was written with zstd; install zstandard to read it")
+    cache = _local.__dict__.setdefault(kind, {})  # zstd contexts are not shareable across threads
+    if dict_id not in cache:
+        d = zstandard.ZstdCompressionDict(zdict) if zdict else None
+        cache[dict_id] = (zstandard.ZstdCompressor(level=PAYLOAD_LEVEL, dict_data=d) if kind == "c"
+                          else zstandard.ZstdDecompressor(dict_data=d))
+    return cache[dict_id]
+
+def compress(cold: dict, dict_id: int = 0, zdict: bytes = b"", codec: str = CODEC) -> bytes:
+    raw = _dumps(cold).encode()
+    if codec == "zstd":
+        body = _zstd("c", dict_id, zdict).compress(raw)
+    else:
+        co = zlib.compressobj(PAYLOAD_LEVEL, zlib.DEFLATED, -15, **({"zdict": zdict} if zdict else {}))
+        body = co.compress(raw) + co.flush()
+    return _HEADER.pack(_TAGS[codec], dict_id) + body
+
+def decompress(blob: bytes, dictionary: Callable[[int], bytes]) -> dict:
+    """The cold fields in `blob`; `dictionary(id)` supplies the dictionary it names."""
+    tag, dict_id = _HEADER.unpack_from(blob)
+    zdict = dictionary(dict_id) if dict_id else b""
+    body = bytes(blob[_HEADER.size:])
+    if tag == _TAGS["zstd"]:
+        raw = _zstd("d", dict_id, zdict).decompress(body)
+    else:
+        do = zlib.decompressobj(-15, **({"zdict": zdict} if zdict else {}))
+        raw = do.decompress(body) + do.flush()
+    return json.loads(raw)
+
+def train(samples: list, codec: str = CODEC, size: int = PAYLOAD_DICT_SIZE) -> bytes:
+    """A dictionary for `codec` from sample cold-field dicts."""
+    raw = [_dumps(s).encode() for s in samples]
+    if codec == "zstd":
+        return zstandard.train_dictionary(size, raw).as_bytes()
+    # deflate only looks back 32 KiB, so its preset dictionary is simply
+    # sample text, with the most recent reports last (closest, cheapest matches)
+    return b"".join(reversed(raw))[-min(size, 32 * 1024):]
@@ -1,53 +1,239 @@
-def shape_for_destination(dest: str, payload: dict) -> dict:
-    dest = (dest or "").strip().lower()
-    if dest == "acsc":
-        return _shape_acsc(payload)
-    if dest == "homeaffairs":
-        return _shape_home_affairs(payload)
-    if dest == "oaic":
-        return _shape_oaic(payload)
-    if dest in ("apra","asic","rba","tga","accc/cdr","accc","cdr"):
-        return _shape_generic(payload, dest.upper())
-    return {"destination": dest, "payload": payload}
-
-def _pick(d: dict, keys: list): return {k: d.get(k) for k in keys}
-
-def _shape_acsc(p: dict) -> dict:
-    return {
+import copy
+import hashlib
+
+from utils.metrics import timed
+
+DESTINATIONS = ["ACSC", "HomeAffairs", "OAIC", "APRA", "ASIC", "RBA", "ACCC/CDR", "TGA"]
+
+REDACTED = "[REDACTED]"
+
+# ---------- destination routing ----------
+# Which regulators a report is due to, from its purpose section. Each rule is
+# (purpose, condition, destinations); the condition is None (always) or
+# (purpose field, value), matched against a scalar or a list field.
+ROUTES = [
+    ("Cybersecurity Incident", None, ["ACSC"]),
+    ("Cybersecurity Incident", ("consent_home_affairs", "Yes"), ["HomeAffairs"]),
+    ("Cybersecurity Incident", ("ci_sectors", "Financial Services"), ["APRA"]),
+    ("Data Breach Incident", None, ["OAIC"]),
+    ("CDR Info Incident", None, ["ACCC/CDR", "OAIC"]),
+    ("Medical Device Incident", None, ["TGA"]),
+    ("Ransomware/Cyber Extortion Payment", None, ["ACSC"]),
+    ("Information Security Incident", None, ["APRA"]),
+    ("Breach in Financial Stability Standards", None, ["RBA"]),
+    ("Incident Affecting Licensees", None, ["ASIC"]),
+]
+
+def compile_routes(routes: list) -> dict:
+    """{purpose: (destinations always due, [(field, value, destinations)])}"""
+    table: dict = {}
+    for purpose, cond, dests in routes:
+        base, conds = table.setdefault(purpose, (set(), []))
+        if cond is None:
+            base.update(dests)
+        else:
+            conds.append((cond[0], cond[1], frozenset(dests)))
+    return {p: (frozenset(base), tuple(conds)) for p, (base, conds) in table.items()}
+
+_ROUTE_TABLE = compile_routes(ROUTES)
+_DEST_ORDER = {d: i for i, d in enumerate(DESTINATIONS)}
+
+# bumps whenever ROUTES changes; stored routing is recomputed on start-up
+ROUTING_VERSION = hashlib.sha256(repr(ROUTES).encode()).hexdigest()[:12]
+
+@timed("routing.destinations_for")
+def destinations_for(purpose: dict) -> list:
+    """Destinations a report is due to, in DESTINATIONS order."""
+    purpose = purpose or {}
+    wanted = set()
+    for p in purpose.get("purposes") or []:
+        base, conds = _ROUTE_TABLE.get(p, (frozenset(), ()))
+        wanted |= base
+        for field, value, dests in conds:
+            v = purpose.get(field)
+            if v == value or (isinstance(v, list) and value in v):
+                wanted |= dests
+    return sorted(wanted, key=_DEST_ORDER.get)
+
+# ---------- declarative destination schemas ----------
+# Each destination maps output keys to a field spec:
+#   "path"    dotted path into the report payload ("" = the whole payload)
+#   "default" value when the path is missing (containers are copied per report)
+#   "pick"    keep only these keys of a dict value (missing keys become None)
+#   "redact"  keys of a dict value to replace with REDACTED
+#   "when"    (path, value): emit the field only when the payload has that value
+# Plain strings are constants (e.g. the destination label).
+SCHEMAS = {
+    "acsc": {
         "destination": "ACSC",
-        "reporter": _pick(p.get("reporter", {}), ["first_name","surname","email","phone"]),
-        "organisation": _pick(p.get("organisation", {}), ["name","abn","jurisdiction","postcode","country","address"]),
-        "purpose": p.get("purpose", {}),
-        "incident": p.get("incident", {}),
-        "ransomware": p.get("ransomware"),
-    }
-
-def _shape_home_affairs(p: dict) -> dict:
-    purpose = p.get("purpose", {})
-    return {
+        "reporter": {"path": "reporter", "default": {}, "pick": ["first_name","surname","email","phone"]},
+        "organisation": {"path": "organisation", "default": {},
+                         "pick": ["name","abn","jurisdiction","postcode","country","address"]},
+        "purpose": {"path": "purpose", "default": {}},
+        "incident": {"path": "incident", "default": {}},
+        "ransomware": {"path": "ransomware"},
+    },
+    "homeaffairs": {
         "destination": "Home Affairs",
-        "ci_member": purpose.get("ci_member"),
-        "ci_sectors": purpose.get("ci_sectors", []),
-        "consent_home_affairs": purpose.get("consent_home_affairs"),
-        "reporter": p.get("reporter", {}),
-        "organisation": p.get("organisation", {}),
-        "incident": p.get("incident", {}),
-        "ransomware": p.get("ransomware"),
-    }
-
-def _shape_oaic(p: dict) -> dict:
-    inc = p.get("incident", {})
-    org = p.get("organisation", {})
-    return {
+        "ci_member": {"path": "purpose.ci_member"},
+        "ci_sectors": {"path": "purpose.ci_sectors", "default": []},
+        "consent_home_affairs": {"path": "purpose.consent_home_affairs"},
+        "reporter": {"path": "reporter", "default": {}},
+        "organisation": {"path": "organisation", "default": {}},
+        "incident": {"path": "incident", "default": {}},
+        "ransomware": {"path": "ransomware"},
+    },
+    "oaic": {
         "destination": "OAIC",
-        "organisation_name": org.get("name"),
-        "jurisdiction": org.get("jurisdiction"),
-        "incident_type": inc.get("type"),
-        "occurrence_date": inc.get("occurrence_date"),
-        "identified_date": inc.get("identified_date"),
-        "narrative": inc.get("narrative"),
-        "customers_impacted": inc.get("customers_impacted"),
-    }
-
-def _shape_generic(p: dict, label: str) -> dict:
-    return {"destination": label, "payload": p}
+        "organisation_name": {"path": "organisation.name"},
+        "jurisdiction": {"path": "organisation.jurisdiction"},
+        "incident_type": {"path": "incident.type"},
+        "occurrence_date": {"path": "incident.occurrence_date"},
+        "identified_date": {"path": "incident.identified_date"},
+        "narrative": {"path": "incident.narrative"},
+        "customers_impacted": {"path": "incident.customers_impacted"},
+    },
+    **{
+        dest: {"destination": dest.upper(), "payload": {"path": ""}}
+        for dest in ("apra","asic","rba","tga","accc/cdr","accc","cdr")
+    },
+}
+
+# bumps automatically whenever SCHEMAS changes; keys cached destination payloads
+SCHEMA_VERSION = hashlib.sha256(repr(sorted(SCHEMAS.items())).encode()).hexdigest()[:12]
+
+_MISSING = object()
+_SKIP = object()
+
+def _dig(v, keys, default):
+    for k in keys:
+        v = v.get(k, _MISSING) if type(v) is dict else _MISSING
+        if v is _MISSING:
+            return copy.copy(default)
+    return v
+
+def _present(d: dict) -> dict:
+    return {k: v for k, v in d.items() if v is not _SKIP}
+
+def _redact(v, keys):
+    if type(v) is not dict:
+        return v
+    return {k: (REDACTED if k in keys else x) for k, x in v.items()}
+
+def _const(ns: dict, value) -> str:
+    """Bind `value` into the generated code's namespace; returns its name."""
+    name = f"_c{len(ns)}"
+    ns[name] = value
+    return name
+
+def _path_expr(path: str, default, ns: dict, base: str) -> tuple:
+    """Python expression reading `path`, given `base` = the top-level section (or _MISSING).
+
+    Returns `(section key or None for the whole payload, expression)`.
+    """
+    keys = [k for k in path.split(".") if k]
+    if not keys:
+        return None, base
+    if isinstance(default, (dict, list)):
+        # containers are fresh per report
+        d = repr(default) if not default else f"_copy({_const(ns, default)})"
+    else:
+        d = _const(ns, default)
+    rest = keys[1:]
+    if not rest:
+        return keys[0], f"({d} if {base} is _MISSING else {base})"
+    if len(rest) == 1:
+        return keys[0], f"({base}.get({rest[0]!r}, {d}) if type({base}) is dict else {d})"
+    return keys[0], f"_dig({base}, {_const(ns, tuple(rest))}, {d})"
+
+def _field_expr(i: int, spec, ns: dict) -> tuple:
+    """`(sections, expression)` for one output field; the expression reads `@s0@`, `@s1@`."""
+    if isinstance(spec, str):
+        return (), repr(spec)
+    section, expr = _path_expr(spec.get("path", ""), spec.get("default"), ns, "@s0@")
+    sections = [section]
+    if spec.get("pick"):
+        picked = ", ".join(f"{k!r}: x{i}.get({k!r})" for k in spec["pick"])
+        expr = f"({{{picked}}} if type(x{i} := {expr}) is dict else x{i})"
+    if spec.get("redact"):
+        expr = f"_redact({expr}, {_const(ns, frozenset(spec['redact']))})"
+    if spec.get("when"):
+        cond_path, expected = spec["when"]
+        cond_section, cond = _path_expr(cond_path, None, ns, "@s1@")
+        sections.append(cond_section)
+        expr = f"({expr} if {cond} == {_const(ns, expected)} else _SKIP)"
+    return tuple(sections), expr
+
+def compile_schema(schema: dict) -> tuple:
+    """Compile a destination schema into `(project, project_batch)` functions.
+
+    The schema is turned into Python source once: `project(payload)` builds
+    one output dict; `project_batch(payloads)` pulls each section out as a
+    column, derives every output field column by column, and zips the rows.
+    """
+    ns = {"_MISSING": _MISSING, "_SKIP": _SKIP, "_copy": copy.copy, "_dig": _dig, "_redact": _redact,
+          "_present": _present}
+    keys = list(schema)
+    fields = [_field_expr(i, spec, ns) for i, spec in enumerate(schema.values())]
+    sections = sorted({s for secs, _ in fields for s in secs if s is not None})
+    var = {s: f"sec{n}" for n, s in enumerate(sections)}
+    var[None] = "p"
+    conditional = any(len(secs) > 1 for secs, _ in fields)
+
+    def bind(secs, expr, names):
+        for n, s in enumerate(secs):
+            expr = expr.replace(f"@s{n}@", names[s])
+        return expr
+
+    def build(items):
+        d = "{" + ", ".join(f"{k!r}: {v}" for k, v in zip(keys, items)) + "}"
+        return f"_present({d})" if conditional else d
+
+    # one report
+    row = ["def project(p):"]
+    row += [f"    {var[s]} = p.get({s!r}, _MISSING)" for s in sections]
+    row.append(f"    return {build([bind(secs, expr, var) for secs, expr in fields])}")
+
+    # a batch: each section as a column, then each output field as a column
+    batch = ["def project_batch(ps):"]
+    batch += [f"    {var[s]} = [p.get({s!r}, _MISSING) for p in ps]" for s in sections]
+    items, cols = [], []
+    for n, (secs, expr) in enumerate(fields):
+        if not secs:
+            items.append(expr)
+            continue
+        loop = {s: f"v{m}" for m, s in enumerate(secs)}
+        targets = ", ".join(loop[s] for s in secs)
+        cols_of = [var[s] if s is not None else "ps" for s in secs]
+        source = cols_of[0] if len(secs) == 1 else f"zip({', '.join(cols_of)})"
+        batch.append(f"    col{n} = [{bind(secs, expr, loop)} for {targets} in {source}]")
+        items.append(f"c{n}")
+        cols.append(n)
+    if cols:
+        names = ", ".join(f"c{n}" for n in cols)
+        batch.append(f"    return [{build(items)} for {names}, in zip({', '.join(f'col{n}' for n in cols)})]")
+    else:
+        batch.append(f"    return [{build(items)} for _ in ps]")
+
+    exec("\n".join(row) + "\n\n" + "\n".join(batch), ns)
+    return ns["project"], ns["project_batch"]
+
+_COMPILED = {dest: compile_schema(schema) for dest, schema in SCHEMAS.items()}
+
+def normalise_destination(dest: str) -> str:
+    return (dest or "").strip().lower()
+
+@timed("routing.shape_for_destination")
+def shape_for_destination(dest: str, payload: dict) -> dict:
+    dest = normalise_destination(dest)
+    if dest not in _COMPILED:
+        return {"destination": dest, "payload": payload}
+    return _COMPILED[dest][0](payload)
+
+@timed("routing.shape_batch", rows=len)
+def shape_batch(dest: str, payloads: list) -> list:
+    """Shape many reports for one destination, projecting column by column."""
+    dest = normalise_destination(dest)
+    if dest not in _COMPILED:
+        return [{"destination": dest, "payload": p} for p in payloads]
+    return _COMPILED[dest][1](payloads)
@@ -0,0 +1,201 @@
+"""Completeness and validity rules for reports, shared by the form and bulk audits.
+
+Each rule is `(field, when, check)`:
+  field  "section.key" in the report payload
+  when   conditions that must all hold for the rule to apply, each
+         (field, op, value) with op "==", "!=" or "contains" (list fields)
+  check  "required", or a format applied to filled values: "abn", "email",
+         "date" (YYYY-MM-DD) or "time" (HH:MM:SS)
+
+The table is compiled once into per-payload predicates, for the live
+progress bar, and into column-wise NumPy masks, for `audit_frame`.
+"""
+import re
+import json
+import datetime as dt
+from typing import NamedTuple
+
+import numpy as np
+
+from utils.metrics import timed
+from utils.validators import is_valid_abn, is_valid_email, valid_abn_mask, valid_email_mask
+
+CYBER = ("purpose.purposes", "contains", "Cybersecurity Incident")
+RANSOMWARE = ("purpose.purposes", "contains", "Ransomware/Cyber Extortion Payment")
+HAS_ABN = ("organisation.abn_status", "==", "has_abn")
+
+RULES = [
+    ("reporter.first_name", (), "required"),
+    ("reporter.surname", (), "required"),
+    ("reporter.email", (), "required"),
+    ("reporter.email", (), "email"),
+    ("reporter.phone", (), "required"),
+
+    ("organisation.name", (), "required"),
+    ("organisation.jurisdiction", (), "required"),
+    ("organisation.address", (), "required"),
+    ("organisation.abn", (HAS_ABN,), "required"),
+    ("organisation.abn", (HAS_ABN,), "abn"),
+    ("organisation.abn_reason", (("organisation.abn_status", "!=", "has_abn"),), "required"),
+    ("organisation.postcode", (("organisation.jurisdiction", "==", "ACT"),), "required"),
+    ("organisation.country", (("organisation.jurisdiction", "==", "Overseas"),), "required"),
+    ("organisation.secondary_email", (), "email"),
+
+    ("purpose.purposes", (), "required"),
+    ("purpose.ci_member", (CYBER,), "required"),
+    ("purpose.consent_home_affairs", (CYBER,), "required"),
+    ("purpose.ci_sectors", (CYBER, ("purpose.ci_member", "==", "Yes")), "required"),
+
+    ("incident.type", (), "required"),
+    ("incident.other_type_text", (("incident.type", "==", "Other"),), "required"),
+    ("incident.infra_impacted", (), "required"),
+    ("incident.infra_impact_details", (("incident.infra_impacted", "==", "Yes"),), "required"),
+    ("incident.customers_impacted", (), "required"),
+    ("incident.occurrence_date", (), "required"),
+    ("incident.occurrence_date", (), "date"),
+    ("incident.occurrence_time", (), "required"),
+    ("incident.occurrence_time", (), "time"),
+    ("incident.identified_date", (), "required"),
+    ("incident.identified_date", (), "date"),
+    ("incident.identified_time", (), "required"),
+    ("incident.identified_time", (), "time"),
+    ("incident.ongoing", (), "required"),
+    ("incident.identified_by", (), "required"),
+    ("incident.narrative", (), "required"),
+
+    ("ransomware.payment_demanded", (RANSOMWARE,), "required"),
+    ("ransomware.communicated_with_extorter", (RANSOMWARE,), "required"),
+]
+
+def _iso(parse, pattern: str):
+    """Exactly `pattern`, and a real date / time (fromisoformat alone also takes "20260111" or "10:00")."""
+    shape = re.compile(pattern)
+    def check(v) -> bool:
+        if not isinstance(v, str) or not shape.fullmatch(v):
+            return False
+        try:
+            parse(v)
+            return True
+        except ValueError:
+            return False
+    return check
+
+FORMATS = {
+    "abn": is_valid_abn,
+    "email": is_valid_email,
+    "date": _iso(dt.date.fromisoformat, r"[0-9]{4}-[0-9]{2}-[0-9]{2}"),
+    "time": _iso(dt.time.fromisoformat, r"[0-9]{2}:[0-9]{2}:[0-9]{2}"),
+}
+
+class Rule(NamedTuple):
+    field: str
+    section: str
+    key: str
+    when: tuple
+    check: str
+
+def compile_rules(rules: list) -> list:
+    return [Rule(field, *field.split(".", 1), tuple(when), check) for field, when, check in rules]
+
+COMPILED = compile_rules(RULES)
+FIELDS = sorted({r.field for r in COMPILED} | {c[0] for r in COMPILED for c in r.when})
+
+# ---------- one payload ----------
+def _get(payload: dict, field: str):
+    section, key = field.split(".", 1)
+    return (payload.get(section) or {}).get(key)
+
+def _holds(payload: dict, cond: tuple) -> bool:
+    field, op, value = cond
+    v = _get(payload, field)
+    if op == "contains":
+        return isinstance(v, list) and value in v
+    return (v == value) if op == "==" else (v != value)
+
+def evaluate(payload: dict) -> tuple:
+    """`(required, filled, missing fields, invalid fields)` for one report payload."""
+    required = filled = 0
+    missing, invalid = [], []
+    for rule in COMPILED:
+        if not all(_holds(payload, c) for c in rule.when):
+            continue
+        v = _get(payload, rule.field)
+        if rule.check == "required":
+            required += 1
+            if v:
+                filled += 1
+            else:
+                missing.append(rule.field)
+        elif v and not FORMATS[rule.check](v):
+            invalid.append(rule.field)
+    return required, filled, missing, invalid
+
+def completion_percent(payload: dict) -> int:
+    required, filled, _, _ = evaluate(payload)
+    return int(100 * filled / max(required, 1))
+
+# ---------- many reports ----------
+def _filled_mask(col) -> np.ndarray:
+    return (col.notna() & (col != "") & (col != "[]")).to_numpy()
+
+def _cond_mask(df, cond: tuple) -> np.ndarray:
+    field, op, value = cond
+    col = df[field]
+    if op == "contains":
+        # list fields arrive as JSON text from json_extract
+        return col.str.contains(json.dumps(value), regex=False, na=False).to_numpy(dtype=bool)
+    return (col == value).to_numpy() if op == "==" else (col != value).to_numpy()
+
+def _format_mask(col, check: str) -> np.ndarray:
+    if check == "abn":
+        return valid_abn_mask(col)
+    if check == "email":
+        return valid_email_mask(col)
+    # the same predicate as the live check, once per distinct value (dates and times repeat a lot)
+    ok = {v: FORMATS[check](v) for v in col.dropna().unique()}
+    return col.map(ok).fillna(False).to_numpy(dtype=bool)
+
+def audit_frame(df):
+    """Evaluate every rule over a frame with one column per FIELDS entry.
+
+    Returns `(complete %, missing, invalid)` arrays aligned with `df`'s rows;
+    missing and invalid hold comma-separated field names.
+    """
+    n = len(df)
+    required = np.zeros(n, dtype=np.int32)
+    filled = np.zeros(n, dtype=np.int32)
+    missing = np.full(n, "", dtype=object)
+    invalid = np.full(n, "", dtype=object)
+    conds = {}
+    for rule in COMPILED:
+        applies = np.ones(n, dtype=bool)
+        for c in rule.when:
+            if c not in conds:
+                conds[c] = _cond_mask(df, c)
+            applies &= conds[c]
+        has = _filled_mask(df[rule.field])
+        if rule.check == "required":
+            required += applies
+            filled += applies & has
+            bad = applies & ~has
+            missing[bad] += rule.field + ","
+        else:
+            bad = applies & has & ~_format_mask(df[rule.field], rule.check)
+            invalid[bad] += rule.field + ","
+    pct = (100 * filled // np.maximum(required, 1)).astype(np.int32)
+    strip = np.vectorize(lambda s: s.rstrip(","), otypes=[object])
+    return pct, strip(missing) if n else missing, strip(invalid) if n else invalid
+
+@timed("rules.audit_reports", rows=len)
+def audit_reports(filters=None, problems_only: bool = True):
+    """Audit stored reports against RULES, as a DataFrame (one row per report)."""
+    from utils.storage import fetch_fields_df
+    df = fetch_fields_df(FIELDS, filters)
+    pct, missing, invalid = audit_frame(df)
+    out = df[["id", "ref", "status"]].rename(columns={"id": "ID", "ref": "Ref", "status": "Status"})
+    out["Complete %"] = pct
+    out["Missing"] = missing
+    out["Invalid"] = invalid
+    if problems_only:
+        out = out[(out["Missing"] != "") | (out["Invalid"] != "")]
+    return out.reset_index(drop=True)
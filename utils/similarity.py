@@ -0,0 +1,62 @@
+"""MinHash signatures and LSH band keys for near-duplicate report detection.
+
+A report is reduced to a set of shingles: word 3-grams of the incident
+narrative plus tokens for the organisation name, ABN and occurrence date.
+MINHASH_PERMUTATIONS hashes of that set form its signature. The signature
+is cut into LSH_BANDS bands, and two reports sharing any band become
+candidates. Only candidates are compared, by the share of equal signature
+values (an estimate of their Jaccard similarity).
+"""
+import re
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from utils.config import MINHASH_PERMUTATIONS, LSH_BANDS
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(20240601)  # fixed: stored signatures must stay comparable
+_A = _rng.randint(1, 1 << 29, MINHASH_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, 1 << 29, MINHASH_PERMUTATIONS).astype(np.uint64)
+_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+def shingles(narrative: Optional[str], org_name: Optional[str] = None, abn: Optional[str] = None,
+             occurrence_date: Optional[str] = None) -> set:
+    words = re.findall(r"\w+", (narrative or "").lower())
+    out = {" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 0))}
+    if 0 < len(words) < 3:
+        out.add(" ".join(words))
+    out.update(f"org:{w}" for w in re.findall(r"\w+", (org_name or "").lower()))
+    digits = re.sub(r"\D", "", abn or "")
+    if digits:
+        out.add(f"abn:{digits}")
+    if occurrence_date:
+        out.add(f"date:{occurrence_date}")
+    return out
+
+def report_shingles(payload: dict) -> set:
+    """shingles() for a report payload dict."""
+    org = payload.get("organisation") or {}
+    incident = payload.get("incident") or {}
+    return shingles(incident.get("narrative"), org.get("name"), org.get("abn"), incident.get("occurrence_date"))
+
+def signature(tokens: set) -> Optional[np.ndarray]:
+    """MinHash signature (uint32 × MINHASH_PERMUTATIONS), or None for an empty set."""
+    if not tokens:
+        return None
+    h = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+    return ((np.outer(h, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+def band_keys(sig: np.ndarray) -> list:
+    """`[(band, key bytes)]`, one per LSH band."""
+    raw = sig.tobytes()
+    width = _ROWS * 4
+    return [(b, raw[b * width:(b + 1) * width]) for b in range(LSH_BANDS)]
+
+def similarities(sig: np.ndarray, blobs: list) -> np.ndarray:
+    """Estimated Jaccard similarity of `sig` to each stored signature blob (empty blobs score 0)."""
+    width = len(sig) * 4
+    blobs = [b if len(b) == width else bytes(width) for b in blobs]
+    others = np.frombuffer(b"".join(blobs), dtype=np.uint32).reshape(len(blobs), len(sig))
+    return (others == sig).mean(axis=1)
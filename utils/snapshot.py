@@ -0,0 +1,163 @@
+"""Columnar analytics snapshot of submitted reports.
+
+Reports are flattened into one typed column per model field and written as
+a Parquet dataset under SNAPSHOT_DIR, hive-partitioned by the month the
+report was created (`month=YYYY-MM/part-<first id>-<last id>.parquet`).
+Low-cardinality answers are dictionary-encoded. Each run exports the
+reports submitted since the last one, by submission order rather than id,
+so a draft submitted late is not skipped, and archived reports are read
+too; `rebuild=True` starts over.
+
+Drafts are left out. The state only advances when a run completes; a run
+that fails removes the files it wrote.
+"""
+import os
+import json
+import shutil
+import datetime as dt
+from typing import Optional
+
+from utils.config import SNAPSHOT_DIR
+from utils.models import ReportFilter, SECTION_MODELS
+from utils.storage import iter_report_rows, submitted_seq
+
+STATE_FILE = "_state.json"
+FLUSH_ROWS = 100_000
+
+LIST_FIELDS = {"purpose_purposes", "purpose_cybersecurity_reason", "purpose_ci_sectors", "ransomware_variants"}
+DATE_FIELDS = {"incident_occurrence_date", "incident_identified_date"}
+TIME_FIELDS = {"incident_occurrence_time", "incident_identified_time"}
+CATEGORICAL_FIELDS = {
+    "status", "organisation_abn_status", "organisation_jurisdiction", "organisation_country",
+    "purpose_ci_member", "purpose_consent_home_affairs",
+    "incident_type", "incident_infra_impacted", "incident_customers_impacted", "incident_ongoing",
+    "incident_identified_by",
+    "ransomware_payment_demanded", "ransomware_payment_provided", "ransomware_communicated_with_extorter",
+}
+COLUMNS = ["id", "created_at", "status"] + [
+    f"{section}_{field}" for section, model in SECTION_MODELS.items() for field in model.model_fields
+]
+
+def _pa():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Analytics snapshots need pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+def arrow_schema():
+    pa, _ = _pa()
+    fields = []
+    for name in COLUMNS:
+        if name == "id":
+            t = pa.int64()
+        elif name == "created_at":
+            t = pa.timestamp("s")
+        elif name in LIST_FIELDS:
+            t = pa.list_(pa.string())
+        elif name in DATE_FIELDS:
+            t = pa.date32()
+        elif name in TIME_FIELDS:
+            t = pa.time32("s")
+        elif name in CATEGORICAL_FIELDS:
+            t = pa.dictionary(pa.int32(), pa.string())
+        else:
+            t = pa.string()
+        fields.append(pa.field(name, t))
+    return pa.schema(fields)
+
+def _parse(name: str, v):
+    if v in (None, "", "None"):
+        return [] if name in LIST_FIELDS else None
+    try:
+        if name in DATE_FIELDS:
+            return dt.date.fromisoformat(v)
+        if name in TIME_FIELDS:
+            return dt.time.fromisoformat(v)
+    except (TypeError, ValueError):
+        return None
+    if name in LIST_FIELDS:
+        return [str(x) for x in v] if isinstance(v, list) else [str(v)]
+    return v if isinstance(v, str) else str(v)
+
+def _flatten(row, columns: dict):
+    columns["id"].append(row[0])
+    columns["created_at"].append(dt.datetime.fromisoformat(row[1]) if row[1] else None)
+    columns["status"].append(row[3])
+    for text, (section, model) in zip(row[4:], SECTION_MODELS.items()):
+        data = json.loads(text) if text else {}
+        for field in model.model_fields:
+            name = f"{section}_{field}"
+            columns[name].append(_parse(name, data.get(field)))
+
+def _load_state(root: str) -> dict:
+    try:
+        with open(os.path.join(root, STATE_FILE)) as fh:
+            state = json.load(fh)
+    except FileNotFoundError:
+        return {"last_seq": 0}
+    # snapshots from before submission order was tracked: those ids are the reports' sequence numbers
+    return {"last_seq": state.get("last_seq", state.get("last_id", 0))}
+
+def _save_state(root: str, state: dict):
+    tmp = os.path.join(root, STATE_FILE + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, os.path.join(root, STATE_FILE))
+
+def _flush(root: str, by_month: dict) -> list:
+    """Write the buffered rows as one part per month; returns the paths written."""
+    pa, pq = _pa()
+    schema = arrow_schema()
+    paths = []
+    for month, columns in by_month.items():
+        if not columns["id"]:
+            continue
+        table = pa.table({n: pa.array(columns[n], type=schema.field(n).type) for n in COLUMNS}, schema=schema)
+        part_dir = os.path.join(root, f"month={month}")
+        os.makedirs(part_dir, exist_ok=True)
+        paths.append(os.path.join(part_dir, f"part-{columns['id'][0]}-{columns['id'][-1]}.parquet"))
+        pq.write_table(table, paths[-1], compression="zstd")
+    by_month.clear()
+    return paths
+
+def export_snapshot(root: str = SNAPSHOT_DIR, rebuild: bool = False) -> int:
+    """Append reports submitted since the last snapshot; returns how many were written."""
+    _pa()
+    if rebuild:
+        shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(root, exist_ok=True)
+    after = _load_state(root)["last_seq"]
+    upto = submitted_seq()
+    by_month: dict = {}
+    parts: list = []
+    pending = written = 0
+    try:
+        for rows in iter_report_rows(ReportFilter(status="submitted", archived=True), submitted_in=(after, upto)):
+            for row in rows:
+                month = (row[1] or "")[:7] or "unknown"
+                _flatten(row, by_month.setdefault(month, {n: [] for n in COLUMNS}))
+            pending += len(rows)
+            written += len(rows)
+            if pending >= FLUSH_ROWS:
+                parts += _flush(root, by_month)
+                pending = 0
+        parts += _flush(root, by_month)
+    except BaseException:
+        for path in parts:
+            os.remove(path)
+        raise
+    _save_state(root, {"last_seq": upto})
+    return written
+
+def snapshot_state(root: str = SNAPSHOT_DIR) -> dict:
+    return _load_state(root)
+
+def read_snapshot(columns: Optional[list] = None, months: Optional[list] = None, root: str = SNAPSHOT_DIR):
+    """Load the snapshot (or some columns / months of it) as a pandas DataFrame."""
+    import pandas as pd
+    if not os.path.isdir(root) or not any(d.startswith("month=") for d in os.listdir(root)):
+        return pd.DataFrame(columns=columns or COLUMNS + ["month"])
+    filters = [("month", "in", months)] if months else None
+    return pd.read_parquet(root, engine="pyarrow", columns=columns, filters=filters)
@@ -1,11 +1,79 @@
 import os
+import glob
+import shutil
+import re
+import atexit
 import json
 import uuid
+import hashlib
+import queue
+import zipfile
 import sqlite3
+import time
+import threading
+from functools import lru_cache
+
+import numpy as np
+from concurrent.futures import Future
+from contextlib import contextmanager
 from typing import List, Optional
 
-from utils.config import DB_PATH
-from utils.routing import shape_for_destination
+from utils.config import (
+    DB_PATH, DB_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KIB, DB_MMAP_SIZE,
+    WRITE_BEHIND, WRITE_BATCH_MAX, WRITE_BATCH_WAIT_MS, DUPLICATE_THRESHOLD,
+    BUCKET_CANDIDATES, MAX_DUPLICATES,
+    ARCHIVE_DIR, ARCHIVE_AFTER_DAYS, DRAFT_EXPIRY_DAYS, VACUUM_STEP_PAGES, SNAPSHOT_DIR,
+    PAYLOAD_ENCODING, PAYLOAD_DICT_SAMPLES,
+)
+from utils.models import ReportFilter
+from utils.metrics import timed
+from utils.routing import DESTINATIONS, ROUTING_VERSION, SCHEMA_VERSION, destinations_for, normalise_destination, shape_batch, shape_for_destination
+from utils.submission import PreparedReport, prepare_report
+from utils.payload import CODEC, HOT_FIELDS, compress, decompress, is_hot, merge, split, sql_value, train
+from utils.similarity import band_keys, report_shingles, shingles, signature, similarities
+from utils.attachments import CHUNK_SIZE, blob_path, discard_blobs, iter_file, store_upload, purge_store
+from utils.writer import GroupCommitWriter
+
+def _fts_values(p: str) -> str:
+    """Column expressions feeding reports_fts from a reports row aliased by prefix `p`."""
+    return (
+        f"{p}id, {p}ref, "
+        f"trim(coalesce(json_extract({p}reporter_json, '$.first_name'), '') || ' ' || "
+        f"coalesce(json_extract({p}reporter_json, '$.surname'), '')), "
+        f"json_extract({p}reporter_json, '$.email'), "
+        f"json_extract({p}organisation_json, '$.name'), "
+        f"json_extract({p}incident_json, '$.type'), "
+        f"json_extract({p}incident_json, '$.narrative')"
+    )
+
+_TTI_MINUTES = (
+    "(julianday(json_extract({p}.incident_json, '$.identified_date') || ' ' || json_extract({p}.incident_json, '$.identified_time'))"
+    " - julianday(json_extract({p}.incident_json, '$.occurrence_date') || ' ' || json_extract({p}.incident_json, '$.occurrence_time'))) * 1440"
+)
+
+_SUBMITTED_DAY = "date(coalesce({p}submitted_at, {p}created_at))"
+
+def _rollup_sql(p: str, sign: int) -> str:
+    """Statements adding `sign` × the report row aliased `p` to report_rollups.
+
+    Status counts cover every row; the other dimensions count submitted reports only.
+    """
+    upsert = " ON CONFLICT(dimension, value) DO UPDATE SET n = n + excluded.n, total = total + excluded.total;"
+    submitted = f"{p}.status = 'submitted'"
+    tti = _TTI_MINUTES.format(p=p)
+    return "\n".join(s + upsert for s in [
+        f"INSERT INTO report_rollups(dimension, value, n, total) SELECT 'status', coalesce({p}.status, ''), {sign}, 0 WHERE 1",
+        f"INSERT INTO report_rollups(dimension, value, n, total) SELECT 'incident_type', "
+        f"coalesce(json_extract({p}.incident_json, '$.type'), ''), {sign}, 0 WHERE {submitted}",
+        f"INSERT INTO report_rollups(dimension, value, n, total) SELECT 'jurisdiction', "
+        f"coalesce(json_extract({p}.organisation_json, '$.jurisdiction'), ''), {sign}, 0 WHERE {submitted}",
+        f"INSERT INTO report_rollups(dimension, value, n, total) SELECT 'purpose', j.value, {sign}, 0 "
+        f"FROM json_each({p}.purpose_json, '$.purposes') j WHERE {submitted}",
+        f"INSERT INTO report_rollups(dimension, value, n, total) SELECT 'day', {_SUBMITTED_DAY.format(p=p + '.')}, {sign}, 0 "
+        f"WHERE {submitted}",
+        f"INSERT INTO report_rollups(dimension, value, n, total) SELECT 'time_to_identify', 'all', {sign}, {sign} * m "
+        f"FROM (SELECT {tti} AS m) WHERE {submitted} AND m IS NOT NULL",
+    ])
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS reports (
@@ -20,163 +88,1645 @@ CREATE TABLE IF NOT EXISTS reports (
     ransomware_json TEXT
 );
 CREATE INDEX IF NOT EXISTS idx_reports_ref ON reports(ref);
+CREATE INDEX IF NOT EXISTS idx_reports_status ON reports(status, id);
+
+-- one row per CI sector ticked in purpose_json, for indexed sector filters
+CREATE TABLE IF NOT EXISTS report_ci_sectors (
+    sector TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (sector, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_report_ci_sectors_report ON report_ci_sectors(report_id);
+CREATE TRIGGER IF NOT EXISTS report_ci_sectors_ai AFTER INSERT ON reports BEGIN
+    INSERT OR IGNORE INTO report_ci_sectors(sector, report_id)
+    SELECT value, new.id FROM json_each(new.purpose_json, '$.ci_sectors');
+END;
+CREATE TRIGGER IF NOT EXISTS report_ci_sectors_au AFTER UPDATE OF purpose_json ON reports BEGIN
+    DELETE FROM report_ci_sectors WHERE report_id = old.id;
+    INSERT OR IGNORE INTO report_ci_sectors(sector, report_id)
+    SELECT value, new.id FROM json_each(new.purpose_json, '$.ci_sectors');
+END;
+CREATE TRIGGER IF NOT EXISTS report_ci_sectors_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM report_ci_sectors WHERE report_id = old.id;
+END;
+
+-- destinations each report is due to, resolved by utils.routing.destinations_for
+-- when the report is written; rebuilt on start-up when ROUTING_VERSION changes
+CREATE TABLE IF NOT EXISTS report_destinations (
+    destination TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (destination, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_report_destinations_report ON report_destinations(report_id);
+CREATE TRIGGER IF NOT EXISTS report_destinations_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM report_destinations WHERE report_id = old.id;
+END;
 
 CREATE TABLE IF NOT EXISTS attachments (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     report_id INTEGER NOT NULL,
     filename TEXT,
-    content BLOB,
+    content BLOB,                    -- legacy inline copy; new files live in the attachment store
     FOREIGN KEY(report_id) REFERENCES reports(id) ON DELETE CASCADE
 );
+CREATE INDEX IF NOT EXISTS idx_attachments_report ON attachments(report_id);
+
+-- data_version is bumped by every write to reports; read caches key on it
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+INSERT OR IGNORE INTO meta(key, value) VALUES ('data_version', 0);
+CREATE TRIGGER IF NOT EXISTS data_version_ai AFTER INSERT ON reports BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+CREATE TRIGGER IF NOT EXISTS data_version_au AFTER UPDATE ON reports BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+CREATE TRIGGER IF NOT EXISTS data_version_ad AFTER DELETE ON reports BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+
+-- shaped destination payloads, valid while the report's content hash and
+-- utils.routing.SCHEMA_VERSION match; dropped whenever the report row changes
+CREATE TABLE IF NOT EXISTS destination_payloads (
+    report_id INTEGER NOT NULL,
+    destination TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    schema_version TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (report_id, destination)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS destination_payloads_au AFTER UPDATE ON reports BEGIN
+    DELETE FROM destination_payloads WHERE report_id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS destination_payloads_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM destination_payloads WHERE report_id = old.id;
+END;
+
+-- deliveries owed to each destination, queued at submit time and drained by
+-- utils.dispatch; status is 'pending', 'delivered' or 'failed'
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id INTEGER NOT NULL,
+    destination TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,  -- unix time; also the claim lease
+    last_error TEXT,
+    created_at TEXT DEFAULT (datetime('now')),
+    delivered_at TEXT,
+    UNIQUE (report_id, destination)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(destination, status, next_attempt_at);
+CREATE TRIGGER IF NOT EXISTS outbox_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM outbox WHERE report_id = old.id;
+END;
+
+-- near-duplicate detection (utils.similarity): MinHash signatures and LSH
+-- band keys of submitted reports, and the likely duplicates found when each
+-- report was indexed (always pointing at an earlier report)
+CREATE TABLE IF NOT EXISTS report_minhash (
+    report_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket BLOB NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, report_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_lsh_buckets_report ON lsh_buckets(report_id);
+CREATE TABLE IF NOT EXISTS report_duplicates (
+    report_id INTEGER NOT NULL,
+    duplicate_of INTEGER NOT NULL,
+    similarity REAL NOT NULL,
+    PRIMARY KEY (report_id, duplicate_of)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_report_duplicates_of ON report_duplicates(duplicate_of);
+CREATE TRIGGER IF NOT EXISTS similarity_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM report_minhash WHERE report_id = old.id;
+    DELETE FROM lsh_buckets WHERE report_id = old.id;
+    DELETE FROM report_duplicates WHERE report_id = old.id OR duplicate_of = old.id;
+END;
+
+-- compression dictionaries for packed payloads (utils.payload); never
+-- deleted, since every packed row names the one it was written with
+CREATE TABLE IF NOT EXISTS payload_dicts (
+    id INTEGER PRIMARY KEY,
+    codec TEXT NOT NULL,
+    dict BLOB NOT NULL,
+    samples INTEGER,
+    created_at TEXT DEFAULT (datetime('now'))
+);
+
+-- full-text index over the searchable report fields, kept in sync by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    ref, reporter, email, organisation, incident_type, narrative,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+    INSERT INTO reports_fts(rowid, ref, reporter, email, organisation, incident_type, narrative)
+    VALUES ({fts_new});
+END;
+CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM reports_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE ON reports BEGIN
+    DELETE FROM reports_fts WHERE rowid = old.id;
+    INSERT INTO reports_fts(rowid, ref, reporter, email, organisation, incident_type, narrative)
+    VALUES ({fts_new});
+END;
+
+-- counts per (dimension, value) kept current by triggers; `total` carries
+-- summed minutes for the time_to_identify dimension
+CREATE TABLE IF NOT EXISTS report_rollups (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, value)
+) WITHOUT ROWID;
+""".format(fts_new=_fts_values("new."))
+
+# filterable fields lifted out of the JSON blobs as indexed virtual columns
+GENERATED_COLUMNS = {
+    "jurisdiction": "json_extract(organisation_json, '$.jurisdiction')",
+    "incident_type": "json_extract(incident_json, '$.type')",
+    "occurrence_date": "json_extract(incident_json, '$.occurrence_date')",
+    "ci_member": "json_extract(purpose_json, '$.ci_member')",
+}
+
+SECTIONS = ["reporter", "organisation", "purpose", "incident", "ransomware"]
+
+REPORT_COLUMNS = {
+    "content_hash": "TEXT",  # sha256 over the section JSON, see _content_hash
+    "draft_version": "INTEGER",  # drafts only: bumped by each save that changes something
+    "payload": "BLOB",  # packed reports only: the cold fields, see utils.payload
+    "submitted_seq": "INTEGER",  # submission order, see _next_submitted_seq; NULL for drafts
+    # when it was submitted; a promoted draft's created_at is its first save. NULL for
+    # drafts and for reports submitted before the column existed (read created_at)
+    "submitted_at": "TEXT",
+    # drafts only: per-section hashes, see _section_hash
+    **{f"{s}_hash": "TEXT" for s in SECTIONS},
+}
+
+# attachment metadata; the bytes live in utils.attachments' content-addressed store
+ATTACHMENT_COLUMNS = {
+    "sha256": "TEXT",
+    "size": "INTEGER",
+    "mime_type": "TEXT",
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_attachments_sha256 ON attachments(sha256);
+CREATE INDEX IF NOT EXISTS idx_reports_jurisdiction ON reports(jurisdiction);
+CREATE INDEX IF NOT EXISTS idx_reports_incident_type ON reports(incident_type);
+CREATE INDEX IF NOT EXISTS idx_reports_occurrence_date ON reports(occurrence_date);
+CREATE INDEX IF NOT EXISTS idx_reports_submitted_seq ON reports(submitted_seq);
 """
 
-def _conn():
+# Needs the REPORT_COLUMNS, so it runs after they are added.
+ROLLUP_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS report_rollups_ai AFTER INSERT ON reports BEGIN
+{rollup_add_new}
+END;
+CREATE TRIGGER IF NOT EXISTS report_rollups_au
+AFTER UPDATE OF status, created_at, submitted_at, organisation_json, purpose_json, incident_json ON reports BEGIN
+{rollup_sub_old}
+{rollup_add_new}
+END;
+CREATE TRIGGER IF NOT EXISTS report_rollups_ad AFTER DELETE ON reports BEGIN
+{rollup_sub_old}
+END;
+""".format(
+    rollup_add_new=_rollup_sql("new", 1),
+    rollup_sub_old=_rollup_sql("old", -1),
+)
+
+def _changed(s: str) -> str:
+    return f"new.{s}_hash IS NOT old.{s}_hash"
+
+# draft history; each version holds only the sections that save changed.
+# Needs the REPORT_COLUMNS, so it runs after they are added.
+DRAFT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS draft_versions (
+    ref TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created_at TEXT DEFAULT (datetime('now')),
+    delta TEXT NOT NULL,             -- {{section: json}} for the changed sections
+    PRIMARY KEY (ref, version)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS draft_versions_ai AFTER INSERT ON reports WHEN new.status = 'draft' BEGIN
+    INSERT INTO draft_versions(ref, version, delta)
+    VALUES (new.ref, new.draft_version, json_object({full}));
+END;
+CREATE TRIGGER IF NOT EXISTS draft_versions_au AFTER UPDATE OF draft_version ON reports
+WHEN new.status = 'draft' AND new.draft_version > coalesce(old.draft_version, 0) BEGIN
+    INSERT INTO draft_versions(ref, version, delta)
+    SELECT new.ref, new.draft_version, json_group_object(name, json(body)) FROM (
+        {changed}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS draft_versions_ad AFTER DELETE ON reports BEGIN
+    DELETE FROM draft_versions WHERE ref = old.ref;
+END;
+""".format(
+    full=", ".join(f"'{s}', json(coalesce(new.{s}_json, 'null'))" for s in SECTIONS),
+    changed="\n        UNION ALL ".join(
+        f"SELECT '{s}' AS name, coalesce(new.{s}_json, 'null') AS body WHERE {_changed(s)}" for s in SECTIONS
+    ),
+)
+
+# monthly archive databases (see archive_reports), created on an attached
+# schema {a}. Only what the read paths need: no secondary indexes, and a
+# contentless FTS index, since archived rows are never updated.
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {a}.reports (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT,
+    ref TEXT,
+    status TEXT,
+    reporter_json TEXT NOT NULL,
+    organisation_json TEXT NOT NULL,
+    purpose_json TEXT NOT NULL,
+    incident_json TEXT NOT NULL,
+    ransomware_json TEXT,
+    content_hash TEXT,
+    payload BLOB,
+    submitted_seq INTEGER,
+    submitted_at TEXT,
+    archived_at TEXT DEFAULT (datetime('now')),
+    {generated}
+);
+CREATE TABLE IF NOT EXISTS {a}.report_ci_sectors (
+    sector TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (sector, report_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS {a}.report_destinations (
+    destination TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    PRIMARY KEY (destination, report_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS {a}.attachments (
+    id INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL,
+    filename TEXT,
+    content BLOB,
+    sha256 TEXT,
+    size INTEGER,
+    mime_type TEXT
+);
+CREATE INDEX IF NOT EXISTS {a}.idx_attachments_report ON attachments(report_id);
+CREATE INDEX IF NOT EXISTS {a}.idx_reports_submitted_seq ON reports(submitted_seq);
+-- delivery record of the archived reports (only fully delivered reports are archived)
+CREATE TABLE IF NOT EXISTS {a}.outbox (
+    id INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL,
+    destination TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    attempts INTEGER,
+    created_at TEXT,
+    delivered_at TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS {a}.reports_fts USING fts5(
+    ref, reporter, email, organisation, incident_type, narrative,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- routing_version the archive's report_destinations were resolved under
+CREATE TABLE IF NOT EXISTS {a}.meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+""".replace("{generated}", ",\n    ".join(
+    f"{name} TEXT GENERATED ALWAYS AS ({expr}) VIRTUAL" for name, expr in GENERATED_COLUMNS.items()
+))
+
+ARCHIVE_REPORT_COLUMNS = ", ".join(
+    ["id", "created_at", "ref", "status"] + [f"{s}_json" for s in SECTIONS] + ["content_hash", "payload", "submitted_seq", "submitted_at"]
+)
+
+def _section_sql(s: str, p: str = "") -> str:
+    """SQL for section `s`'s full JSON from a reports row (column prefix `p`), unpacking packed rows."""
+    if HOT_FIELDS[s] is None:
+        return f"{p}{s}_json"
+    return f"CASE WHEN {p}payload IS NULL THEN {p}{s}_json ELSE unpack_section({p}payload, {p}{s}_json, '{s}') END"
+
+def _sections_sql(p: str = "") -> str:
+    return ", ".join(_section_sql(s, p) for s in SECTIONS)
+
+# ---------- connections ----------
+_idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+_init_lock = threading.Lock()
+_schema_ready = False
+
+def _connect() -> sqlite3.Connection:
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    # autocommit; writers open explicit transactions through transaction()
+    c = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                        isolation_level=None, check_same_thread=False)
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KIB}")
+    c.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.create_function("unpack_section", 3, _unpack_section, deterministic=True)
+    return c
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for the duration of the block."""
+    if not _schema_ready:
+        init_db()
+    try:
+        c = _idle.get_nowait()
+    except queue.Empty:
+        c = _connect()
+    try:
+        yield c
+    finally:
+        if c.in_transaction:
+            c.rollback()
+        if _idle.qsize() < DB_POOL_SIZE:
+            _idle.put(c)
+        else:
+            c.close()
+
+@contextmanager
+def transaction():
+    """A pooled connection inside BEGIN IMMEDIATE, committed on success."""
+    with connection() as c:
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            c.rollback()
+            raise
+        c.commit()
+
+def archive_path(month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"reports-{month}.db")
+
+def archive_paths() -> list:
+    """Monthly archive databases, oldest first."""
+    return sorted(glob.glob(os.path.join(ARCHIVE_DIR, "reports-*.db")))
+
+@contextmanager
+def _attached(c, path: str, name: str = "archive"):
+    """ATTACH an archive database to `c` for the block. Statements on it must be finished before it ends."""
+    c.execute(f"ATTACH DATABASE ? AS {name}", (path,))
+    try:
+        # archives written before packing or submission order and time; a new month's
+        # file is empty until _archive_month creates it
+        if c.execute(f"SELECT 1 FROM {name}.sqlite_master WHERE type='table' AND name='reports'").fetchone():
+            added = _ensure_columns(c, "reports", {"payload": "BLOB", "submitted_seq": "INTEGER", "submitted_at": "TEXT"}, name)
+            if "submitted_seq" in added:
+                c.execute(f"UPDATE {name}.reports SET submitted_seq = id")
+                c.execute(f"CREATE INDEX IF NOT EXISTS {name}.idx_reports_submitted_seq ON reports(submitted_seq)")
+        yield name
+    finally:
+        c.execute(f"DETACH DATABASE {name}")
+
+def _sources(c, archived: bool, oldest_first: bool = False):
+    """Schema names to read reports from: "main", then with `archived` each
+    archive attached in turn, newest month first (or all oldest first)."""
+    paths = archive_paths() if archived else []
+    if not oldest_first:
+        yield "main"
+    for path in (paths if oldest_first else reversed(paths)):
+        with _attached(c, path) as name:
+            yield name
+    if oldest_first:
+        yield "main"
+
+_writer: Optional[GroupCommitWriter] = None
+
+def _get_writer() -> GroupCommitWriter:
+    global _writer
+    with _init_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(_connect, WRITE_BATCH_MAX, WRITE_BATCH_WAIT_MS / 1000)
+            atexit.register(_writer.close)
+    return _writer
+
+def _write_async(fn, *args) -> Future:
+    """Run write job `fn(conn, *args)`; queued for group commit when write-behind is on."""
+    if not _schema_ready:
+        init_db()
+    if WRITE_BEHIND:
+        return _get_writer().submit(fn, *args)
+    fut: Future = Future()
+    try:
+        with transaction() as c:
+            fut.set_result(fn(c, *args))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+def _ensure_columns(c, table: str, columns: dict, schema: str = "main") -> list:
+    """Add any missing columns, given as {name: column definition}; returns the names added."""
+    have = {r[1] for r in c.execute(f"PRAGMA {schema}.table_xinfo({table})")}
+    added = [name for name in columns if name not in have]
+    for name in added:
+        c.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {name} {columns[name]}")
+    return added
+
+def _backfill_content_hashes(c, chunk_size: int = 1000):
+    while True:
+        rows = c.execute(
+            f"SELECT id, {_sections_sql()} FROM reports WHERE content_hash IS NULL LIMIT ?", (chunk_size,)
+        ).fetchall()
+        if not rows:
+            return
+        with c:
+            c.execute("BEGIN IMMEDIATE")
+            c.executemany("UPDATE reports SET content_hash=? WHERE id=?",
+                          [(_content_hash(r[1:]), r[0]) for r in rows])
+
+def _backfill_draft_versions(c, chunk_size: int = 1000):
+    """Hash the sections of drafts saved before versioning; records them as version 1."""
+    while True:
+        rows = c.execute(
+            "SELECT id, reporter_json, organisation_json, purpose_json, incident_json, ransomware_json "
+            "FROM reports WHERE status = 'draft' AND draft_version IS NULL LIMIT ?", (chunk_size,)
+        ).fetchall()
+        if not rows:
+            return
+        with c:
+            c.execute("BEGIN IMMEDIATE")
+            c.executemany(
+                f"UPDATE reports SET {', '.join(f'{s}_hash=?' for s in SECTIONS)}, draft_version=1 WHERE id=?",
+                [tuple(_section_hash(t) for t in r[1:]) + (r[0],) for r in rows],
+            )
+
+def _backfill_similarity(c, chunk_size: int = 500):
+    """Index submitted reports saved before near-duplicate detection, oldest first."""
+    while True:
+        rows = c.execute(
+            f"SELECT id, {_section_sql('organisation')}, {_section_sql('incident')} FROM reports "
+            "WHERE status = 'submitted' AND id NOT IN (SELECT report_id FROM report_minhash) "
+            "ORDER BY id LIMIT ?", (chunk_size,)
+        ).fetchall()
+        if not rows:
+            return
+        with c:
+            c.execute("BEGIN IMMEDIATE")
+            _index_similarity(c, [
+                (r[0], report_shingles({"organisation": json.loads(r[1]), "incident": json.loads(r[2])}))
+                for r in rows
+            ], placeholder=True)
 
 def init_db():
-    with _conn() as c:
-        c.executescript(SCHEMA)
+    """Create and migrate the schema; does the work once per process."""
+    global _schema_ready
+    with _init_lock:
+        if _schema_ready:
+            return
+        c = _connect()
+        try:
+            # only takes effect on a new database; incremental_vacuum() converts older ones
+            c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            c.executescript(SCHEMA)
+            # SQLite can only ALTER in VIRTUAL generated columns
+            _ensure_columns(c, "reports", {
+                name: f"TEXT GENERATED ALWAYS AS ({expr}) VIRTUAL" for name, expr in GENERATED_COLUMNS.items()
+            })
+            if "submitted_at" in _ensure_columns(c, "reports", REPORT_COLUMNS):
+                # older triggers bucketed the rollup day by created_at
+                c.executescript("DROP TRIGGER IF EXISTS report_rollups_ai; DROP TRIGGER IF EXISTS report_rollups_au; "
+                                "DROP TRIGGER IF EXISTS report_rollups_ad;")
+            c.executescript(ROLLUP_TRIGGERS)
+            if not c.execute("SELECT 1 FROM meta WHERE key='submitted_seq'").fetchone():
+                # reports submitted before the counter existed keep their id as their place
+                with c:
+                    c.execute("BEGIN IMMEDIATE")
+                    c.execute("UPDATE reports SET submitted_seq = id WHERE status = 'submitted'")
+                    c.execute("INSERT INTO meta(key, value) VALUES ('submitted_seq', "
+                              "coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'reports'), 0))")
+            _ensure_columns(c, "attachments", ATTACHMENT_COLUMNS)
+            c.executescript(INDEXES)
+            c.executescript(DRAFT_SCHEMA)
+            c.execute(
+                "INSERT OR IGNORE INTO report_ci_sectors(sector, report_id) "
+                "SELECT j.value, reports.id FROM reports, json_each(reports.purpose_json, '$.ci_sectors') j "
+                "WHERE reports.id NOT IN (SELECT report_id FROM report_ci_sectors)"
+            )
+            # index rows written before the FTS triggers existed
+            c.execute(
+                "INSERT INTO reports_fts(rowid, ref, reporter, email, organisation, incident_type, narrative) "
+                f"SELECT {_fts_values('reports.')} FROM reports "
+                "WHERE reports.id NOT IN (SELECT rowid FROM reports_fts)"
+            )
+            _backfill_content_hashes(c)
+            _backfill_draft_versions(c)
+            _backfill_similarity(c)
+            _reroute(c)
+            if not c.execute("SELECT 1 FROM report_rollups LIMIT 1").fetchone():
+                _rebuild_rollups(c)
+        finally:
+            c.close()
+        _schema_ready = True
+
+def _fts_match(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression: every word, prefix-matched."""
+    words = re.findall(r"\w+", query or "")
+    return " ".join(f'"{w}"*' for w in words) or None
+
+def payload_from_row(row) -> dict:
+    """Report payload from the five section JSON columns, in SCHEMA order."""
+    return {
+        "reporter": json.loads(row[0]),
+        "organisation": json.loads(row[1]),
+        "purpose": json.loads(row[2]),
+        "incident": json.loads(row[3]),
+        "ransomware": json.loads(row[4]) if row[4] else None,
+    }
+
+def _content_hash(sections) -> str:
+    """Hash of the five section JSON strings as stored (None for a missing section)."""
+    h = hashlib.sha256()
+    for text in sections:
+        h.update(b"\x00" if text is None else text.encode())
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+def _section_hash(text: Optional[str]) -> Optional[str]:
+    return hashlib.sha256(text.encode()).hexdigest()[:16] if text is not None else None
+
+@timed("storage.data_version")
+def data_version() -> int:
+    """Counter bumped by every write to reports, for cache keys."""
+    with connection() as c:
+        return c.execute("SELECT value FROM meta WHERE key='data_version'").fetchone()[0]
+
+def submitted_seq() -> int:
+    """The newest submission sequence number handed out (see _next_submitted_seq)."""
+    with connection() as c:
+        return c.execute("SELECT value FROM meta WHERE key='submitted_seq'").fetchone()[0]
+
+def _next_submitted_seq(c, n: int = 1) -> int:
+    """Reserve `n` submission sequence numbers, returning the first.
+
+    Unlike ids, which a draft gets when first saved, these follow the order
+    reports were submitted in, so "submitted since" cursors (the analytics
+    snapshot) never miss a draft submitted late.
+    """
+    return c.execute(
+        "UPDATE meta SET value = value + ? WHERE key = 'submitted_seq' RETURNING value", (n,)
+    ).fetchone()[0] - n + 1
+
+def _bump_data_version(c):
+    """For writes the reports triggers do not see (rollups, archives)."""
+    c.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+
+# ---------- rollups ----------
+def _add_rollups(c, table: str = "main.reports", where: str = "1"):
+    """Add the rows of `table` matching `where` to report_rollups."""
+    src = f"(SELECT * FROM {table} WHERE {where}) AS reports"
+    upsert = " ON CONFLICT(dimension, value) DO UPDATE SET n = n + excluded.n, total = total + excluded.total"
+    c.execute(
+        "INSERT INTO main.report_rollups(dimension, value, n, total) "
+        f"SELECT 'status', coalesce(status, ''), count(*), 0 FROM {src} WHERE 1 GROUP BY 1, 2" + upsert
+    )
+    for dim, expr in (("incident_type", "coalesce(json_extract(incident_json, '$.type'), '')"),
+                      ("jurisdiction", "coalesce(json_extract(organisation_json, '$.jurisdiction'), '')"),
+                      ("day", _SUBMITTED_DAY.format(p=""))):
+        c.execute(
+            "INSERT INTO main.report_rollups(dimension, value, n, total) "
+            f"SELECT '{dim}', {expr}, count(*), 0 FROM {src} WHERE status = 'submitted' GROUP BY 2" + upsert
+        )
+    c.execute(
+        "INSERT INTO main.report_rollups(dimension, value, n, total) "
+        f"SELECT 'purpose', j.value, count(*), 0 FROM {src}, json_each(reports.purpose_json, '$.purposes') j "
+        "WHERE reports.status = 'submitted' GROUP BY 2" + upsert
+    )
+    c.execute(
+        "INSERT INTO main.report_rollups(dimension, value, n, total) "
+        f"SELECT 'time_to_identify', 'all', count(m), coalesce(sum(m), 0) "
+        f"FROM (SELECT {_TTI_MINUTES.format(p='reports')} AS m FROM {src} WHERE status = 'submitted') "
+        "WHERE m IS NOT NULL" + upsert
+    )
+
+def _rebuild_rollups(c):
+    """Recount the hot database, then add each archive in its own transaction.
+
+    Each one bumps data_version, so cached rollups are never served stale.
+    """
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute("DELETE FROM report_rollups")
+        _add_rollups(c)
+        _bump_data_version(c)
+        c.commit()
+    except BaseException:
+        c.rollback()
+        raise
+    for path in archive_paths():
+        with _attached(c, path) as name:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                _add_rollups(c, f"{name}.reports")
+                _bump_data_version(c)
+                c.commit()
+            except BaseException:
+                c.rollback()
+                raise
+
+def rebuild_rollups():
+    """Recompute report_rollups from scratch (backfills, or after manual data fixes)."""
+    with connection() as c:
+        _rebuild_rollups(c)
+
+@timed("storage.fetch_rollups")
+def fetch_rollups() -> dict:
+    """{dimension: [(value, count), ...]} plus average time-to-identify in minutes."""
+    with connection() as c:
+        rows = c.execute(
+            "SELECT dimension, value, n, total FROM report_rollups WHERE n > 0 ORDER BY dimension, n DESC"
+        ).fetchall()
+    out: dict = {}
+    for dim, value, n, total in rows:
+        if dim == "time_to_identify":
+            out["avg_minutes_to_identify"] = total / n
+        else:
+            out.setdefault(dim, []).append((value, n))
+    return out
+
+# ---------- packed payloads ----------
+_dict_cache: dict = {}  # dictionaries never change once stored, so caching by id is safe
+
+def _payload_dict(dict_id: int) -> bytes:
+    """A compression dictionary by id; read on its own connection, since this
+    runs inside unpack_section on whichever connection called it."""
+    if dict_id not in _dict_cache:
+        c = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+        try:
+            row = c.execute("SELECT dict FROM payload_dicts WHERE id=?", (dict_id,)).fetchone()
+        finally:
+            c.close()
+        if not row:
+            raise ValueError(f"Payload dictionary {dict_id} not found")
+        _dict_cache[dict_id] = row[0]
+    return _dict_cache[dict_id]
+
+@lru_cache(maxsize=256)
+def _cold(payload: bytes) -> dict:
+    return decompress(payload, _payload_dict)
+
+def _unpack_section(payload: bytes, hot_json: Optional[str], name: str) -> Optional[str]:
+    return merge(hot_json, _cold(payload), name)
+
+def _current_dict(c) -> tuple:
+    """`(id, dictionary)` new payloads are compressed with: the newest for CODEC, or `(0, b"")`.
+
+    The id is looked up on every write, so a dictionary trained by another
+    process (`manage.py pack-payloads --retrain`) is picked up straight away.
+    """
+    dict_id = c.execute("SELECT max(id) FROM payload_dicts WHERE codec=?", (CODEC,)).fetchone()[0]
+    if not dict_id:
+        return 0, b""
+    if dict_id not in _dict_cache:
+        _dict_cache[dict_id] = c.execute("SELECT dict FROM payload_dicts WHERE id=?", (dict_id,)).fetchone()[0]
+    return dict_id, _dict_cache[dict_id]
+
+def _stored_sections(c, sections: tuple, packed: bool = PAYLOAD_ENCODING == "packed") -> tuple:
+    """`(section column values, payload)` to store for the full section JSON."""
+    if not packed:
+        return sections, None
+    hot, cold = split({s: json.loads(t) if t else None for s, t in zip(SECTIONS, sections)})
+    dict_id, zdict = _current_dict(c)
+    return tuple(hot[s] for s in SECTIONS), compress(cold, dict_id, zdict)
+
+def train_payload_dict(samples: int = PAYLOAD_DICT_SAMPLES) -> Optional[int]:
+    """Train a dictionary on the newest submitted reports and make it current.
+
+    Returns its id, or None with too few reports to learn from.
+    """
+    with connection() as c:
+        rows = c.execute(
+            f"SELECT {_sections_sql()} FROM reports WHERE status='submitted' ORDER BY id DESC LIMIT ?", (samples,)
+        ).fetchall()
+    if len(rows) < 100:
+        return None
+    data = train([split(dict(zip(SECTIONS, (json.loads(t) if t else None for t in r))))[1] for r in rows])
+    with transaction() as c:
+        dict_id = c.execute(
+            "INSERT INTO payload_dicts(codec, dict, samples) VALUES (?,?,?)", (CODEC, data, len(rows))
+        ).lastrowid
+    return dict_id
+
+def _repack(c, schema: str, packed: bool, chunk_size: int) -> int:
+    """Rewrite the submitted reports in `schema` not yet in the wanted encoding, a chunk per transaction."""
+    done = 0
+    todo = "payload IS NULL" if packed else "payload IS NOT NULL"
+    while True:
+        rows = c.execute(
+            f"SELECT id, {_sections_sql()} FROM {schema}.reports WHERE status='submitted' AND {todo} LIMIT ?",
+            (chunk_size,),
+        ).fetchall()
+        if not rows:
+            return done
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            # purpose is kept whole either way, so its column (and its triggers) are left alone
+            c.executemany(
+                f"UPDATE {schema}.reports SET reporter_json=?, organisation_json=?, incident_json=?, "
+                "ransomware_json=?, payload=? WHERE id=?",
+                [(st[0], st[1], st[3], st[4], payload, r[0])
+                 for r in rows for st, payload in [_stored_sections(c, r[1:], packed)]],
+            )
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+        done += len(rows)
+
+@timed("storage.pack_reports")
+def pack_reports(packed: bool = True, retrain: bool = False, chunk_size: int = 500) -> dict:
+    """Convert stored submitted reports, archives included, to the packed
+    encoding (or back to plain JSON with `packed=False`).
+
+    Trains a dictionary first when there is none yet for CODEC, or with
+    `retrain`. Returns `{"main" or archive path: reports converted}`.
+    """
+    done = {}
+    with connection() as c:
+        if packed and (retrain or not _current_dict(c)[0]):
+            train_payload_dict()
+        done["main"] = _repack(c, "main", packed, chunk_size)
+        for path in archive_paths():
+            with _attached(c, path) as a:
+                done[path] = _repack(c, a, packed, chunk_size)
+                if done[path]:
+                    c.execute(f"VACUUM {a}")
+    return done
 
 # ---------- drafts ----------
 def _new_ref() -> str:
     return uuid.uuid4().hex[:8].upper()
 
+_DRAFT_UPSERT = """
+INSERT INTO reports (status, ref, draft_version, content_hash, {json_cols}, {hash_cols})
+VALUES ('draft', ?, 1, ?, {marks})
+ON CONFLICT(ref) DO UPDATE SET
+    {sets},
+    content_hash = excluded.content_hash,
+    draft_version = draft_version + 1
+WHERE status = 'draft' AND ({any_changed})
+RETURNING id
+""".format(
+    json_cols=", ".join(f"{s}_json" for s in SECTIONS),
+    hash_cols=", ".join(f"{s}_hash" for s in SECTIONS),
+    marks=",".join("?" * 2 * len(SECTIONS)),
+    sets=",\n    ".join(f"{s}_json = excluded.{s}_json, {s}_hash = excluded.{s}_hash" for s in SECTIONS),
+    any_changed=" OR ".join(f"{s}_hash IS NOT excluded.{s}_hash" for s in SECTIONS),
+)
+
+def _write_draft(c, payload: dict, ref: str) -> str:
+    """Upsert a draft by ref in one statement.
+
+    Nothing is written when no section hash changed; otherwise the version
+    is bumped and the draft_versions triggers record the changed sections.
+    SQLite rewrites the whole row on UPDATE, so every section is set.
+    """
+    sections = (
+        json.dumps(payload["reporter"]),
+        json.dumps(payload["organisation"]),
+        json.dumps(payload["purpose"]),
+        json.dumps(payload["incident"]),
+        json.dumps(payload.get("ransomware")) if payload.get("ransomware") else None,
+    )
+    row = c.execute(
+        _DRAFT_UPSERT,
+        (ref, _content_hash(sections)) + sections + tuple(_section_hash(t) for t in sections),
+    ).fetchone()
+    if row:
+        _set_destinations(c, row[0], payload["purpose"])
+    elif c.execute("SELECT 1 FROM reports WHERE ref=? AND status != 'draft'", (ref,)).fetchone():
+        raise ValueError(f"Report {ref} has already been submitted")
+    return ref
+
+def save_draft_async(payload: dict, ref: str | None = None) -> Future:
+    """Queue a draft save; the future resolves to the draft's reference."""
+    return _write_async(_write_draft, payload, (ref or _new_ref()).upper())
+
+@timed("storage.save_draft")
 def save_draft(payload: dict, ref: str | None = None) -> str:
-    ref = (ref or _new_ref()).upper()
-    with _conn() as c:
-        cur = c.cursor()
-        cur.execute("SELECT id FROM reports WHERE ref=?", (ref,))
-        row = cur.fetchone()
-        vals = (
-            json.dumps(payload["reporter"]),
-            json.dumps(payload["organisation"]),
-            json.dumps(payload["purpose"]),
-            json.dumps(payload["incident"]),
-            json.dumps(payload.get("ransomware")) if payload.get("ransomware") else None,
-            ref,
-        )
-        if row:
-            cur.execute(
-                "UPDATE reports SET status='draft', reporter_json=?, organisation_json=?, purpose_json=?, incident_json=?, ransomware_json=? WHERE ref=?",
-                vals
-            )
-        else:
-            cur.execute(
-                "INSERT INTO reports (status, reporter_json, organisation_json, purpose_json, incident_json, ransomware_json, ref) VALUES ('draft',?,?,?,?,?,?)",
-                vals
+    return save_draft_async(payload, ref).result()
+
+@timed("storage.load_draft")
+def load_draft(ref: str, version: Optional[int] = None) -> dict | None:
+    """The latest draft for `ref`, or how it stood at an earlier `version`.
+
+    An earlier version is rebuilt from, per section, the newest delta at or
+    before it, so it costs one indexed scan of that draft's history.
+    """
+    ref = ref.upper()
+    with connection() as c:
+        if version is None:
+            row = c.execute(
+                f"SELECT {_sections_sql()} FROM reports WHERE ref=? AND status='draft'",
+                (ref,)
+            ).fetchone()
+            return payload_from_row(row) if row else None
+        rows = c.execute(
+            "SELECT j.key, j.value, max(v.version) FROM reports r "
+            "JOIN draft_versions v ON v.ref = r.ref AND v.version <= ? "
+            "JOIN json_each(v.delta) j "
+            "WHERE r.ref = ? AND r.status = 'draft' GROUP BY j.key",
+            (int(version), ref),
+        ).fetchall()
+    if not rows:
+        return None
+    found = {key: value for key, value, _ in rows}
+    return payload_from_row([found.get(s) or ("{}" if s != "ransomware" else None) for s in SECTIONS])
+
+def is_draft(ref: str) -> bool:
+    """Whether `ref` names a draft that has not been submitted."""
+    with connection() as c:
+        return c.execute("SELECT 1 FROM reports WHERE ref=? AND status='draft'", (ref.upper(),)).fetchone() is not None
+
+@timed("storage.draft_history", rows=len)
+def draft_history(ref: str) -> list:
+    """`[(version, saved_at, [changed sections])]`, newest first."""
+    with connection() as c:
+        rows = c.execute(
+            "SELECT version, created_at, (SELECT group_concat(key, ',') FROM json_each(delta)) "
+            "FROM draft_versions WHERE ref=? ORDER BY version DESC",
+            (ref.upper(),),
+        ).fetchall()
+    return [(v, at, keys.split(",") if keys else []) for v, at, keys in rows]
+
+def submit_from_ref_async(ref: str) -> Future:
+    """Submit the draft saved under `ref` as it stands, through the same path as save_report.
+
+    Raises ValueError if there is no such draft (the future does, if it was
+    submitted meanwhile) and pydantic.ValidationError if it is incomplete.
+    """
+    draft = load_draft(ref)
+    if draft is None:
+        raise ValueError("Draft not found")
+    return save_report_async(draft, ref=ref)
+
+def submit_from_ref(ref: str) -> int:
+    return submit_from_ref_async(ref).result()
+
+# ---------- routing ----------
+def _set_destinations(c, report_id: int, purpose: dict):
+    c.execute("DELETE FROM report_destinations WHERE report_id=?", (report_id,))
+    c.executemany(
+        "INSERT INTO report_destinations(destination, report_id) VALUES (?,?)",
+        [(d, report_id) for d in destinations_for(purpose)],
+    )
+
+def _rebuild_destinations(c, schema: str = "main", chunk_size: int = 1000):
+    """Re-resolve every report in `schema` under the current ROUTES and stamp its routing_version."""
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute(f"DELETE FROM {schema}.report_destinations")
+        cur = c.execute(f"SELECT id, purpose_json FROM {schema}.reports")
+        while rows := cur.fetchmany(chunk_size):
+            c.executemany(
+                f"INSERT INTO {schema}.report_destinations(destination, report_id) VALUES (?,?)",
+                [(d, r[0]) for r in rows for d in destinations_for(json.loads(r[1]))],
             )
+        c.execute(f"INSERT OR REPLACE INTO {schema}.meta(key, value) VALUES ('routing_version', ?)",
+                  (ROUTING_VERSION,))
         c.commit()
-    return ref
+    except BaseException:
+        c.rollback()
+        raise
 
-def load_draft(ref: str) -> dict | None:
-    with _conn() as c:
-        cur = c.cursor()
-        cur.execute(
-            "SELECT reporter_json, organisation_json, purpose_json, incident_json, ransomware_json FROM reports WHERE ref=? AND status='draft'",
-            (ref.upper(),)
+def _reroute(c):
+    """Rebuild report_destinations wherever it was resolved under other ROUTES: the hot
+    database and each archive, which keeps its own routing_version."""
+    routed = c.execute("SELECT value FROM meta WHERE key='routing_version'").fetchone()
+    if not routed or routed[0] != ROUTING_VERSION:
+        _rebuild_destinations(c)
+    for path in archive_paths():
+        with _attached(c, path) as name:
+            c.executescript(ARCHIVE_SCHEMA.format(a=name))
+            routed = c.execute(f"SELECT value FROM {name}.meta WHERE key='routing_version'").fetchone()
+            if not routed or routed[0] != ROUTING_VERSION:
+                _rebuild_destinations(c, name)
+
+def report_destinations(report_id: int) -> list:
+    """Destinations the report is due to, as stored (archived reports included)."""
+    with connection() as c:
+        for schema in _sources(c, archived=True):
+            rows = c.execute(
+                f"SELECT destination FROM {schema}.report_destinations WHERE report_id=?", (report_id,)
+            ).fetchall()
+            if rows:
+                break
+    have = {r[0] for r in rows}
+    return [d for d in DESTINATIONS if d in have]
+
+# ---------- outbox ----------
+def _enqueue_outbox(c, report_ids: list):
+    """Queue one delivery per destination each report is due to."""
+    c.execute(
+        "INSERT OR IGNORE INTO outbox (report_id, destination, idempotency_key) "
+        "SELECT report_id, destination, lower(hex(randomblob(16))) FROM report_destinations "
+        "WHERE report_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(report_ids),),
+    )
+
+@timed("storage.claim_outbox", rows=len)
+def claim_outbox(dest: str, limit: int, lease_s: float) -> list:
+    """Claim up to `limit` due deliveries for `dest`, shaped and ready to send.
+
+    Claimed rows are pushed `lease_s` into the future so a concurrent worker
+    skips them; a crashed worker's rows become due again when the lease runs
+    out. Returns `[(outbox_id, idempotency_key, attempts, body)]`.
+    """
+    now = time.time()
+    with transaction() as c:
+        rows = c.execute(
+            f"SELECT o.id, o.idempotency_key, o.attempts, {_sections_sql('r.')} "
+            "FROM outbox o JOIN reports r ON r.id = o.report_id "
+            "WHERE o.destination = ? AND o.status = 'pending' AND o.next_attempt_at <= ? "
+            "ORDER BY o.next_attempt_at, o.id LIMIT ?",
+            (dest, now, limit),
+        ).fetchall()
+        c.executemany("UPDATE outbox SET next_attempt_at=? WHERE id=?", [(now + lease_s, r[0]) for r in rows])
+    shaped = shape_batch(dest, [payload_from_row(r[3:]) for r in rows])
+    return [(r[0], r[1], r[2], json.dumps(s, separators=(",", ":"))) for r, s in zip(rows, shaped)]
+
+@timed("storage.record_deliveries")
+def record_deliveries(results: list):
+    """Write back a round of attempts, `[(outbox_id, status, next_attempt_at, error)]`."""
+    with transaction() as c:
+        c.executemany(
+            "UPDATE outbox SET status=?, attempts=attempts+1, next_attempt_at=?, last_error=?, "
+            "delivered_at=CASE WHEN ?='delivered' THEN datetime('now') END WHERE id=?",
+            [(status, at, err, status, oid) for oid, status, at, err in results],
         )
-        row = cur.fetchone()
-        if not row: return None
-        return {
-            "reporter": json.loads(row[0]),
-            "organisation": json.loads(row[1]),
-            "purpose": json.loads(row[2]),
-            "incident": json.loads(row[3]),
-            "ransomware": json.loads(row[4]) if row[4] else None,
-        }
 
-def submit_from_ref(ref: str) -> int:
-    with _conn() as c:
-        cur = c.cursor()
-        cur.execute("UPDATE reports SET status='submitted' WHERE ref=?", (ref.upper(),))
-        cur.execute("SELECT id FROM reports WHERE ref=?", (ref.upper(),))
-        row = cur.fetchone()
-        c.commit()
-    if not row:
-        raise ValueError("Draft not found")
-    return int(row[0])
+@timed("storage.outbox_summary")
+def outbox_summary():
+    """Delivery counts as a DataFrame: one row per destination, one column per status."""
+    import pandas as pd
+    with connection() as c:
+        rows = c.execute("SELECT destination, status, count(*) FROM outbox GROUP BY 1, 2").fetchall()
+    df = pd.DataFrame(rows, columns=["Destination", "Status", "Count"])
+    return df.pivot_table(index="Destination", columns="Status", values="Count", fill_value=0).astype(int)
 
-# ---------- final save / fetch ----------
-def save_report(report, attachments: Optional[List]=None) -> int:
-    with _conn() as c:
-        cur = c.cursor()
-        cur.execute(
-            "INSERT INTO reports (reporter_json, organisation_json, purpose_json, incident_json, ransomware_json, status) "
-            "VALUES (?,?,?,?,?,'submitted')",
-            (
-                json.dumps(report.reporter),
-                json.dumps(report.organisation),
-                json.dumps(report.purpose),
-                json.dumps(report.incident),
-                json.dumps(report.ransomware) if report.ransomware else None,
-            ),
+@timed("storage.list_outbox", rows=len)
+def list_outbox(status: Optional[str] = None, report_id: Optional[int] = None, limit: int = 200):
+    import pandas as pd
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if report_id is not None:
+        where.append("report_id = ?")
+        params.append(report_id)
+    sql = ("SELECT report_id, destination, status, attempts, last_error, created_at, delivered_at, "
+           "CASE WHEN status = 'pending' THEN datetime(next_attempt_at, 'unixepoch') END FROM outbox")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with connection() as c:
+        rows = c.execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+    return pd.DataFrame(rows, columns=["Report", "Destination", "Status", "Attempts", "Last error",
+                                       "Queued", "Delivered", "Next attempt"])
+
+def retry_failed() -> int:
+    """Put failed deliveries back in the queue; returns how many."""
+    with transaction() as c:
+        return c.execute(
+            "UPDATE outbox SET status='pending', attempts=0, next_attempt_at=0 WHERE status='failed'"
+        ).rowcount
+
+# ---------- near duplicates ----------
+def _similar(c, sig, exclude: Optional[int] = None) -> list:
+    """`[(report_id, similarity)]` at or above DUPLICATE_THRESHOLD, most similar first.
+
+    Only the newest BUCKET_CANDIDATES reports of each matching bucket are
+    compared, so a crowded bucket (templated narratives) stays cheap.
+    """
+    keys = band_keys(sig)
+    rows = c.execute(
+        "SELECT m.report_id, m.signature FROM report_minhash m WHERE m.report_id IN ("
+        + " UNION ".join(["SELECT * FROM (SELECT report_id FROM lsh_buckets WHERE band=? AND bucket=? "
+                          "ORDER BY report_id DESC LIMIT ?)"] * len(keys)) + ")",
+        [v for band, key in keys for v in (band, key, BUCKET_CANDIDATES)],
+    ).fetchall()
+    rows = [r for r in rows if r[0] != exclude]
+    if not rows:
+        return []
+    sims = similarities(sig, [r[1] for r in rows])
+    found = [(rows[i][0], float(sims[i])) for i in np.flatnonzero(sims >= DUPLICATE_THRESHOLD)]
+    return sorted(found, key=lambda x: -x[1])[:MAX_DUPLICATES]
+
+def _index_similarity(c, items: list, placeholder: bool = False):
+    """Index `[(report_id, shingles)]` in order, recording duplicates of reports already indexed.
+
+    With `placeholder`, reports with nothing to shingle still get an empty
+    signature row so the backfill does not revisit them.
+    """
+    for rid, tokens in items:
+        sig = signature(tokens)
+        if sig is None:
+            if placeholder:
+                c.execute("INSERT OR IGNORE INTO report_minhash(report_id, signature) VALUES (?, x'')", (rid,))
+            continue
+        # a pair is stored once, larger id first; a draft submitted late has the smaller id
+        c.executemany(
+            "INSERT OR IGNORE INTO report_duplicates(report_id, duplicate_of, similarity) VALUES (?,?,?)",
+            [(max(rid, other), min(rid, other), sim) for other, sim in _similar(c, sig, rid)],
+        )
+        c.execute("INSERT OR REPLACE INTO report_minhash(report_id, signature) VALUES (?,?)", (rid, sig.tobytes()))
+        c.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets(band, bucket, report_id) VALUES (?,?,?)",
+            [(band, key, rid) for band, key in band_keys(sig)],
         )
-        rid = cur.lastrowid
-        if attachments:
-            for f in attachments:
-                cur.execute(
-                    "INSERT INTO attachments (report_id, filename, content) VALUES (?,?,?)",
-                    (rid, getattr(f, "name", "file"), f.getvalue()),
-                )
-        c.commit()
-        return rid
 
-def fetch_reports_df(query: Optional[str]=None):
+def _prepared_shingles(report: PreparedReport) -> set:
+    r = report.report
+    return shingles(r.incident.narrative, r.organisation.name, r.organisation.abn, r.incident.occurrence_date)
+
+@timed("storage.find_similar", rows=len)
+def find_similar(payload: dict) -> list:
+    """Stored reports that look like the same incident as `payload`, `[(report_id, similarity)]`."""
+    sig = signature(report_shingles(payload))
+    if sig is None:
+        return []
+    with connection() as c:
+        return _similar(c, sig)
+
+def similar_reports(report_id: int) -> list:
+    """Likely duplicates recorded for a report, either way round, `[(report_id, similarity)]`."""
+    with connection() as c:
+        return c.execute(
+            "SELECT duplicate_of, similarity FROM report_duplicates WHERE report_id = ? "
+            "UNION ALL SELECT report_id, similarity FROM report_duplicates WHERE duplicate_of = ? "
+            "ORDER BY 2 DESC",
+            (report_id, report_id),
+        ).fetchall()
+
+@timed("storage.fetch_duplicates_df", rows=len)
+def fetch_duplicates_df(limit: int = 200):
+    """Most recent likely-duplicate pairs with enough detail to compare them."""
     import pandas as pd
-    with _conn() as c:
-        df = pd.read_sql_query(
-            "SELECT id, created_at, ref, status, reporter_json, organisation_json, purpose_json, incident_json FROM reports ORDER BY id DESC",
-            c
+    with connection() as c:
+        rows = c.execute(
+            "SELECT d.report_id, d.duplicate_of, round(d.similarity, 2), "
+            "json_extract(a.organisation_json, '$.name'), b.created_at, a.created_at, a.occurrence_date, "
+            "substr(json_extract(a.incident_json, '$.narrative'), 1, 80) "
+            "FROM report_duplicates d JOIN reports a ON a.id = d.report_id JOIN reports b ON b.id = d.duplicate_of "
+            "ORDER BY d.report_id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return pd.DataFrame(rows, columns=["Report", "Looks like", "Similarity", "Organisation",
+                                       "Earlier report received", "Received", "Occurred", "Narrative"])
+
+# ---------- final save / fetch ----------
+def _insert_report(c, report: PreparedReport, attachments: list, ref: Optional[str] = None) -> int:
+    """Insert a prepared report, or with `ref` promote that draft to it."""
+    sections = report.sections
+    stored, payload = _stored_sections(c, sections)
+    if ref:
+        row = c.execute(
+            "UPDATE reports SET status='submitted', reporter_json=?, organisation_json=?, purpose_json=?, "
+            "incident_json=?, ransomware_json=?, content_hash=?, payload=?, submitted_seq=?, submitted_at=datetime('now') "
+            "WHERE ref=? AND status='draft' RETURNING id",
+            stored + (_content_hash(sections), payload, _next_submitted_seq(c), ref),
+        ).fetchone()
+        if not row:
+            raise ValueError("Draft not found")
+        rid = row[0]
+    else:
+        rid = c.execute(
+            "INSERT INTO reports (reporter_json, organisation_json, purpose_json, incident_json, ransomware_json, "
+            "content_hash, payload, submitted_seq, submitted_at, status) VALUES (?,?,?,?,?,?,?,?,datetime('now'),'submitted')",
+            stored + (_content_hash(sections), payload, _next_submitted_seq(c)),
+        ).lastrowid
+    c.executemany(
+        "INSERT INTO attachments (report_id, filename, sha256, size, mime_type) VALUES (?,?,?,?,?)",
+        [(rid, a["filename"], a["sha256"], a["size"], a["mime_type"]) for a in attachments],
+    )
+    _set_destinations(c, rid, report.purpose)
+    _enqueue_outbox(c, [rid])
+    _index_similarity(c, [(rid, _prepared_shingles(report))])
+    return rid
+
+def _insert_reports(c, reports: list) -> list:
+    """Insert many prepared reports with executemany; returns `[(id, ref)]` in order.
+
+    Runs inside the caller's write transaction, so the new rows are exactly
+    those above the current highest id.
+    """
+    seq = _next_submitted_seq(c, len(reports))
+    rows = [stored + (_content_hash(r.sections), payload, _new_ref(), seq + i)
+            for i, r in enumerate(reports) for stored, payload in [_stored_sections(c, r.sections)]]
+    last = c.execute("SELECT coalesce(max(id), 0) FROM reports").fetchone()[0]
+    c.executemany(
+        "INSERT INTO reports (reporter_json, organisation_json, purpose_json, incident_json, ransomware_json, "
+        "content_hash, payload, ref, submitted_seq, submitted_at, status) VALUES (?,?,?,?,?,?,?,?,?,datetime('now'),'submitted')",
+        rows,
+    )
+    ids = [r[0] for r in c.execute("SELECT id FROM reports WHERE id > ? ORDER BY id", (last,))]
+    c.executemany(
+        "INSERT INTO report_destinations(destination, report_id) VALUES (?,?)",
+        [(d, rid) for rid, report in zip(ids, reports) for d in destinations_for(report.purpose)],
+    )
+    _enqueue_outbox(c, ids)
+    _index_similarity(c, [(rid, _prepared_shingles(r)) for rid, r in zip(ids, reports)])
+    return [(rid, row[7]) for rid, row in zip(ids, rows)]
+
+@timed("storage.save_reports", rows=len)
+def save_reports(reports: list) -> list:
+    """Bulk insert in one transaction; returns `[(id, ref)]`.
+
+    Takes PreparedReports, or Reports / dicts which are prepared first.
+    """
+    reports = [r if isinstance(r, PreparedReport) else prepare_report(r) for r in reports]
+    return _write_async(_insert_reports, reports).result()
+
+def save_report_async(report, attachments: Optional[List]=None, ref: Optional[str] = None) -> Future:
+    """Queue a report insert; the future resolves to the report id.
+
+    `report` is a PreparedReport (or a Report / dict, prepared here). With
+    `ref`, the draft saved under it becomes this submitted report.
+    Attachments are streamed into the attachment store first, so the
+    transaction only records their metadata; if the save fails, the blobs
+    it added are removed again.
+    """
+    if not isinstance(report, PreparedReport):
+        report = prepare_report(report)
+    files: list = []
+    try:
+        for f in attachments or []:
+            files.append(store_upload(f))
+        fut = _write_async(_insert_report, report, files, ref.upper() if ref else None)
+    except BaseException:
+        _discard_uploads(files)
+        raise
+    if not files:
+        return fut
+    # resolve only once a failed save's blobs are gone
+    settled: Future = Future()
+    def settle(done: Future):
+        error = done.exception()
+        if error is None:
+            settled.set_result(done.result())
+            return
+        try:
+            _discard_uploads(files)
+        finally:
+            settled.set_exception(error)
+    fut.add_done_callback(settle)
+    return settled
+
+def _discard_uploads(files: list):
+    """Remove the blobs a failed save added to the store, unless a report has since linked them.
+
+    Only main is checked: archived reports are days old, so none can point
+    at a blob this save has just written.
+    """
+    new = sorted({a["sha256"] for a in files if a["new"]})
+    if not new:
+        return
+    with connection() as c:
+        linked = {r[0] for r in c.execute(
+            f"SELECT sha256 FROM attachments WHERE sha256 IN ({','.join('?' * len(new))})", new
+        )}
+    discard_blobs(s for s in new if s not in linked)
+
+@timed("storage.save_report")
+def save_report(report, attachments: Optional[List]=None, ref: Optional[str] = None) -> int:
+    return save_report_async(report, attachments, ref).result()
+
+# ---------- attachments ----------
+@timed("storage.list_attachments", rows=len)
+def list_attachments(report_id: int) -> list:
+    with connection() as c:
+        for schema in _sources(c, archived=True):
+            rows = c.execute(
+                "SELECT id, filename, coalesce(size, length(content)), mime_type, sha256 "
+                f"FROM {schema}.attachments WHERE report_id=? ORDER BY id",
+                (report_id,),
+            ).fetchall()
+            if rows:
+                break
+    return [
+        {"id": r[0], "filename": r[1] or f"attachment_{r[0]}", "size": r[2] or 0,
+         "mime_type": r[3], "sha256": r[4]}
+        for r in rows
+    ]
+
+def iter_attachment(attachment_id: int, chunk_size: int = CHUNK_SIZE):
+    """Yield an attachment's bytes in chunks, never holding the whole file.
+
+    Store-backed files are read from disk; legacy rows are read through
+    SQLite incremental BLOB I/O.
+    """
+    with connection() as c:
+        for schema in _sources(c, archived=True):
+            row = c.execute(
+                f"SELECT sha256, content IS NOT NULL FROM {schema}.attachments WHERE id=?", (attachment_id,)
+            ).fetchone()
+            if not row:
+                continue
+            if row[0]:
+                yield from iter_file(blob_path(row[0]), chunk_size)
+            elif row[1]:
+                with c.blobopen("attachments", "content", attachment_id, readonly=True, name=schema) as blob:
+                    yield from iter(lambda: blob.read(chunk_size), b"")
+            return
+        raise ValueError(f"Attachment {attachment_id} not found")
+
+def write_attachments_zip(report_id: int, fh) -> int:
+    """Stream all of a report's attachments into a ZIP written to `fh`; returns the file count."""
+    files = list_attachments(report_id)
+    seen = set()
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for a in files:
+            name = a["filename"]
+            if name in seen:
+                name = f"{a['id']}_{name}"
+            seen.add(name)
+            with zf.open(name, "w", force_zip64=True) as out:
+                for chunk in iter_attachment(a["id"]):
+                    out.write(chunk)
+    return len(files)
+
+_SUMMARY_SELECT = """
+    SELECT id, created_at, ref, status,
+           json_extract(reporter_json, '$.first_name') AS first_name,
+           json_extract(reporter_json, '$.surname') AS surname,
+           json_extract(reporter_json, '$.email') AS email,
+           json_extract(organisation_json, '$.name') AS org_name,
+           jurisdiction,
+           incident_type,
+           substr(json_extract(incident_json, '$.narrative'), 1, 80) AS narrative
+    FROM {schema}.reports AS reports
+"""
+
+SUMMARY_COLUMNS = ["ID", "Ref", "Status", "Created", "Reporter", "Email",
+                   "Organisation", "Jurisdiction", "Incident Type", "Summary"]
+
+def _summary_df(rows):
+    import pandas as pd
+    return pd.DataFrame(
+        [{
+            "ID": r[0],
+            "Ref": r[2] or "",
+            "Status": r[3],
+            "Created": r[1],
+            "Reporter": f"{r[4] or ''} {r[5] or ''}",
+            "Email": r[6] or "",
+            "Organisation": r[7] or "",
+            "Jurisdiction": r[8] or "",
+            "Incident Type": r[9] or "",
+            "Summary": f"{r[9] or ''} — {r[10] or ''}",
+        } for r in rows],
+        columns=SUMMARY_COLUMNS,
+    )
+
+def _filter_where(filters: Optional[ReportFilter], schema: str = "main"):
+    """SQL predicates over `reports` in `schema` for a ReportFilter, as (clauses, params)."""
+    where, params = [], []
+    if filters is None:
+        return where, params
+    match = _fts_match(filters.query)
+    if match:
+        where.append(f"id IN (SELECT rowid FROM {schema}.reports_fts WHERE reports_fts MATCH ?)")
+        params.append(match)
+    if filters.status:
+        where.append("status = ?")
+        params.append(filters.status)
+    for col, values in (("jurisdiction", filters.jurisdictions), ("incident_type", filters.incident_types)):
+        if values:
+            where.append(f"{col} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+    if filters.ci_sectors:
+        where.append(
+            f"id IN (SELECT report_id FROM {schema}.report_ci_sectors WHERE sector IN ({','.join('?' * len(filters.ci_sectors))}))"
         )
+        params.extend(filters.ci_sectors)
+    if filters.destinations:
+        where.append(
+            f"id IN (SELECT report_id FROM {schema}.report_destinations WHERE destination IN ({','.join('?' * len(filters.destinations))}))"
+        )
+        params.extend(filters.destinations)
+    if filters.occurred_from:
+        where.append("occurrence_date >= ?")
+        params.append(filters.occurred_from)
+    if filters.occurred_to:
+        where.append("occurrence_date <= ?")
+        params.append(filters.occurred_to)
+    return where, params
+
+def _with_query(query: Optional[str], filters: Optional[ReportFilter]) -> Optional[ReportFilter]:
+    if query:
+        return (filters or ReportFilter()).model_copy(update={"query": query})
+    return filters
+
+@timed("storage.fetch_reports_page", rows=lambda r: len(r[0]))
+def fetch_reports_page(page_size: int = 50, cursor: Optional[int] = None,
+                       query: Optional[str] = None, filters: Optional[ReportFilter] = None):
+    """One page of summary rows, newest first, using keyset pagination on id.
+
+    `cursor` is the `next_cursor` returned for the previous page (None for the
+    first page); `query` and `filters` narrow the rows in SQL. Returns
+    `(df, next_cursor)`; `next_cursor` is None on the last page. With
+    `filters.archived` each archive contributes its own newest rows and the
+    page is taken from the merge.
+    """
+    filters = _with_query(query, filters)
+    rows = []
+    with connection() as c:
+        for schema in _sources(c, bool(filters and filters.archived)):
+            where, params = _filter_where(filters, schema)
+            if cursor is not None:
+                where.append("id < ?")
+                params.append(int(cursor))
+            sql = _SUMMARY_SELECT.format(schema=schema)
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY id DESC LIMIT ?"
+            params.append(int(page_size) + 1)
+            rows += c.execute(sql, params).fetchall()
+    rows = sorted(rows, key=lambda r: r[0], reverse=True)[:page_size + 1]
+    next_cursor = rows[page_size - 1][0] if len(rows) > page_size else None
+    return _summary_df(rows[:page_size]), next_cursor
+
+@timed("storage.count_reports")
+def count_reports(query: Optional[str] = None, filters: Optional[ReportFilter] = None) -> int:
+    filters = _with_query(query, filters)
+    total = 0
+    with connection() as c:
+        for schema in _sources(c, bool(filters and filters.archived)):
+            where, params = _filter_where(filters, schema)
+            sql = f"SELECT COUNT(*) FROM {schema}.reports"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            total += c.execute(sql, params).fetchone()[0]
+    return total
+
+@timed("storage.fetch_reports_df", rows=len)
+def fetch_reports_df(query: Optional[str]=None, filters: Optional[ReportFilter]=None):
+    """All matching summary rows; with a text query, best-ranked first.
+
+    Archived rows (with `filters.archived`) follow the hot ones, newest month first.
+    """
+    filters = _with_query(query, filters)
+    match = _fts_match(filters.query) if filters else None
     rows = []
-    for _, r in df.iterrows():
-        reporter = json.loads(r["reporter_json"]) if r["reporter_json"] else {}
-        org = json.loads(r["organisation_json"]) if r["organisation_json"] else {}
-        inc = json.loads(r["incident_json"]) if r["incident_json"] else {}
-        summary = f"{inc.get('type','')} — {inc.get('narrative','')[:80]}"
-        rows.append({
-            "ID": r["id"],
-            "Ref": r["ref"] or "",
-            "Status": r["status"],
-            "Created": r["created_at"],
-            "Reporter": f"{reporter.get('first_name','')} {reporter.get('surname','')}",
-            "Email": reporter.get('email',''),
-            "Organisation": org.get('name',''),
-            "Jurisdiction": org.get('jurisdiction',''),
-            "Incident Type": inc.get('type',''),
-            "Summary": summary,
-        })
+    with connection() as c:
+        for schema in _sources(c, bool(filters and filters.archived)):
+            where, params = _filter_where(filters.model_copy(update={"query": None}) if match else filters, schema)
+            sql = _SUMMARY_SELECT.format(schema=schema)
+            if match:
+                sql += (f" JOIN (SELECT rowid AS fts_id, rank FROM {schema}.reports_fts WHERE reports_fts MATCH ?) m"
+                        " ON m.fts_id = reports.id")
+                params.insert(0, match)
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY m.rank" if match else " ORDER BY id DESC"
+            rows += c.execute(sql, params).fetchall()
+    return _summary_df(rows)
+
+@timed("storage.iter_report_rows", rows=len)
+def iter_report_rows(filters: Optional[ReportFilter] = None, chunk_size: int = 500,
+                     submitted_in: Optional[tuple] = None):
+    """Stream report rows in chunks, in id order.
+
+    Rows are (id, created_at, ref, status, reporter, organisation, purpose,
+    incident, ransomware) with the sections as stored JSON. With
+    `filters.archived` the archives are streamed first, oldest month first.
+    `submitted_in=(after, upto)` keeps reports whose submitted_seq is in that range.
+    """
+    with connection() as c:
+        for schema in _sources(c, bool(filters and filters.archived), oldest_first=True):
+            where, params = _filter_where(filters, schema)
+            if submitted_in is not None:
+                where.append("submitted_seq > ? AND submitted_seq <= ?")
+                params.extend(int(v) for v in submitted_in)
+            sql = f"SELECT id, created_at, ref, status, {_sections_sql()} FROM {schema}.reports"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            cur = c.execute(sql + " ORDER BY id", params)
+            try:
+                while rows := cur.fetchmany(chunk_size):
+                    yield rows
+            finally:
+                cur.close()
+
+@timed("storage.fetch_fields_df", rows=len)
+def fetch_fields_df(fields: list, filters: Optional[ReportFilter] = None):
+    """id, ref, status plus one column per "section.key" field, extracted in SQL.
+
+    Missing values are None; list values come back as JSON text. Cold fields
+    of packed reports are filled in from one decode per row.
+    """
     import pandas as pd
-    out = pd.DataFrame(rows)
-    if query:
-        q = query.lower()
-        mask = out.apply(lambda s: s.astype(str).str.lower().str.contains(q, na=False))
-        out = out[mask.any(axis=1)]
-    return out
+    keys = [f.split(".", 1) for f in fields]
+    cols = ", ".join(f"json_extract({s}_json, '$.{k}') AS \"{f}\"" for f, (s, k) in zip(fields, keys))
+    cold = [(3 + i, s, k) for i, (s, k) in enumerate(keys) if not is_hot(s, k)]
+    rows = []
+    with connection() as c:
+        for schema in _sources(c, bool(filters and filters.archived), oldest_first=True):
+            where, params = _filter_where(filters, schema)
+            sql = f"SELECT id, ref, status, {cols}, payload FROM {schema}.reports"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            cur = c.execute(sql + " ORDER BY id", params)
+            rows += cur.fetchall()
+    out = []
+    for r in rows:
+        if r[-1] is not None and cold:
+            r, unpacked = list(r), _cold(r[-1])
+            for i, s, k in cold:
+                r[i] = sql_value((unpacked.get(s) or {}).get(k))
+        out.append(r[:-1])
+    return pd.DataFrame(out, columns=[d[0] for d in cur.description][:-1])
 
 def purge_all():
-    with _conn() as c:
+    with transaction() as c:
+        c.execute("DELETE FROM outbox")
         c.execute("DELETE FROM attachments")
+        c.execute("DELETE FROM report_duplicates")
+        c.execute("DELETE FROM lsh_buckets")
+        c.execute("DELETE FROM report_minhash")
         c.execute("DELETE FROM reports")
-        c.commit()
+        # archived reports stay in the all-time rollups; their archives go below
+        c.execute("DELETE FROM report_rollups")
+        _bump_data_version(c)
+    purge_store()
+    shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+    # purged reports must not live on in the analytics snapshot
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+# ---------- retention ----------
+# submitted reports with nothing left to deliver, older than the cut-off
+_ARCHIVABLE = (
+    "status = 'submitted' AND created_at < datetime('now', ?) AND NOT EXISTS "
+    "(SELECT 1 FROM main.outbox o WHERE o.report_id = reports.id AND o.status != 'delivered')"
+)
+
+def _archive_month(c, month: str, cutoff: str) -> int:
+    """Move one month's archivable reports into its archive database.
 
+    The copy and the delete are separate transactions, each writing a
+    single file, so a crash in between leaves the reports in both places
+    and the next run finishes the move; it never loses them.
+    """
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS archiving (id INTEGER PRIMARY KEY)")
+    c.execute("DELETE FROM temp.archiving")
+    c.execute(
+        f"INSERT INTO temp.archiving SELECT id FROM main.reports WHERE {_ARCHIVABLE} "
+        "AND strftime('%Y-%m', created_at) = ?",
+        (cutoff, month),
+    )
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with _attached(c, archive_path(month)) as a:
+        c.executescript(ARCHIVE_SCHEMA.format(a=a))
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            # contentless FTS cannot replace a row, so skip any copied by an interrupted run
+            c.execute(
+                f"INSERT INTO {a}.reports_fts(rowid, ref, reporter, email, organisation, incident_type, narrative) "
+                f"SELECT {_fts_values('reports.')} FROM main.reports "
+                f"WHERE id IN temp.archiving AND id NOT IN (SELECT id FROM {a}.reports)"
+            )
+            c.execute(
+                f"INSERT OR REPLACE INTO {a}.reports({ARCHIVE_REPORT_COLUMNS}) "
+                f"SELECT {ARCHIVE_REPORT_COLUMNS} FROM main.reports WHERE id IN temp.archiving"
+            )
+            for table, cols in (("report_ci_sectors", "sector, report_id"),
+                                ("report_destinations", "destination, report_id"),
+                                ("attachments", "id, report_id, filename, content, sha256, size, mime_type"),
+                                ("outbox", "id, report_id, destination, idempotency_key, attempts, created_at, delivered_at")):
+                c.execute(
+                    f"INSERT OR REPLACE INTO {a}.{table}({cols}) "
+                    f"SELECT {cols} FROM main.{table} WHERE report_id IN temp.archiving"
+                )
+            # init_db brought the archive's existing rows up to date, so all of them are current
+            c.execute(f"INSERT OR REPLACE INTO {a}.meta(key, value) VALUES ('routing_version', ?)",
+                      (ROUTING_VERSION,))
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            c.execute("DELETE FROM main.attachments WHERE report_id IN temp.archiving")
+            moved = c.execute("DELETE FROM main.reports WHERE id IN temp.archiving").rowcount
+            # the delete triggers took the reports out of the all-time rollups; put them back
+            _add_rollups(c, f"{a}.reports", "id IN temp.archiving")
+            c.commit()
+        except BaseException:
+            c.rollback()
+            raise
+        c.execute(f"VACUUM {a}")
+    return moved
+
+def archive_reports(older_than_days: int = ARCHIVE_AFTER_DAYS) -> dict:
+    """Move submitted reports older than `older_than_days` into monthly archives.
+
+    Reports with deliveries still pending or failed stay in the hot database.
+    Returns `{month: reports moved}`.
+    """
+    cutoff = f"-{int(older_than_days)} days"
+    with connection() as c:
+        months = [r[0] for r in c.execute(
+            f"SELECT DISTINCT strftime('%Y-%m', created_at) FROM reports WHERE {_ARCHIVABLE} ORDER BY 1",
+            (cutoff,),
+        )]
+        return {month: _archive_month(c, month, cutoff) for month in months}
+
+def expire_drafts(older_than_days: int = DRAFT_EXPIRY_DAYS) -> int:
+    """Delete drafts not saved for `older_than_days`; returns how many."""
+    with transaction() as c:
+        return c.execute(
+            "DELETE FROM reports WHERE status = 'draft' AND coalesce("
+            "(SELECT max(v.created_at) FROM draft_versions v WHERE v.ref = reports.ref), created_at"
+            ") < datetime('now', ?)",
+            (f"-{int(older_than_days)} days",),
+        ).rowcount
+
+def incremental_vacuum(step_pages: int = VACUUM_STEP_PAGES) -> int:
+    """Return free pages to the filesystem, `step_pages` per short write
+    transaction; returns how many were released.
+
+    A database created before auto_vacuum=INCREMENTAL is converted first,
+    which takes one full VACUUM.
+    """
+    with connection() as c:
+        if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            before = c.execute("PRAGMA freelist_count").fetchone()[0]
+            c.execute("VACUUM")
+            return before
+        released = 0
+        free = c.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                c.execute(f"PRAGMA incremental_vacuum({int(step_pages)})").fetchall()
+                c.commit()
+            except BaseException:
+                c.rollback()
+                raise
+            left = c.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= free:
+                break
+            released += free - left
+            free = left
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return released
+
+@timed("storage.run_retention")
+def run_retention(archive_after_days: int = ARCHIVE_AFTER_DAYS, draft_expiry_days: int = DRAFT_EXPIRY_DAYS,
+                  vacuum: bool = True) -> dict:
+    """Archive old reports, expire abandoned drafts, then release the freed pages."""
+    archived = archive_reports(archive_after_days)
+    return {
+        "archived": archived,
+        "expired_drafts": expire_drafts(draft_expiry_days),
+        "released_pages": incremental_vacuum() if vacuum else 0,
+    }
+
+@timed("storage.get_destination_json", size=lambda s: len(s.encode()))
 def get_destination_json(report_id: int, dest: str) -> str:
-    with _conn() as c:
-        cur = c.cursor()
-        cur.execute(
-            "SELECT reporter_json, organisation_json, purpose_json, incident_json, ransomware_json FROM reports WHERE id=?",
-            (report_id,)
-        )
-        row = cur.fetchone()
+    """Destination-shaped JSON for a report, served from destination_payloads when fresh."""
+    key = normalise_destination(dest)
+    with connection() as c:
+        hit = c.execute(
+            "SELECT d.body FROM reports r JOIN destination_payloads d "
+            "ON d.report_id = r.id AND d.destination = ? "
+            "WHERE r.id = ? AND d.content_hash = r.content_hash AND d.schema_version = ?",
+            (key, report_id, SCHEMA_VERSION),
+        ).fetchone()
+        if hit:
+            return hit[0]
+        for schema in _sources(c, archived=True):
+            row = c.execute(
+                f"SELECT {_sections_sql()}, content_hash FROM {schema}.reports WHERE id=?",
+                (report_id,)
+            ).fetchone()
+            if row:
+                break
         if not row:
             raise ValueError(f"Report {report_id} not found")
-        payload = {
-            "reporter": json.loads(row[0]),
-            "organisation": json.loads(row[1]),
-            "purpose": json.loads(row[2]),
-            "incident": json.loads(row[3]),
-            "ransomware": json.loads(row[4]) if row[4] else None,
-        }
+        payload = payload_from_row(row)
     shaped = shape_for_destination(dest, payload)
-    return json.dumps(shaped, indent=2)
+    body = json.dumps(shaped, indent=2)
+    try:
+        with transaction() as c:
+            c.execute(
+                "INSERT OR REPLACE INTO destination_payloads "
+                "(report_id, destination, content_hash, schema_version, body) "
+                "SELECT id, ?, content_hash, ?, ? FROM reports WHERE id = ? AND content_hash = ?",
+                (key, SCHEMA_VERSION, body, report_id, row[5]),
+            )
+    except sqlite3.OperationalError:
+        pass  # the cache is best-effort; a busy database just means a miss next time
+    return body
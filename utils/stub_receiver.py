@@ -0,0 +1,63 @@
+"""Local stand-in for the regulators' intake endpoints, for trying out dispatch.
+
+Accepts `POST /<destination>` with a JSON body and an Idempotency-Key
+header, and remembers each key so a repeated delivery is acknowledged
+without being counted twice. `fail_rate` makes a share of requests answer
+503 to exercise retries.
+
+    python manage.py stub-receiver --port 8765 --fail-rate 0.2
+"""
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubReceiver(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8765), fail_rate: float = 0.0, verbose: bool = False):
+        super().__init__(address, _Handler)
+        self.fail_rate = fail_rate
+        self.verbose = verbose
+        self.received: dict = {}   # (destination, idempotency key) -> payload
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.serve_forever, name="srt-stub-receiver", daemon=True)
+        t.start()
+        return t
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubReceiver
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        key = self.headers.get("Idempotency-Key")
+        dest = self.path.strip("/")
+        with self.server.lock:
+            self.server.requests += 1
+        if random.random() < self.server.fail_rate:
+            return self._reply(503, {"error": "unavailable"})
+        if not key:
+            return self._reply(400, {"error": "missing Idempotency-Key"})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON"})
+        with self.server.lock:
+            duplicate = (dest, key) in self.server.received
+            self.server.received.setdefault((dest, key), payload)
+        self._reply(200, {"received": key, "duplicate": duplicate})
+
+    def _reply(self, code: int, obj: dict):
+        out = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
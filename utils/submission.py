@@ -0,0 +1,44 @@
+"""Validate-once, serialise-once preparation of a submitted report.
+
+`prepare_report` validates the whole report against the typed section models
+and dumps each section to compact JSON exactly once. Those strings are what
+storage inserts (and hashes), and `document` is the same bytes assembled into
+the full report, used for the submitter's download copy.
+"""
+from typing import NamedTuple
+
+from pydantic import TypeAdapter
+
+from utils.metrics import timed
+from utils.models import Report, SECTION_MODELS
+
+# built once per process; pydantic compiles the validators and serialisers here
+REPORT_ADAPTER = TypeAdapter(Report)
+SECTION_ADAPTERS = {name: TypeAdapter(model) for name, model in SECTION_MODELS.items()}
+
+class PreparedReport(NamedTuple):
+    report: Report
+    sections: tuple            # canonical JSON per section, in SECTION_MODELS order (None if absent)
+    document: bytes            # the whole report as JSON, built from the same section bytes
+
+    @property
+    def purpose(self) -> dict:
+        return self.report.purpose.model_dump()
+
+@timed("submission.prepare_report", size=lambda p: len(p.document))
+def prepare_report(data) -> PreparedReport:
+    """Validate `data` (a Report or a report-shaped dict) and serialise it once.
+
+    Raises pydantic.ValidationError, with locations like `("incident", "type")`.
+    """
+    report = data if isinstance(data, Report) else REPORT_ADAPTER.validate_python(data)
+    dumped = {
+        name: adapter.dump_json(value) if (value := getattr(report, name)) is not None else None
+        for name, adapter in SECTION_ADAPTERS.items()
+    }
+    document = b"{" + b",".join(b'"%s":%s' % (name.encode(), raw or b"null") for name, raw in dumped.items()) + b"}"
+    return PreparedReport(report, tuple(raw.decode() if raw else None for raw in dumped.values()), document)
+
+def error_messages(e) -> list:
+    """`section.field: message` for each error in a ValidationError."""
+    return [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"] for err in e.errors()]
@@ -1,4 +1,32 @@
 import re
+
+import numpy as np
+
 _ABN_RE = re.compile(r"^\s*\d{2}\s?\d{3}\s?\d{3}\s?\d{3}\s*$")
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# ATO weights; subtract 1 from the first digit, the weighted sum must divide by 89
+ABN_WEIGHTS = np.array([10, 1, 3, 5, 7, 9, 11, 13, 15, 17, 19])
+
 def is_valid_abn(text: str) -> bool:
-    return bool(_ABN_RE.match(text or ""))
+    if not _ABN_RE.match(text or ""):
+        return False
+    digits = [int(ch) for ch in text if ch.isdigit()]
+    digits[0] -= 1
+    return sum(d * w for d, w in zip(digits, ABN_WEIGHTS.tolist())) % 89 == 0
+
+def valid_abn_mask(values) -> np.ndarray:
+    """is_valid_abn over a pandas Series of strings at once (missing values are False)."""
+    s = values.fillna("").astype(str)
+    ok = s.str.match(_ABN_RE.pattern).to_numpy(dtype=bool, copy=True)
+    digits = s[ok].str.replace(r"\D", "", regex=True)
+    if len(digits):
+        d = np.frombuffer("".join(digits).encode(), dtype=np.uint8).reshape(-1, 11).astype(np.int64) - 48
+        d[:, 0] -= 1
+        ok[ok] = (d @ ABN_WEIGHTS) % 89 == 0
+    return ok
+
+def is_valid_email(text: str) -> bool:
+    return bool(_EMAIL_RE.match(text or ""))
+
+def valid_email_mask(values) -> np.ndarray:
+    return values.fillna("").astype(str).str.match(_EMAIL_RE.pattern).to_numpy()
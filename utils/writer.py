@@ -0,0 +1,84 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued write jobs in batches.
+
+    A job is `fn(conn, *args)`; each runs inside its own SAVEPOINT so a failing
+    job only rolls back itself, and the whole batch shares one COMMIT (and one
+    fsync). Futures resolve only once their batch is durable.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 max_batch: int = 256, max_wait: float = 0.002):
+        self._connect = connect
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="srt-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        fut: Future = Future()
+        self._jobs.put((fn, args, fut))
+        return fut
+
+    def close(self):
+        """Flush outstanding jobs and stop the writer thread."""
+        self._jobs.put(_STOP)
+        self._thread.join()
+
+    def _next_batch(self) -> list:
+        batch = [self._jobs.get()]
+        while len(batch) < self._max_batch and batch[-1] is not _STOP:
+            try:
+                batch.append(self._jobs.get(timeout=self._max_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        c = self._connect()
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            jobs = [j for j in batch if j is not _STOP]
+            if jobs:
+                self._commit(c, jobs)
+            if stop:
+                c.close()
+                return
+
+    def _commit(self, c: sqlite3.Connection, jobs: list):
+        done = []
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            for fn, args, fut in jobs:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                c.execute("SAVEPOINT job")
+                try:
+                    done.append((fut, fn(c, *args), None))
+                    c.execute("RELEASE job")
+                except Exception as e:
+                    c.execute("ROLLBACK TO job")
+                    c.execute("RELEASE job")
+                    done.append((fut, None, e))
+            c.commit()
+        except Exception as e:
+            if c.in_transaction:
+                c.rollback()
+            for fn, args, fut in jobs:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut, result, exc in done:
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(result)